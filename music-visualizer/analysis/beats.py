@@ -0,0 +1,104 @@
+# analysis/beats.py
+# librosa, numpy and the block decoder are imported inside the functions that
+# use them: the Streamlit process only needs params() to build cache keys and
+# should not pay for loading librosa's DSP stack (numba, scipy) at startup.
+import config
+from analysis.profiles import get_profile, soxr_quality
+
+# Bump whenever the analysis output changes so stale cache entries are ignored.
+ANALYSIS_VERSION = 7
+
+
+def params(profile=None) -> dict:
+    """Everything that influences the result of track_beats (used in cache keys)."""
+    profile = get_profile(profile)
+    return {
+        "version": ANALYSIS_VERSION,
+        "profile": profile._asdict(),
+        "stream_min_seconds": config.STREAM_MIN_SECONDS,
+    }
+
+
+def track_beats(path: str, profile=None, progress=None, pcm=None, on_beats=None) -> dict:
+    """
+    Decode an audio file and run librosa's beat tracker over it.
+    analysis.decode picks the decoder from the file's header; long files
+    it can decode block by block are analyzed that way.
+    progress, if given, is called with a 0..1 fraction between stages and
+    may raise to abort the analysis. pcm is an optional analysis.pcm entry:
+    a cached decode is memory-mapped instead of decoding path again, and a
+    fresh decode is written to it. on_beats, if given, is called with
+    provisional beats while the analysis runs (analysis.progressive): the
+    first PREVIEW_SECONDS up front, then chunk by chunk once the onset
+    envelope is in.
+    Returns {"tempo": bpm, "beats": [seconds, ...], "beat_info": per-beat
+    annotations, "features": timeline, "peaks": pyramid}, timeline being
+    analysis.features' per-frame rms/band/onset lists, beat_info its
+    beat_annotations and pyramid an analysis.peaks.PeakPyramid (not JSON;
+    the caller saves it), "decode": {"backend", "format", "seconds"}}, the
+    decoder that was used and the time it took.
+    """
+    import librosa
+    import numpy as np
+    from analysis import decode, features, progressive, stream
+    from analysis.peaks import PeakPyramid
+
+    profile = get_profile(profile)
+    progress = progress or _no_progress
+    info = decode.probe(path)
+    if info.streamable and info.duration >= config.STREAM_MIN_SECONDS:
+        return stream.track_beats(path, profile=profile.name, progress=progress, pcm=pcm, info=info,
+                                  on_beats=on_beats)
+    provisional = []
+    if on_beats is not None and info.duration > 2 * progressive.PREVIEW_SECONDS:
+        head = decode.load(path, sr=profile.sr, quality=soxr_quality(profile), res_type=profile.res_type,
+                           info=info, max_seconds=progressive.PREVIEW_SECONDS)
+        provisional = progressive.preview(head.y, head.sr, n_fft=profile.n_fft, hop_length=profile.hop_length)
+        on_beats(provisional)
+    y, sr, decoded = _decode(path, profile, progress, pcm, info)
+    progress(0.5)
+    # Same envelope beat_track builds internally, but with the profile's STFT size.
+    onset_env = librosa.onset.onset_strength(
+        y=y, sr=sr, n_fft=profile.n_fft, hop_length=profile.hop_length, aggregate=np.median
+    )
+    if on_beats is not None:
+        chunked = progressive.ChunkedBeats(sr, profile.hop_length, on_beats, beats=provisional)
+        chunked.feed(onset_env)
+        chunked.finish()
+    timeline = features.timeline(y, sr)
+    pyramid = PeakPyramid(sr)
+    pyramid.feed(y)
+    del y  # the PCM is not needed past this point
+    progress(0.8)
+    tempo, beat_frames = librosa.beat.beat_track(
+        onset_envelope=onset_env, sr=sr, hop_length=profile.hop_length, trim=False
+    )
+    beats = librosa.frames_to_time(beat_frames, sr=sr, hop_length=profile.hop_length).tolist()
+    progress(1.0)
+    return {"tempo": float(np.atleast_1d(tempo)[0]), "beats": beats,
+            "beat_info": features.beat_annotations(timeline, beats), "features": timeline,
+            "peaks": pyramid, "decode": decoded}
+
+
+def _decode(path: str, profile, progress, pcm, info):
+    """Mono PCM at the profile's rate and the decode report for the result."""
+    import time
+
+    from analysis import decode
+
+    if pcm is not None:
+        start = time.perf_counter()
+        y = pcm.load()
+        if y is not None:  # read-only memmap, used as is: nothing below writes to it
+            return y, pcm.sr, {"backend": "pcm-cache", "format": "npy",
+                               "seconds": time.perf_counter() - start}
+    y, sr, backend, seconds = decode.load(path, sr=profile.sr, quality=soxr_quality(profile),
+                                          res_type=profile.res_type, info=info,
+                                          progress=lambda f: progress(0.5 * f))
+    if pcm is not None:
+        pcm.store(y)
+    return y, sr, {"backend": backend, "format": info.format, "seconds": seconds}
+
+
+def _no_progress(fraction):
+    pass
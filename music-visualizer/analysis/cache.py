@@ -0,0 +1,119 @@
+# analysis/cache.py
+"""
+Content-addressed on-disk cache for analysis results.
+
+Entries are small JSON files named after a hash of the audio bytes plus the
+analysis parameters. Writes go through a temp file + os.replace so several
+Streamlit processes can share one directory without ever reading a partial
+entry. The directory is kept under a byte budget by evicting the least
+recently used entries (hits refresh the file mtime).
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+STALE_TMP_SECONDS = 3600
+
+
+def hash_bytes(data) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(content_hash: str, params: dict) -> str:
+    """Combine the audio hash with the analysis parameters into one key."""
+    blob = content_hash + json.dumps(params, sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return result
+
+    def put(self, key: str, result) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(result, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self.evict()
+
+    def get_or_compute(self, key: str, compute):
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def evict(self) -> None:
+        """Drop least recently used entries until the directory fits max_bytes."""
+        evict_lru(self.directory, self.max_bytes)
+
+
+def evict_lru(directory: str, max_bytes: int) -> None:
+    """Delete the least recently modified files in directory until they fit max_bytes."""
+    entries = []
+    total = 0
+    now = time.time()
+    for entry in os.scandir(directory):
+        if not entry.is_file():
+            continue  # e.g. the numba cache living under the same root
+        try:
+            st = entry.stat()
+        except FileNotFoundError:
+            continue  # removed by another process
+        if entry.name.endswith(".tmp"):
+            # leftovers from a writer that crashed mid-write
+            if now - st.st_mtime > STALE_TMP_SECONDS:
+                _remove(entry.path)
+            continue
+        entries.append((st.st_mtime, st.st_size, entry.path))
+        total += st.st_size
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        _remove(path)
+        total -= size
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,237 @@
+# analysis/decode.py
+"""
+Audio decoding with per-format backend routing.
+
+probe() reads only the file header and picks the fastest backend that
+can decode the file:
+
+    soundfile   libsndfile, in-process: WAV, FLAC, OGG and MP3 (libsndfile
+                >= 1.1), block by block
+    ffmpeg      anything ffmpeg knows (M4A/AAC from uploads and JioSaavn),
+                mixed down to mono float32 by an ffmpeg subprocess and read
+                from its pipe block by block
+    audioread   librosa's legacy fallback (GStreamer, Core Audio, ...), used
+                only when neither of the above can open the file; it hands
+                out small int16 buffers and decodes the whole file at once
+
+Both block backends deliver mono float32 at the file's own rate and
+resampling stays with soxr in the caller, so the analysis gives the same
+result whichever backend decoded the file. load() reports which backend it
+used and how long decoding took.
+"""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import warnings
+from collections import namedtuple
+
+import numpy as np
+import soundfile as sf
+import soxr
+
+BACKENDS = ("soundfile", "ffmpeg", "audioread")
+BLOCK_SAMPLES = 1024 * 512  # native-rate samples per decoded block
+PROBE_TIMEOUT = 30  # seconds ffprobe may take to read a header
+
+
+class AudioInfo(namedtuple("AudioInfo", ["backend", "format", "samplerate", "channels", "frames"])):
+    """Header facts plus the backend that will decode the file; frames may be an estimate."""
+
+    @property
+    def duration(self) -> float:
+        return self.frames / float(self.samplerate)
+
+    @property
+    def streamable(self) -> bool:
+        """True when the backend can decode the file block by block."""
+        return self.backend != "audioread"
+
+
+Decoded = namedtuple("Decoded", ["y", "sr", "backend", "seconds"])
+
+
+def probe(path: str, backends=BACKENDS) -> AudioInfo:
+    """Read the header with the first of backends that can open the file."""
+    for backend in backends:
+        try:
+            info = _PROBES[backend](path)
+        except Exception:
+            continue
+        if info is not None and info.samplerate > 0:
+            return info
+    raise ValueError(f"Unsupported or corrupt audio file: {path}")
+
+
+def available_backends() -> list:
+    """The backends usable on this machine (ffmpeg needs ffmpeg and ffprobe on PATH)."""
+    found = ["soundfile"]
+    if shutil.which("ffmpeg") and shutil.which("ffprobe"):
+        found.append("ffmpeg")
+    try:
+        import audioread
+
+        if audioread.available_backends():
+            found.append("audioread")
+    except ImportError:
+        pass
+    return found
+
+
+class BlockReader:
+    """
+    Iterates over mono float32 blocks of a file at sr (the native rate if
+    None), resampled on the fly through a soxr stream. seconds accumulates
+    the time spent decoding and resampling, so callers that analyze blocks
+    as they arrive can still report the decode cost on its own.
+    """
+
+    def __init__(self, path: str, sr=None, quality: str = "HQ", info: AudioInfo = None,
+                 blocksize: int = BLOCK_SAMPLES):
+        self.info = info or probe(path)
+        if not self.info.streamable:
+            raise ValueError(f"{self.info.backend} can't decode {path} block by block")
+        self.path = path
+        self.sr = sr or self.info.samplerate
+        self.blocksize = blocksize
+        self.seconds = 0.0
+        self._resampler = None
+        if self.sr != self.info.samplerate:
+            self._resampler = soxr.ResampleStream(self.info.samplerate, self.sr, 1,
+                                                  dtype="float32", quality=quality)
+
+    def __iter__(self):
+        source = _BLOCKS[self.info.backend](self.path, self.blocksize)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    y = next(source)
+                except StopIteration:
+                    break
+                if self._resampler is not None:
+                    y = self._resampler.resample_chunk(y)
+                self.seconds += time.perf_counter() - start
+                yield y
+            if self._resampler is not None:  # flush the resampler's delay line
+                start = time.perf_counter()
+                tail = self._resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+                self.seconds += time.perf_counter() - start
+                yield tail
+        finally:
+            source.close()
+
+
+def load(path: str, sr=None, quality: str = "HQ", res_type: str = "soxr_hq", progress=None,
+         info: AudioInfo = None, max_seconds=None) -> Decoded:
+    """
+    Decode a file to mono float32 at sr (native rate if None), the whole of
+    it or its first max_seconds.
+
+    Block backends mix down and resample each block as it is read, straight
+    into one preallocated buffer, instead of holding the interleaved decode,
+    its mixdown and the resampled copy at the same time like librosa.load.
+    progress(fraction), if given, is called before every block.
+    """
+    info = info or probe(path)
+    start = time.perf_counter()
+    if not info.streamable:
+        import audioread
+        import librosa
+
+        if progress is not None:
+            progress(0.0)
+        with audioread.audio_open(path) as f, warnings.catch_warnings():
+            warnings.simplefilter("ignore", FutureWarning)  # librosa's audioread deprecation
+            y, sr = librosa.load(f, sr=sr, mono=True, res_type=res_type, duration=max_seconds)
+        return Decoded(y, sr, info.backend, time.perf_counter() - start)
+
+    reader = BlockReader(path, sr=sr, quality=quality, info=info)
+    sr = reader.sr
+    limit = int(max_seconds * sr) if max_seconds is not None else None
+    frames = info.frames if limit is None else min(info.frames, int(max_seconds * info.samplerate))
+    out = np.empty(int(np.ceil(frames * sr / info.samplerate)) + 1024, dtype=np.float32)
+    n = 0
+    for i, y in enumerate(reader):
+        if progress is not None:
+            progress(min(1.0, i * reader.blocksize / max(info.frames, 1)))
+        if n + len(y) > len(out):  # frame counts of compressed files are estimates
+            out = np.resize(out, n + len(y) + sr)
+        out[n:n + len(y)] = y
+        n += len(y)
+        if limit is not None and n >= limit:
+            n = limit
+            break
+    return Decoded(out[:n], sr, info.backend, time.perf_counter() - start)
+
+
+def _probe_soundfile(path):
+    info = sf.info(path)
+    return AudioInfo("soundfile", info.format.lower(), info.samplerate, info.channels, info.frames)
+
+
+def _probe_ffmpeg(path):
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe is None or shutil.which("ffmpeg") is None:
+        return None
+    proc = subprocess.run(
+        [ffprobe, "-v", "error", "-select_streams", "a:0", "-of", "json",
+         "-show_entries", "stream=sample_rate,channels,duration:format=format_name,duration", path],
+        capture_output=True, timeout=PROBE_TIMEOUT, check=True,
+    )
+    data = json.loads(proc.stdout)
+    stream, fmt = data["streams"][0], data.get("format", {})
+    sr = int(stream["sample_rate"])
+    seconds = float(stream.get("duration") or fmt.get("duration") or 0.0)
+    return AudioInfo("ffmpeg", fmt.get("format_name", "").split(",")[0], sr,
+                     int(stream["channels"]), int(round(seconds * sr)))
+
+
+def _probe_audioread(path):
+    import audioread
+
+    fmt = os.path.splitext(path)[1].lstrip(".").lower()
+    with audioread.audio_open(path) as f:
+        return AudioInfo("audioread", fmt, f.samplerate, f.channels, int(round(f.duration * f.samplerate)))
+
+
+def _soundfile_blocks(path, blocksize):
+    for block in sf.blocks(path, blocksize=blocksize, dtype="float32", always_2d=True):
+        yield block.mean(axis=1)
+
+
+def _ffmpeg_blocks(path, blocksize):
+    # stderr goes to a file: a corrupt input can make ffmpeg log more than a
+    # pipe holds, and it would then block on stderr while we wait on stdout.
+    with tempfile.TemporaryFile() as log:
+        proc = subprocess.Popen(
+            [shutil.which("ffmpeg"), "-nostdin", "-v", "error", "-i", path, "-map", "0:a:0",
+             "-ac", "1", "-f", "f32le", "-"],
+            stdout=subprocess.PIPE, stderr=log,
+        )
+        try:
+            while True:
+                data = proc.stdout.read(blocksize * 4)
+                if not data:
+                    break
+                yield np.frombuffer(data[:len(data) // 4 * 4], dtype="<f4").copy()
+            if proc.wait() != 0:
+                raise ValueError(f"ffmpeg could not decode {path}: {_last_line(log) or proc.returncode}")
+        finally:
+            if proc.poll() is None:  # consumer stopped early (cancelled analysis)
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+
+
+def _last_line(f, tail: int = 4096) -> str:
+    """The last non-empty line of a binary file (only its end is read)."""
+    f.seek(max(0, f.seek(0, os.SEEK_END) - tail))
+    lines = f.read().decode(errors="replace").strip().splitlines()
+    return lines[-1] if lines else ""
+
+
+_PROBES = {"soundfile": _probe_soundfile, "ffmpeg": _probe_ffmpeg, "audioread": _probe_audioread}
+_BLOCKS = {"soundfile": _soundfile_blocks, "ffmpeg": _ffmpeg_blocks}
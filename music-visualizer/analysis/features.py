@@ -0,0 +1,148 @@
+# analysis/features.py
+"""
+Dense feature timeline for the visualizers.
+
+Instead of every effect running its own WebAudio analyser and deriving
+bass energy from getByteFrequencyData on every frame, the analysis worker
+computes a small set of features once per track at ~60 frames per second:
+
+    rms    loudness of the frame
+    low    energy below 250 Hz
+    mid    energy from 250 Hz to 4 kHz
+    high   energy above 4 kHz
+    onset  spectral flux (how much new energy appeared)
+
+All values are normalized to 0..1 over the track. Effects look them up by
+audio.currentTime (see effects/timeline.py), which costs the same on every
+client and works without WebAudio.
+
+FeatureTimeline is fed PCM in arbitrary chunks, so the in-memory analysis
+and the block-wise one in stream.py share the same code; frames are
+centered like librosa's (n_fft // 2 of silence before the first sample).
+
+beat_annotations condenses the timeline to one entry per beat (strength,
+band energies over the beat, downbeat likelihood), so the client can filter
+and accent beats by a slider without the tracker running again.
+"""
+import numpy as np
+
+FPS = 60
+N_FFT = 1024
+BATCH_FRAMES = 2048  # frames transformed per FFT call
+BANDS = (("low", 0.0, 250.0), ("mid", 250.0, 4000.0), ("high", 4000.0, np.inf))
+FEATURES = ("rms", "low", "mid", "high", "onset")
+BAND_RANGE_DB = 60.0  # band energy this far below the track's peak maps to 0
+DECIMALS = 3
+BEAT_FEATURES = ("strength", "low", "mid", "high", "downbeat")
+BEAT_ONSET_FRAMES = 3  # beats may sit this many frames off the onset peak
+BEATS_PER_BAR = 4
+OFFBEAT_SCALE = 0.4  # downbeat values of the other bar positions stay below this
+
+
+class FeatureTimeline:
+    def __init__(self, sr: int, fps: float = FPS, n_fft: int = N_FFT):
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = max(1, int(round(sr / fps)))
+        self.fps = sr / self.hop_length
+        self._window = np.hanning(n_fft).astype(np.float32)
+        freqs = np.fft.rfftfreq(n_fft, 1.0 / sr)
+        self._bands = [(freqs >= lo) & (freqs < hi) for _, lo, hi in BANDS]
+        self._carry = np.zeros(n_fft // 2, dtype=np.float32)
+        self._prev_db = None
+        self._parts = {name: [] for name in FEATURES}
+        self._finished = None
+
+    def feed(self, y) -> None:
+        """Append mono float32 samples."""
+        buf = np.concatenate([self._carry, np.asarray(y, dtype=np.float32)])
+        n = 0 if len(buf) < self.n_fft else 1 + (len(buf) - self.n_fft) // self.hop_length
+        for start in range(0, n, BATCH_FRAMES):
+            count = min(BATCH_FRAMES, n - start)
+            lo = start * self.hop_length
+            self._frames(buf[lo:lo + (count - 1) * self.hop_length + self.n_fft], count)
+        self._carry = buf[n * self.hop_length:]
+
+    def finish(self) -> dict:
+        """Flush the tail and return {"fps": ..., "rms": [...], "low": [...], ...}."""
+        if self._finished is None:
+            self.feed(np.zeros(self.n_fft // 2, dtype=np.float32))
+            raw = {name: np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+                   for name, parts in self._parts.items()}
+            self._finished = {"fps": self.fps}
+            for name in FEATURES:
+                values = _normalize_db(raw[name]) if name in ("low", "mid", "high") else _normalize(raw[name])
+                self._finished[name] = np.round(values.astype(np.float64), DECIMALS).tolist()
+        return self._finished
+
+    def _frames(self, buf, count: int) -> None:
+        frames = np.lib.stride_tricks.sliding_window_view(buf, self.n_fft)[::self.hop_length][:count]
+        self._parts["rms"].append(np.sqrt(np.mean(frames ** 2, axis=1)))
+        power = np.abs(np.fft.rfft(frames * self._window, axis=1)) ** 2
+        for (name, _, _), mask in zip(BANDS, self._bands):
+            self._parts[name].append(10.0 * np.log10(power[:, mask].sum(axis=1) + 1e-10))
+        db = 10.0 * np.log10(power + 1e-10)
+        prev = db[:1] if self._prev_db is None else self._prev_db
+        flux = np.maximum(0.0, np.diff(np.vstack([prev, db]), axis=0)).mean(axis=1)
+        self._parts["onset"].append(flux.astype(np.float32))
+        self._prev_db = db[-1:]
+
+
+def timeline(y, sr: int, fps: float = FPS) -> dict:
+    """Feature timeline of a whole mono signal."""
+    extractor = FeatureTimeline(sr, fps)
+    extractor.feed(y)
+    return extractor.finish()
+
+
+def _normalize(values):
+    """Scale to 0..1 by the 99th percentile, so one spike doesn't flatten the rest."""
+    if len(values) == 0:
+        return values
+    top = float(np.percentile(values, 99))
+    return np.clip(values / top, 0.0, 1.0) if top > 0 else np.zeros_like(values)
+
+
+def _normalize_db(values):
+    """dB -> 0..1 relative to the track's loudest frame."""
+    if len(values) == 0:
+        return values
+    peak = float(values.max())
+    return np.clip((values - (peak - BAND_RANGE_DB)) / BAND_RANGE_DB, 0.0, 1.0)
+
+
+def beat_annotations(timeline: dict, beats, beats_per_bar: int = BEATS_PER_BAR) -> dict:
+    """
+    One value per beat for each of BEAT_FEATURES, all 0..1:
+
+        strength  peak onset strength near the beat, relative to the strongest beat
+        low/mid/high  mean band energy from the beat to the next one
+        downbeat  1.0 if the beat starts a bar, below OFFBEAT_SCALE otherwise:
+                  beats are grouped by their position in a bar of beats_per_bar
+                  and the position with the most accented beats (onset + bass)
+                  is the downbeat, so exactly one beat per bar is above 0.5.
+                  The other positions get OFFBEAT_SCALE times their mean accent
+                  relative to the winner's.
+    """
+    n = len(timeline["rms"])
+    if not len(beats) or not n:
+        return {name: [] for name in BEAT_FEATURES}
+    frames = np.clip(np.round(np.asarray(beats) * timeline["fps"]).astype(int), 0, n - 1)
+    lengths = np.maximum(1, np.diff(frames, append=n))
+
+    onset = np.asarray(timeline["onset"])
+    padded = np.pad(onset, BEAT_ONSET_FRAMES)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * BEAT_ONSET_FRAMES + 1)
+    strength = windows[frames].max(axis=1)
+    out = {"strength": strength / strength.max() if strength.max() > 0 else strength}
+    for name in ("low", "mid", "high"):
+        out[name] = np.add.reduceat(np.asarray(timeline[name]), frames) / lengths
+
+    low = out["low"] / max(float(out["low"].max()), 1e-9)
+    accent = 0.5 * out["strength"] + 0.5 * low
+    phase = np.arange(len(frames)) % beats_per_bar
+    scores = np.array([accent[phase == p].mean() if np.any(phase == p) else 0.0
+                       for p in range(beats_per_bar)])
+    relative = scores / scores.max() if scores.max() > 0 else scores
+    out["downbeat"] = np.where(phase == scores.argmax(), 1.0, OFFBEAT_SCALE * relative[phase])
+    return {name: np.round(np.clip(out[name], 0.0, 1.0), DECIMALS).tolist() for name in BEAT_FEATURES}
@@ -0,0 +1,320 @@
+# analysis/jobs.py
+"""
+Background beat analysis on a process pool.
+
+The Streamlit script thread only submits work and polls a JobHandle, so the
+page stays responsive while librosa runs and several sessions can analyze
+in parallel (one worker per core by default). Workers report progress and
+check for cancellation through a multiprocessing Manager dict, so a job
+superseded by a newer track stops at its next progress checkpoint instead
+of running to completion. Finished results are written to the shared
+AnalysisCache by the worker itself, and the decoded PCM to the PcmCache so
+re-analyzing a track (another profile, a new ANALYSIS_VERSION) skips the
+decode. Each job runs under the resource limits of analysis/sandbox.py, so
+a hostile upload fails its own job instead of breaking the pool. With
+progressive set, provisional beats are published while a job runs
+(analysis/progressive.py).
+
+Submissions are single-flight per cache key: when several sessions load
+the same track (a demo song, a trending JioSaavn result) while it is being
+analyzed, they all get handles on the one job already running and the same
+result, instead of each decoding and beat-tracking it again. The job is
+cancelled only once every handle on it has been cancelled. stats() counts
+how many submissions were answered from the cache, started a job, or
+joined one.
+
+warm_up() starts every worker right away and has it run analysis/warmup.py
+before taking real jobs, so the first track after a restart is analyzed as
+fast as any other.
+"""
+import contextlib
+import importlib
+import multiprocessing
+import sys
+import threading
+import time
+import types
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from analysis import beats, sandbox, warmup
+from analysis.cache import AnalysisCache, cache_key
+from analysis.pcm import PcmCache
+from analysis.peaks import peaks_path
+from analysis.progressive import BeatPublisher, live_path
+
+WARMUP_TIMEOUT = 600  # seconds a warm-up ping waits for its sibling workers
+# Every job runs in a fork of its worker (analysis/sandbox.py) that is thrown
+# away afterwards, so what the jobs import is imported by the worker, once,
+# or each job pays for it again. librosa loads its submodules lazily and
+# librosa.onset/librosa.feature compile numba gufuncs on import, so they are
+# named explicitly.
+PRELOAD_MODULES = ("librosa.beat", "librosa.feature", "librosa.onset",
+                   "analysis.decode", "analysis.features", "analysis.progressive", "analysis.stream")
+
+_spawn_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _spawn_guard():
+    """
+    Streamlit executes app.py as a module called __main__ whose __file__ is
+    the script, and spawn re-runs the main module's file in every child it
+    starts. Hide it while processes are started so workers don't run the app.
+    """
+    with _spawn_lock:
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            yield
+        finally:
+            sys.modules["__main__"] = main
+
+
+class AnalysisCancelled(Exception):
+    pass
+
+
+class _Flight:
+    """One running job and the number of handles still waiting on it."""
+
+    def __init__(self, job_id: str, future: Future):
+        self.job_id = job_id
+        self.future = future
+        self.waiters = 1
+
+
+class JobHandle:
+    def __init__(self, service, job_id: str, future: Future, profile: str, key: str):
+        self._service = service
+        self.job_id = job_id
+        self.future = future
+        self.profile = profile
+        self.key = key  # cache key; also names the track's peak pyramid
+        self._released = False
+
+    def progress(self) -> float:
+        if self.future.done():
+            return 1.0
+        return self._service._status.get(self.job_id, 0.0)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout=None) -> dict:
+        return self.future.result(timeout)
+
+    def cancel(self) -> None:
+        """
+        Give up on the job. Once no other handle waits on it, a queued job is
+        cancelled and a running one asked to stop at its next checkpoint.
+        """
+        if self._released or self.future.done():
+            return
+        self._released = True
+        self._service._release(self)
+
+
+class AnalysisService:
+    def __init__(self, cache_dir: str, cache_max_bytes: int, max_workers: int,
+                 numba_cache_dir: str = "", warm: bool = False, pcm_dir: str = "",
+                 pcm_max_bytes: int = 0, limits: sandbox.Limits = sandbox.NO_LIMITS,
+                 progressive: bool = False):
+        self._cache_dir = cache_dir
+        self._cache_max_bytes = cache_max_bytes
+        self._pcm_dir = pcm_dir
+        self._pcm_max_bytes = pcm_max_bytes if pcm_dir else 0
+        self._limits = limits
+        self.progressive = progressive
+        self._max_workers = max_workers
+        self.cache = AnalysisCache(cache_dir, cache_max_bytes)
+        # spawn: forking the multi-threaded Streamlit server is not safe
+        self._ctx = multiprocessing.get_context("spawn")
+        with _spawn_guard():
+            self._manager = self._ctx.Manager()
+        self._status = self._manager.dict()
+        self._cancelled = self._manager.dict()
+        self._worker_args = (numba_cache_dir, warm)
+        self._executor = self._new_executor()
+        self._warmup = {"state": "cold", "seconds": None, "error": None}
+        self._lock = threading.Lock()  # sessions submit from their own script threads
+        self._flights = {}  # cache key -> _Flight of the job analyzing it
+        self._stats = {"cached": 0, "started": 0, "coalesced": 0}
+
+    def warm_up(self) -> None:
+        """
+        Start all workers now and let them warm up in the background.
+        Progress is reported by warmup_status().
+        """
+        if self._warmup["state"] != "cold":
+            return
+        self._warmup["state"] = "warming"
+        start = time.perf_counter()
+        # Queue one ping per worker before any real job. Each ping blocks on the
+        # barrier until every worker holds one, so the pool has to start (and
+        # initialize) all of its processes before the pings return.
+        barrier = self._manager.Barrier(self._max_workers)
+        with _spawn_guard():  # the pool starts its processes on submit
+            pings = [self._executor.submit(_ping, barrier) for _ in range(self._max_workers)]
+
+        def watch():
+            wait(pings)
+            errors = [f.exception() or f.result() for f in pings]
+            errors = [str(e) for e in errors if e]
+            self._warmup.update(
+                state="failed" if errors else "ready",
+                seconds=time.perf_counter() - start,
+                error=errors[0] if errors else None,
+            )
+
+        threading.Thread(target=watch, name="analysis-warmup", daemon=True).start()
+
+    def warmup_status(self) -> dict:
+        """{"state": cold|warming|ready|failed, "seconds": wall time of the warm-up, "error": ...}"""
+        return dict(self._warmup)
+
+    def submit(self, path: str, content_hash: str, profile: str) -> JobHandle:
+        key = cache_key(content_hash, beats.params(profile))
+        with self._lock:
+            handle = self._join(key, profile)
+        if handle is not None:
+            return handle
+        cached = self.cache.get(key)  # outside the lock: it reads the entry from disk
+        if cached is not None:
+            with self._lock:
+                self._stats["cached"] += 1
+            future = Future()
+            future.set_result(cached)
+            return JobHandle(self, uuid.uuid4().hex, future, profile, key)
+
+        with self._lock:
+            handle = self._join(key, profile)  # started while we read the cache
+            if handle is not None:
+                return handle
+            job_id = uuid.uuid4().hex
+            self._status[job_id] = 0.0
+            args = (job_id, path, content_hash, profile, key,
+                    self._cache_dir, self._cache_max_bytes, self._pcm_dir, self._pcm_max_bytes,
+                    self._limits, self.progressive, self._status, self._cancelled)
+            with _spawn_guard():
+                try:
+                    future = self._executor.submit(_run_job, *args)
+                except BrokenProcessPool:
+                    # A worker died outside the sandbox (no fork, or limits off) and
+                    # took the pool with it; its jobs have failed, later ones get a new pool.
+                    self._executor = self._new_executor()
+                    future = self._executor.submit(_run_job, *args)
+            flight = self._flights[key] = _Flight(job_id, future)
+            self._stats["started"] += 1
+        future.add_done_callback(lambda _: self._land(key, flight))
+        return JobHandle(self, job_id, future, profile, key)
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self._max_workers, mp_context=self._ctx,
+                                   initializer=_init_worker, initargs=self._worker_args)
+
+    def _join(self, key: str, profile: str):
+        """A handle on the job already analyzing key, or None. Called with the lock held."""
+        flight = self._flights.get(key)
+        if flight is None:
+            return None
+        flight.waiters += 1
+        self._stats["coalesced"] += 1
+        return JobHandle(self, flight.job_id, flight.future, profile, key)
+
+    def stats(self) -> dict:
+        """
+        Submission counts since startup: "cached" (answered from the cache),
+        "started" (ran a new job), "coalesced" (joined a job already running
+        for the same track and profile), plus "in_flight", the jobs running
+        now, and "waiting", the handles waiting on them.
+        """
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._flights),
+                        waiting=sum(f.waiters for f in self._flights.values()))
+
+    def _release(self, handle: JobHandle) -> None:
+        with self._lock:
+            flight = self._flights.get(handle.key)
+            if flight is None or flight.job_id != handle.job_id:
+                return
+            flight.waiters -= 1
+            if flight.waiters > 0:
+                return
+            # Nobody waits any more; a new submission starts a fresh job
+            # instead of joining one that is being cancelled.
+            del self._flights[handle.key]
+        if not flight.future.cancel() and not flight.future.done():
+            self._cancelled[flight.job_id] = True
+
+    def _land(self, key: str, flight: _Flight) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        self._forget(flight.job_id)
+
+    def _forget(self, job_id: str) -> None:
+        try:
+            self._status.pop(job_id, None)
+            self._cancelled.pop(job_id, None)
+        except (OSError, EOFError):
+            pass  # manager already shut down
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
+
+
+# Set in each worker process by _init_worker.
+_warmup_error = None
+
+
+def _init_worker(numba_cache_dir, warm):
+    global _warmup_error
+    warmup.configure_numba_cache(numba_cache_dir)
+    try:
+        for module in PRELOAD_MODULES:
+            importlib.import_module(module)
+        if warm:
+            warmup.warm_up()
+    except Exception as e:  # an exception here would break the whole pool
+        _warmup_error = f"{type(e).__name__}: {e}"
+
+
+def _ping(barrier):
+    """Warm-up marker task: returns the worker's warm-up error, if any."""
+    try:
+        barrier.wait(WARMUP_TIMEOUT)
+    except threading.BrokenBarrierError:
+        pass  # a worker was busy with a real job; this one is warm regardless
+    return _warmup_error
+
+
+def _run_job(job_id, path, content_hash, profile, key, cache_dir, cache_max_bytes,
+             pcm_dir, pcm_max_bytes, limits, progressive, status, cancelled):
+    def progress(fraction):
+        if job_id in cancelled:
+            raise AnalysisCancelled(job_id)
+        status[job_id] = fraction
+
+    publisher = BeatPublisher(live_path(cache_dir, key)) if progressive else None
+
+    def analyze():
+        # The header is parsed (libsndfile, ffprobe) in the sandbox too: a
+        # crash on a hostile file must not take the pool worker down.
+        sandbox.check_header(path, limits)
+        pcm = None
+        if pcm_max_bytes > 0:  # 0 disables the PCM cache
+            pcm = PcmCache(pcm_dir, pcm_max_bytes).entry(content_hash, path, profile)
+        result = beats.track_beats(path, profile, progress=progress, pcm=pcm, on_beats=publisher)
+        # The peak pyramid goes next to the JSON entry; the result keeps its layout.
+        result["peaks"] = result["peaks"].save(peaks_path(cache_dir, key))
+        AnalysisCache(cache_dir, cache_max_bytes).put(key, result)
+        return result
+
+    try:
+        return sandbox.run(analyze, (), limits)
+    finally:
+        if publisher is not None:  # the cache entry (or the error) supersedes it
+            publisher.discard()
@@ -0,0 +1,119 @@
+# analysis/pcm.py
+"""
+On-disk cache of decoded audio.
+
+Every analysis of a track used to start by decoding it again: a profile
+switch, a re-analysis after a cache eviction or an ANALYSIS_VERSION bump
+all paid for the MP3/M4A decode and the resampling once more. The mono
+float32 PCM a profile analyzes (its sample rate and resampling quality) is
+now written once to <content hash>-<sr>-<quality>.npy and later analyses
+open it with np.load(mmap_mode="r"): no decoding, no copy, and the pages
+come from the OS page cache.
+
+Files are written through a temp file + os.replace and the directory is
+kept under a byte budget with the same LRU eviction as the analysis cache.
+"""
+import io
+import os
+import tempfile
+
+import numpy as np
+
+from analysis.cache import evict_lru
+from analysis.profiles import get_profile, soxr_quality
+
+# A 1-D float32 .npy header is 128 bytes for any realistic length, so a
+# streamed file can reserve it up front and fill it in at the end.
+_HEADER_LENGTH = 128
+
+
+class PcmCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def entry(self, content_hash: str, path: str, profile=None) -> "PcmEntry":
+        """The cache slot for the PCM that profile's analysis of path (with that content hash) decodes."""
+        profile = get_profile(profile)
+        sr = profile.sr or native_rate(path)
+        name = f"{content_hash}-{sr}-{soxr_quality(profile).lower()}.npy"
+        return PcmEntry(self, os.path.join(self.directory, name), sr)
+
+    def evict(self) -> None:
+        evict_lru(self.directory, self.max_bytes)
+
+
+class PcmEntry:
+    def __init__(self, cache: PcmCache, path: str, sr: int):
+        self.cache = cache
+        self.path = path
+        self.sr = sr
+
+    def load(self):
+        """The cached PCM as a read-only memmap, or None."""
+        try:
+            y = np.load(self.path, mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+        try:
+            os.utime(self.path)  # mark as recently used
+        except OSError:
+            pass
+        return y
+
+    def store(self, y) -> None:
+        """Write a whole decoded signal."""
+        with self.writer() as writer:
+            writer.write(y)
+
+    def writer(self) -> "PcmWriter":
+        """Incremental writer for block-wise decoding; commits when its with-block exits cleanly."""
+        return PcmWriter(self)
+
+
+class PcmWriter:
+    def __init__(self, entry: PcmEntry):
+        self._entry = entry
+        fd, self._tmp_path = tempfile.mkstemp(dir=entry.cache.directory, suffix=".tmp")
+        self._file = os.fdopen(fd, "wb")
+        self._file.seek(_HEADER_LENGTH)
+        self._n = 0
+
+    def write(self, y) -> None:
+        y = np.ascontiguousarray(y, dtype="<f4")
+        self._file.write(y.data)
+        self._n += len(y)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            header = _npy_header(self._n)
+            if len(header) == _HEADER_LENGTH:
+                self._file.seek(0)
+                self._file.write(header)
+                self._file.close()
+                os.replace(self._tmp_path, self._entry.path)
+                self._entry.cache.evict()
+                return False
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+def native_rate(path: str) -> int:
+    """Sample rate of the file, from its header."""
+    from analysis.decode import probe
+
+    return probe(path).samplerate
+
+
+def _npy_header(n: int) -> bytes:
+    buf = io.BytesIO()
+    np.lib.format.write_array_header_1_0(buf, {"descr": "<f4", "fortran_order": False, "shape": (n,)})
+    return buf.getvalue()
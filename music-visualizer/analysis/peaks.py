@@ -0,0 +1,135 @@
+# analysis/peaks.py
+"""
+Min/max peak pyramid for drawing a track's waveform.
+
+Drawing a waveform in the browser would mean fetching and decoding the
+whole file there. Instead the analysis worker, which decodes the track
+anyway, keeps the min and max sample of every BUCKET samples (level 0) and
+of every FACTOR buckets of the level below (levels 1..LEVELS-1). An hour at
+22050 Hz is ~310k level-0 buckets and ~400 at level 6, so whatever the
+track length and display width there is a level with about one bucket per
+pixel, a few KB to send.
+
+Peaks are stored as int8 (sample * 127) next to the analysis cache entry
+in one file: the level lengths (an int64 .npy) followed by all levels
+concatenated (an (n, 2) int8 .npy). PeakFile memory-maps the second part,
+so serving a level reads only that level's pages.
+"""
+import os
+import re
+import tempfile
+
+import numpy as np
+
+BUCKET = 256  # samples per level-0 bucket
+FACTOR = 4  # buckets merged per level
+LEVELS = 8
+SUFFIX = ".peaks.npy"
+MAX_WIDTH = 8192  # pixels; wider requests get the level for this width
+_KEY_RE = re.compile(r"[0-9a-f]{64}$")
+
+
+class PeakPyramid:
+    def __init__(self, sr: int, bucket: int = BUCKET, factor: int = FACTOR, levels: int = LEVELS):
+        self.sr = sr
+        self.bucket = bucket
+        self.factor = factor
+        self.levels = levels
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._parts = []
+
+    def feed(self, y) -> None:
+        """Append mono float samples."""
+        buf = np.concatenate([self._carry, np.asarray(y, dtype=np.float32)])
+        n = len(buf) // self.bucket
+        if n:
+            frames = buf[:n * self.bucket].reshape(n, self.bucket)
+            self._parts.append(np.stack([frames.min(axis=1), frames.max(axis=1)], axis=1))
+        self._carry = buf[n * self.bucket:]
+
+    def finish(self) -> list:
+        """Flush the last partial bucket and return the levels, finest first, as (n, 2) int8 arrays."""
+        if len(self._carry):
+            self._parts.append(np.array([[self._carry.min(), self._carry.max()]], dtype=np.float32))
+            self._carry = np.zeros(0, dtype=np.float32)
+        base = np.concatenate(self._parts) if self._parts else np.zeros((0, 2), dtype=np.float32)
+        self._parts = [base]
+        levels = [np.round(np.clip(base, -1.0, 1.0) * 127).astype(np.int8)]
+        for _ in range(1, self.levels):
+            levels.append(_merge(levels[-1], self.factor))
+        return levels
+
+    def save(self, path: str) -> dict:
+        """Write the pyramid to path atomically; returns {"sr", "bucket", "factor", "levels": [lengths]}."""
+        levels = self.finish()
+        directory = os.path.dirname(path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.array([len(level) for level in levels], dtype="<i8"))
+                np.save(f, np.concatenate(levels))
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return {"sr": self.sr, "bucket": self.bucket, "factor": self.factor,
+                "levels": [len(level) for level in levels]}
+
+
+class PeakFile:
+    """Read side of a saved pyramid."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.lengths = np.load(f)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            offset = f.tell()
+        if shape[0]:
+            self._data = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+        else:
+            self._data = np.zeros(shape, dtype=dtype)  # can't map zero bytes
+        self._starts = np.concatenate([[0], np.cumsum(self.lengths)])
+
+    def level(self, index: int) -> np.ndarray:
+        return self._data[self._starts[index]:self._starts[index + 1]]
+
+    def level_for_width(self, width: int) -> int:
+        """The coarsest level that still has at least one bucket per pixel."""
+        fits = [i for i, n in enumerate(self.lengths) if n >= width]
+        return fits[-1] if fits else 0
+
+
+def peaks_path(directory: str, key: str) -> str:
+    return os.path.join(directory, key + SUFFIX)
+
+
+def level_bytes(directory: str, key: str, width: int):
+    """
+    The level of a cached pyramid that suits a display width, as interleaved
+    int8 min/max bytes, or None if there is no pyramid for key.
+    """
+    if not _KEY_RE.match(key):
+        return None
+    width = max(1, min(width, MAX_WIDTH))
+    try:
+        peaks = PeakFile(peaks_path(directory, key))
+    except (OSError, ValueError):
+        return None
+    return peaks.level(peaks.level_for_width(width)).tobytes()
+
+
+def _merge(level, factor: int):
+    n = -(-len(level) // factor)  # ceil
+    if n == 0:
+        return level[:0]
+    pad = n * factor - len(level)
+    lo = np.pad(level[:, 0], (0, pad), mode="edge").reshape(n, factor).min(axis=1)
+    hi = np.pad(level[:, 1], (0, pad), mode="edge").reshape(n, factor).max(axis=1)
+    return np.stack([lo, hi], axis=1)
@@ -0,0 +1,38 @@
+# analysis/profiles.py
+"""
+Named speed/accuracy trade-offs for beat analysis.
+
+Beats don't need high-frequency content, so analyzing a 96 kHz FLAC at its
+native rate mostly burns CPU. Each profile picks a target sample rate (None
+keeps the file's own rate), the soxr resampling quality and the STFT sizes
+used for the onset envelope. "fast" and "balanced" both keep ~43 envelope
+frames per second; "accurate" is the historical native-rate analysis and
+serves as the reference in benchmarks/bench_profiles.py.
+"""
+from collections import namedtuple
+
+import config
+
+Profile = namedtuple("Profile", ["name", "sr", "res_type", "n_fft", "hop_length"])
+
+PROFILES = {
+    "fast": Profile("fast", sr=11025, res_type="soxr_lq", n_fft=1024, hop_length=256),
+    "balanced": Profile("balanced", sr=22050, res_type="soxr_mq", n_fft=2048, hop_length=512),
+    "accurate": Profile("accurate", sr=None, res_type="soxr_hq", n_fft=2048, hop_length=512),
+}
+
+DEFAULT_PROFILE = config.ANALYSIS_PROFILE if config.ANALYSIS_PROFILE in PROFILES else "balanced"
+
+
+def get_profile(name=None) -> Profile:
+    if name is None:
+        name = DEFAULT_PROFILE
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown analysis profile: {name!r}") from None
+
+
+def soxr_quality(profile: Profile) -> str:
+    """'soxr_hq' -> 'HQ', as expected by soxr.ResampleStream."""
+    return profile.res_type.split("_", 1)[1].upper()
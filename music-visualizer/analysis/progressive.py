@@ -0,0 +1,155 @@
+# analysis/progressive.py
+"""
+Provisional beats while a track is still being analyzed.
+
+The visualizer used to start without beats until the whole track had been
+beat-tracked, which for an hour-long mix takes minutes. Now the analysis
+publishes beats as it goes:
+
+- preview() beat-tracks the first PREVIEW_SECONDS right away (in-memory
+  path), so the first beats are out in a fraction of a second whatever the
+  track's length.
+- ChunkedBeats beat-tracks the onset envelope CHUNK_SECONDS at a time
+  (plus OVERLAP_SECONDS of context), appending beats past the last
+  published one: on the streaming path as the envelope is computed, on the
+  in-memory path as soon as the whole envelope is in, ahead of the feature
+  timeline and the whole-track beat tracker.
+
+Both write the beats so far to <cache dir>/<cache key>.live.json, which the
+media server hands to the effects (app.py's /beats route) until the final
+result is in the analysis cache. The final result comes from the
+whole-track beat tracker as before and replaces the provisional beats.
+"""
+import json
+import os
+import re
+import tempfile
+
+PREVIEW_SECONDS = 30.0
+CHUNK_SECONDS = 30.0
+OVERLAP_SECONDS = 10.0
+HOLD_SECONDS = 2.0
+SUFFIX = ".live.json"
+_KEY_RE = re.compile(r"[0-9a-f]{64}$")
+
+
+def valid_key(key: str) -> bool:
+    """Whether key looks like a cache key (it becomes part of a file name)."""
+    return bool(_KEY_RE.match(key))
+
+
+def live_path(directory: str, key: str) -> str:
+    return os.path.join(directory, key + SUFFIX)
+
+
+class BeatPublisher:
+    """Writes the provisional beats of one job atomically for the /beats route."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __call__(self, beats) -> None:
+        directory = os.path.dirname(self.path) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"beats": [round(t, 3) for t in beats]}, f)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def discard(self) -> None:
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def read_live(directory: str, key: str):
+    """The provisional beats published for key, or None."""
+    try:
+        with open(live_path(directory, key), encoding="utf-8") as f:
+            return json.load(f)["beats"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def preview(y, sr: int, n_fft: int = 2048, hop_length: int = 512, seconds: float = PREVIEW_SECONDS) -> list:
+    """Beat times in the first seconds of y, tracked the way analysis.beats tracks the whole."""
+    import librosa
+    import numpy as np
+
+    head = np.asarray(y[:int(seconds * sr)], dtype=np.float32)
+    onset_env = librosa.onset.onset_strength(y=head, sr=sr, n_fft=n_fft, hop_length=hop_length,
+                                             aggregate=np.median)
+    _, frames = librosa.beat.beat_track(onset_envelope=onset_env, sr=sr, hop_length=hop_length, trim=False)
+    times = librosa.frames_to_time(frames, sr=sr, hop_length=hop_length)
+    # Like a chunk's, beats next to the cut wait for the chunk that sees past it.
+    times = times[times < len(head) / sr - HOLD_SECONDS]
+    return times.tolist()
+
+
+class ChunkedBeats:
+    """
+    Beat-tracks an onset envelope chunk by chunk while it is being computed.
+    feed() takes consecutive envelope frames, any number at a time;
+    on_beats(beats) is called with all beats so far whenever a chunk is
+    done. Beats in the last HOLD_SECONDS of a chunk wait for the next one,
+    which sees past them; finish() tracks what is left at the end. beats
+    are ones published before (preview()), which later ones continue.
+    """
+
+    def __init__(self, sr: int, hop_length: int, on_beats, chunk_seconds: float = CHUNK_SECONDS,
+                 overlap_seconds: float = OVERLAP_SECONDS, beats=()):
+        import numpy as np
+
+        self.sr = sr
+        self.hop_length = hop_length
+        self.on_beats = on_beats
+        self.chunk = max(1, int(chunk_seconds * sr / hop_length))
+        self.overlap = int(overlap_seconds * sr / hop_length)
+        self.beats = list(beats)  # already published (e.g. the preview); chunks continue past them
+        self._env = np.zeros(0, dtype=np.float32)  # frames not yet tracked, plus the overlap
+        self._offset = 0  # envelope frame index of self._env[0]
+        self._new = 0  # frames fed since the last chunk
+
+    def feed(self, env) -> None:
+        import numpy as np
+
+        env = np.asarray(env, dtype=np.float32)
+        while len(env):
+            take = self.chunk - self._new
+            self._env = np.concatenate([self._env, env[:take]])
+            self._new += len(env[:take])
+            env = env[take:]
+            if self._new >= self.chunk:
+                self._track()
+
+    def finish(self) -> None:
+        """Track the frames fed since the last chunk, up to the end of the envelope."""
+        if self._new:
+            self._track(hold=0.0)
+
+    def _track(self, hold: float = HOLD_SECONDS) -> None:
+        import librosa
+        import numpy as np
+
+        _, frames = librosa.beat.beat_track(onset_envelope=self._env, sr=self.sr,
+                                            hop_length=self.hop_length, trim=False)
+        times = librosa.frames_to_time(frames + self._offset, sr=self.sr, hop_length=self.hop_length)
+        end = (self._offset + len(self._env)) * self.hop_length / self.sr
+        times = times[times < end - hold]
+        if self.beats:
+            # past the last published beat by at least half a beat period
+            period = float(np.median(np.diff(self.beats[-8:]))) if len(self.beats) >= 2 else 0.4
+            times = times[times > self.beats[-1] + 0.5 * period]
+        self.beats.extend(times.tolist())
+        keep = min(len(self._env), self.overlap)
+        self._offset += len(self._env) - keep
+        self._env = self._env[len(self._env) - keep:]
+        self._new = 0
+        self.on_beats(self.beats)
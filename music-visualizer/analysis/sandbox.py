@@ -0,0 +1,125 @@
+# analysis/sandbox.py
+"""
+Resource limits for a single analysis.
+
+A malformed or giant upload could make the decoder or librosa allocate
+until the machine swaps, or spin for minutes. Inside a pool worker that
+takes the worker down with it, and a killed worker breaks the whole
+ProcessPoolExecutor for every session. So each analysis runs like this:
+
+1. run() forks the worker and runs the analysis in the child. The fork
+   inherits the modules the worker preloaded (analysis.jobs.PRELOAD_MODULES:
+   librosa and its numba kernels), so it starts in milliseconds. The
+   child gets an RLIMIT_CPU of max_cpu_seconds. The worker watches the
+   child's anonymous resident memory (RssAnon, which includes the pages it
+   shares with the worker copy-on-write) every POLL_SECONDS and enforces
+   the wall-clock timeout.
+   It kills the child when a limit is hit and raises LimitExceeded with a
+   message fit for the user.
+2. The analysis starts with check_header(), which probes the file
+   (analysis.decode.probe reads only the header) and rejects unreadable
+   files and tracks longer than max_duration before anything is decoded.
+   It runs in the child as well: a header parser can crash on a hostile
+   file too.
+
+A limit of 0 disables it. Where fork() is unavailable (Windows) the
+analysis runs in the worker itself; only the header check applies, and a
+crash breaks the pool (AnalysisService then starts a new one).
+"""
+import multiprocessing
+import signal
+import time
+from collections import namedtuple
+
+POLL_SECONDS = 0.1
+
+Limits = namedtuple("Limits", ["max_rss_bytes", "max_cpu_seconds", "timeout", "max_duration"])
+NO_LIMITS = Limits(0, 0, 0, 0)
+
+
+class LimitExceeded(Exception):
+    """The analysis was stopped (or refused) for exceeding a resource limit."""
+
+
+def check_header(path: str, limits: Limits):
+    """Probe path and refuse it early; returns its analysis.decode.AudioInfo."""
+    from analysis.decode import probe  # soundfile isn't loaded in the Streamlit process
+
+    info = probe(path)  # ValueError for unreadable files
+    if limits.max_duration and info.duration > limits.max_duration:
+        raise LimitExceeded(f"the track is {info.duration / 60:.0f} min long, "
+                            f"the limit is {limits.max_duration / 60:.0f} min")
+    return info
+
+
+def run(fn, args, limits: Limits):
+    """fn(*args) in a forked child under limits; returns its result or re-raises its exception."""
+    if "fork" not in multiprocessing.get_all_start_methods() or limits[:3] == (0, 0, 0):
+        return fn(*args)
+    ctx = multiprocessing.get_context("fork")
+    receiver, sender = ctx.Pipe(duplex=False)
+    child = ctx.Process(target=_child, args=(sender, fn, args, limits.max_cpu_seconds), daemon=True)
+    child.start()
+    sender.close()
+    start = time.monotonic()
+    try:
+        while not receiver.poll(POLL_SECONDS):
+            if not child.is_alive():
+                break
+            if limits.timeout and time.monotonic() - start > limits.timeout:
+                raise LimitExceeded(f"the analysis took longer than {limits.timeout:.0f} s")
+            if limits.max_rss_bytes and _rss_anon(child.pid) > limits.max_rss_bytes:
+                raise LimitExceeded(f"the analysis needed more than "
+                                    f"{limits.max_rss_bytes / 2**20:.0f} MB of memory")
+        try:
+            ok, value = receiver.recv()
+        except EOFError:  # died without sending anything
+            child.join()
+            raise LimitExceeded(_death_message(child.exitcode, limits)) from None
+    finally:
+        if child.is_alive():
+            child.kill()
+        child.join()
+        receiver.close()
+    if ok:
+        return value
+    raise value
+
+
+def _child(sender, fn, args, max_cpu_seconds):
+    if max_cpu_seconds:
+        import resource
+
+        # soft limit sends SIGXCPU; the hard limit a second later SIGKILL
+        resource.setrlimit(resource.RLIMIT_CPU, (int(max_cpu_seconds), int(max_cpu_seconds) + 1))
+    try:
+        message = (True, fn(*args))
+    except BaseException as e:
+        message = (False, e)
+    try:
+        sender.send(message)
+    except Exception as e:  # a result or exception that doesn't pickle
+        sender.send((False, RuntimeError(f"the analysis result could not be sent back: {e}")))
+    sender.close()
+
+
+def _rss_anon(pid: int) -> int:
+    """Anonymous resident memory of pid in bytes (0 where /proc isn't available)."""
+    try:
+        with open(f"/proc/{pid}/status", "rb") as f:
+            for line in f:
+                if line.startswith(b"RssAnon:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _death_message(exitcode, limits: Limits) -> str:
+    if exitcode == -signal.SIGXCPU:
+        return f"the analysis used more than {limits.max_cpu_seconds:.0f} s of CPU time"
+    if exitcode == -signal.SIGKILL:
+        return "the analysis was killed, most likely for running out of memory"
+    if exitcode is not None and exitcode < 0:
+        return f"the analysis crashed ({signal.Signals(-exitcode).name})"
+    return f"the analysis process exited unexpectedly (code {exitcode})"
@@ -0,0 +1,184 @@
+# analysis/stream.py
+"""
+Block-wise beat tracking for long files (DJ mixes, live sets).
+
+librosa.load decodes the whole file into memory before anything happens.
+Here the file is decoded block by block (analysis/decode.py routes it to
+soundfile or an ffmpeg pipe), each block is turned into
+mel frames straight away and only the onset envelope (one float per hop)
+is kept. Audio memory therefore stays at one block no matter how long the
+track is; the envelope itself is ~4 bytes per hop (~2 MB for 90 minutes).
+
+The envelope matches the one beat_track builds internally (onset_strength
+with median aggregation and centered frames): a small sample carry-over
+keeps frames contiguous across block boundaries and the last mel frame of
+each block is remembered so the spectral difference is continuous too.
+
+librosa's global tempo estimate builds a tempogram with ~384 lags per
+envelope frame, which alone needs gigabytes for an hour-long mix, so the
+tempogram is averaged chunk by chunk here and the resulting tempo is handed
+to the beat tracker. Its dynamic programme then runs once over the whole
+envelope, so no beats have to be merged at block boundaries.
+"""
+import contextlib
+import time
+
+import librosa
+import numpy as np
+from analysis.decode import BlockReader
+from analysis.features import FeatureTimeline, beat_annotations
+from analysis.peaks import PeakPyramid
+from analysis.progressive import ChunkedBeats
+from analysis.profiles import get_profile, soxr_quality
+
+BLOCK_FRAMES = 1024  # analysis frames decoded per block
+TEMPO_CHUNK_FRAMES = 4096  # envelope frames per tempogram chunk
+
+
+def onset_envelope(path: str, sr=None, quality: str = "HQ", n_fft: int = 2048,
+                   hop_length: int = 512, n_mels: int = 128, progress=None, on_audio=None,
+                   pcm=None, reader=None, on_envelope=None):
+    """
+    Compute the onset strength envelope of a file without loading it whole.
+    With sr set, blocks are resampled on the fly through a soxr stream.
+    progress(fraction) is called before every block, if given; on_audio(y)
+    receives every decoded mono block at sr, so other features can be
+    computed in the same pass. pcm, if given, is the already decoded mono
+    signal at sr (a memmap from analysis.pcm) and is read instead of path;
+    reader, if given, is the analysis.decode.BlockReader to decode with.
+    on_envelope(env), if given, receives the envelope as it grows, in
+    consecutive pieces.
+    Returns (onset_env, sr).
+    """
+    blocksize = BLOCK_FRAMES * hop_length
+    if pcm is not None:
+        total = len(pcm)
+        blocks = (pcm[start:start + blocksize] for start in range(0, total, blocksize))
+    else:
+        if reader is None:
+            reader = BlockReader(path, sr=sr, quality=quality, blocksize=blocksize)
+        sr, total, blocksize, blocks = reader.sr, reader.info.frames, reader.blocksize, reader
+    mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels)
+
+    # Centered framing: pretend the signal starts n_fft // 2 samples early.
+    carry = np.zeros(n_fft // 2, dtype=np.float32)
+    prev_frame = None
+    peak_db = -np.inf
+    # Same lag + centering compensation as librosa.onset.onset_strength.
+    parts = [np.zeros(1 + n_fft // (2 * hop_length), dtype=np.float32)]
+    n_frames = 0
+    if on_envelope is not None:
+        on_envelope(parts[0])
+
+    def consume(buf, prev_frame, peak_db):
+        n = 1 + (len(buf) - n_fft) // hop_length
+        S = np.abs(librosa.stft(buf[: (n - 1) * hop_length + n_fft], n_fft=n_fft,
+                                hop_length=hop_length, center=False)) ** 2
+        mel = librosa.power_to_db(mel_basis @ S, top_db=None)
+        if prev_frame is not None:
+            mel = np.hstack([prev_frame, mel])
+        # power_to_db's top_db=80 clips against the global max, which isn't
+        # known yet; the running max converges to it after the first loud block.
+        peak_db = max(peak_db, float(mel.max()))
+        mel = np.maximum(mel, peak_db - 80.0)
+        env = np.median(np.maximum(0.0, mel[:, 1:] - mel[:, :-1]), axis=0)
+        return n, env.astype(np.float32), mel[:, -1:], buf[n * hop_length:], peak_db
+
+    for i, y in enumerate(blocks):
+        if progress is not None:
+            progress(min(1.0, i * blocksize / max(total, 1)))
+        y = np.asarray(y, dtype=np.float32)
+        if on_audio is not None:
+            on_audio(y)
+        buf = np.concatenate([carry, y])
+        if len(buf) < n_fft:
+            carry = buf
+            continue
+        n, env, prev_frame, carry, peak_db = consume(buf, prev_frame, peak_db)
+        parts.append(env)
+        n_frames += n
+        if on_envelope is not None:
+            on_envelope(env)
+
+    # Flush the tail (centered framing pads the end as well).
+    buf = np.concatenate([carry, np.zeros(n_fft // 2, dtype=np.float32)])
+    if len(buf) >= n_fft:
+        n, env, prev_frame, carry, peak_db = consume(buf, prev_frame, peak_db)
+        parts.append(env)
+        n_frames += n
+        if on_envelope is not None:
+            on_envelope(env)
+
+    onset_env = np.concatenate(parts)[:n_frames]
+    return onset_env, sr
+
+
+def estimate_tempo(onset_env, sr: int, hop_length: int = 512, ac_size: float = 8.0) -> float:
+    """Same estimate as librosa.feature.tempo, without the full tempogram in memory."""
+    win_length = librosa.time_to_frames(ac_size, sr=sr, hop_length=hop_length).item()
+    padded = np.pad(onset_env, win_length // 2, mode="linear_ramp", end_values=0)
+    total = np.zeros(win_length)
+    count = 0
+    for start in range(0, len(onset_env), TEMPO_CHUNK_FRAMES):
+        n = min(TEMPO_CHUNK_FRAMES, len(onset_env) - start)
+        segment = padded[start:start + n + win_length - 1]
+        tg = librosa.feature.tempogram(onset_envelope=segment, sr=sr, hop_length=hop_length,
+                                       win_length=win_length, center=False)
+        total += tg.sum(axis=1)
+        count += tg.shape[1]
+    mean_tg = (total / max(count, 1))[:, None]
+    tempo = librosa.feature.tempo(tg=mean_tg, sr=sr, hop_length=hop_length, aggregate=None)
+    return float(tempo.item())
+
+
+def track_beats(path: str, profile=None, progress=None, pcm=None, info=None, on_beats=None) -> dict:
+    """
+    Streaming counterpart of analysis.beats.track_beats (same arguments and
+    return value). With a cached pcm entry the memmapped PCM is read instead
+    of decoding; on a miss the decoded blocks are written to it as they go.
+    info is the file's analysis.decode.AudioInfo, if already probed. Beats
+    are passed to on_beats chunk by chunk (analysis.progressive) while the
+    envelope is computed, the last chunk before the whole-track tracker runs.
+    """
+    profile = get_profile(profile)
+    hop_length = profile.hop_length
+    # Decoding dominates; leave the last 10% for tempo estimation and the DP.
+    block_progress = (lambda f: progress(0.9 * f)) if progress is not None else None
+    start = time.perf_counter()
+    y = pcm.load() if pcm is not None else None
+    if y is not None:
+        sr, reader = pcm.sr, None
+        decoded = {"backend": "pcm-cache", "format": "npy", "seconds": time.perf_counter() - start}
+    else:
+        reader = BlockReader(path, sr=profile.sr, quality=soxr_quality(profile), info=info,
+                             blocksize=BLOCK_FRAMES * hop_length)
+        sr = reader.sr
+    timeline, pyramid = FeatureTimeline(sr), PeakPyramid(sr)
+    chunked = ChunkedBeats(sr, hop_length, on_beats) if on_beats is not None else None
+    writer = pcm.writer() if pcm is not None and y is None else contextlib.nullcontext()
+
+    with writer as sink:
+        def on_audio(block):
+            timeline.feed(block)
+            pyramid.feed(block)
+            if sink is not None:
+                sink.write(block)
+
+        onset_env, sr = onset_envelope(path, sr=sr, n_fft=profile.n_fft, hop_length=hop_length,
+                                       progress=block_progress, on_audio=on_audio, pcm=y,
+                                       reader=reader, on_envelope=chunked and chunked.feed)
+    if chunked is not None:
+        chunked.finish()
+    if reader is not None:
+        decoded = {"backend": reader.info.backend, "format": reader.info.format, "seconds": reader.seconds}
+    bpm = estimate_tempo(onset_env, sr, hop_length=hop_length)
+    tempo, beat_frames = librosa.beat.beat_track(
+        onset_envelope=onset_env, sr=sr, hop_length=hop_length, bpm=bpm, trim=False
+    )
+    beats = librosa.frames_to_time(beat_frames, sr=sr, hop_length=hop_length).tolist()
+    if progress is not None:
+        progress(1.0)
+    features = timeline.finish()
+    return {"tempo": float(np.atleast_1d(tempo)[0]), "beats": beats,
+            "beat_info": beat_annotations(features, beats), "features": features, "peaks": pyramid,
+            "decode": decoded}
@@ -0,0 +1,59 @@
+# analysis/warmup.py
+"""
+Warm-up for analysis worker processes.
+
+Importing librosa's beat tracker compiles a set of numba kernels and the
+first beat_track call compiles a few more, which costs tens of seconds in a
+fresh process. Every analysis worker runs warm_up() once when it starts:
+the compiled kernels are written to NUMBA_CACHE_DIR (librosa's jit
+functions use cache=True), so after the first start this is mostly a disk
+read, and the first real track doesn't pay for compilation either way.
+"""
+import os
+import tempfile
+import time
+
+WARMUP_SECONDS = 8.0
+WARMUP_SR = 22050
+WARMUP_BPM = 120.0
+
+
+def configure_numba_cache(directory: str) -> None:
+    """Point numba's on-disk cache at directory. Must run before numba is imported."""
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        os.environ.setdefault("NUMBA_CACHE_DIR", directory)
+
+
+def click_track(seconds: float = WARMUP_SECONDS, sr: int = WARMUP_SR, bpm: float = WARMUP_BPM):
+    """Mono float32 clicks (short decaying noise bursts) at a steady tempo."""
+    import numpy as np
+
+    y = np.zeros(int(seconds * sr), dtype=np.float32)
+    burst = np.random.default_rng(0).uniform(-1, 1, int(0.02 * sr)).astype(np.float32)
+    burst *= np.exp(-np.linspace(0, 8, burst.size, dtype=np.float32))
+    for start in np.arange(0, seconds, 60.0 / bpm):
+        i = int(start * sr)
+        n = min(burst.size, y.size - i)
+        y[i:i + n] += burst[:n]
+    return y
+
+
+def warm_up() -> float:
+    """Run both analysis pipelines for every profile on a synthetic track. Returns seconds."""
+    import soundfile as sf
+
+    from analysis import beats, stream
+    from analysis.profiles import PROFILES
+
+    start = time.perf_counter()
+    fd, path = tempfile.mkstemp(suffix=".wav", prefix="sonicplay-warmup-")
+    os.close(fd)
+    try:
+        sf.write(path, click_track(), WARMUP_SR)
+        for name in PROFILES:
+            beats.track_beats(path, profile=name)
+            stream.track_beats(path, profile=name)
+    finally:
+        os.remove(path)
+    return time.perf_counter() - start
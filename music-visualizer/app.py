@@ -1,32 +1,86 @@
 import streamlit as st
-import librosa
-import numpy as np
-import base64
-import tempfile
+import json
 import os
 from pathlib import Path
-import requests
+
+import config
+import effects
+from analysis.cache import AnalysisCache, hash_file
+from analysis.jobs import AnalysisCancelled, AnalysisService
+from analysis.profiles import DEFAULT_PROFILE, PROFILES
+from analysis.sandbox import Limits
+from assets import AssetRegistry
+from media_server import MediaServer, data_uri
+from shared_audio import visual_src
+from spool import Spool
 
 st.set_page_config(page_title="SonicPlay - Music Visualizer", layout="wide")
 
 BASE_DIR = os.path.dirname(__file__)
 STATIC_DIR = os.path.join(BASE_DIR, "static")
 
-def load_base64(filename: str) -> str:
-    path = os.path.join(STATIC_DIR, filename)
+# ------------------------
+# Media server (audio and static assets) and asset registry
+# ------------------------
+def serve_peaks(key: str, params: dict):
+    """Media server route: the waveform peaks of an analyzed track for ?width=<pixels>."""
+    from analysis import peaks  # numpy loads with the first waveform, not at startup
+    body = peaks.level_bytes(config.CACHE_DIR, key, int(params.get("width", ["1024"])[0]))
+    return None if body is None else (body, "application/octet-stream")
+
+def serve_beats(key: str, params: dict):
+    """Media server route: the beats of a track, provisional while its analysis runs."""
+    from analysis import progressive
+    from effects.packing import pack_timeline, pack_times
+    if not progressive.valid_key(key):
+        return None
+    result = AnalysisCache(config.CACHE_DIR, config.CACHE_MAX_BYTES).get(key)
+    if result is not None:
+        body = {"done": True, "beats": pack_times(result["beats"]),
+                "beat_info": pack_timeline(result.get("beat_info")),
+                "features": pack_timeline(result.get("features"))}
+    else:
+        beats = progressive.read_live(config.CACHE_DIR, key)
+        if beats is None:
+            return None
+        body = {"done": False, "beats": pack_times(beats)}
+    return json.dumps(body).encode(), "application/json"
+
+def serve_features(key: str, params: dict):
+    """Media server route: the feature timeline of an analyzed track."""
+    from analysis import progressive
+    from effects.packing import pack_timeline
+    if not progressive.valid_key(key):
+        return None
+    result = AnalysisCache(config.CACHE_DIR, config.CACHE_MAX_BYTES).get(key)
+    if result is None or result.get("features") is None:
+        return None
+    return json.dumps(pack_timeline(result["features"])).encode(), "application/json"
+
+@st.cache_resource
+def get_media_server():
+    if not config.MEDIA_SERVER_ENABLED:
+        return None
     try:
-        with open(path, "rb") as f:
-            return base64.b64encode(f.read()).decode()
-    except Exception:
-        return ""
+        server = MediaServer(config.MEDIA_HOST, config.MEDIA_PORT, config.MEDIA_PUBLIC_URL).start()
+    except OSError:
+        return None  # port taken (e.g. a second worker process): inline audio instead
+    server.route("peaks", serve_peaks)
+    server.route("features", serve_features)
+    server.route("beats", serve_beats, immutable=False)
+    return server
+
+@st.cache_resource
+def get_assets():
+    return AssetRegistry(STATIC_DIR, get_media_server())
 
-favicon_b64 = load_base64("favicon.ico")
-logo_b64 = load_base64("logo.png")
-synthwave_video_path = os.path.join(STATIC_DIR, "synthwave_bg.mp4")
+assets = get_assets()
+favicon_src = assets.src("favicon.ico")
+logo_src = assets.src("logo.png")
 
 def show_intro():
-    favicon_link = f'<link rel="icon" href="data:image/x-icon;base64,{favicon_b64}">' if favicon_b64 else ""
-    logo_img = f'<img src="data:image/png;base64,{logo_b64}" class="transparent-logo" width="180">' if logo_b64 else ""
+    favicon_link = f'<link rel="icon" href="{favicon_src}">' if favicon_src else ""
+    logo_img = f'<img src="{logo_src}" class="transparent-logo" width="180">' if logo_src else ""
     st.markdown(
         f"""
         {favicon_link}
@@ -51,7 +105,7 @@ def show_intro():
 
 show_intro()
 
-logo_img_small = f'<img src="data:image/png;base64,{logo_b64}" width="60" height="60">' if logo_b64 else ""
+logo_img_small = f'<img src="{logo_src}" width="60" height="60">' if logo_src else ""
 st.markdown(
     f"""
     <div style="display:flex; align-items:center; gap:12px;">
@@ -62,6 +116,116 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
+# ------------------------
+# Beat analysis (background workers, cached on disk and shared across sessions)
+# ------------------------
+@st.cache_resource
+def get_analysis_service():
+    service = AnalysisService(
+        config.CACHE_DIR, config.CACHE_MAX_BYTES, config.ANALYSIS_WORKERS,
+        numba_cache_dir=config.NUMBA_CACHE_DIR, warm=config.ANALYSIS_WARMUP,
+        pcm_dir=config.PCM_CACHE_DIR, pcm_max_bytes=config.PCM_CACHE_MAX_BYTES,
+        progressive=config.ANALYSIS_PROGRESSIVE and get_media_server() is not None,
+        limits=Limits(config.ANALYSIS_MAX_RSS_MB * 2**20, config.ANALYSIS_MAX_CPU_SECONDS,
+                      config.ANALYSIS_TIMEOUT, config.ANALYSIS_MAX_DURATION),
+    )
+    if config.ANALYSIS_WARMUP:
+        service.warm_up()
+    return service
+
+def load_track_beats(path: str, content_hash: str):
+    """Start analyzing a track with the selected profile, superseding any job still running."""
+    old_job = st.session_state.pop("analysis_job", None)
+    if old_job is not None:
+        old_job.cancel()
+    st.session_state["beats"] = []
+    st.session_state["beat_info"] = None
+    st.session_state["features"] = None
+    st.session_state["analysis_key"] = ""  # names the analysis result behind the three above
+    st.session_state["peaks_src"] = ""
+    st.session_state["features_src"] = ""
+    st.session_state["decode_info"] = None
+    st.session_state["beats_src"] = ""
+    st.session_state["beats_profile"] = analysis_profile
+    st.session_state["track_path"] = path
+    st.session_state["track_hash"] = content_hash
+    job = get_analysis_service().submit(path, content_hash, analysis_profile)
+    if job.done():  # cache hit
+        apply_analysis_result(job)
+    else:
+        st.session_state["analysis_job"] = job
+        if get_analysis_service().progressive:
+            st.session_state["beats_src"] = f"{get_media_server().public_url}/beats/{job.key}"
+
+def inline_features():
+    """The feature timeline to embed in a page: none when the page can fetch it from features_src."""
+    if st.session_state.get("features_src"):
+        return None
+    return st.session_state.get("features")
+
+def apply_analysis_result(job):
+    try:
+        result = job.result()
+        st.session_state["beats"] = result["beats"]
+        st.session_state["beat_info"] = result.get("beat_info")
+        st.session_state["features"] = result.get("features")
+        st.session_state["analysis_key"] = job.key
+        st.session_state["decode_info"] = result.get("decode")
+        server = get_media_server()
+        if server is not None and result.get("peaks"):
+            st.session_state["peaks_src"] = f"{server.public_url}/peaks/{job.key}"
+        if server is not None and result.get("features") is not None:
+            # Pages fetch the timeline instead of each embedding a copy of it.
+            st.session_state["features_src"] = f"{server.public_url}/features/{job.key}"
+    except AnalysisCancelled:
+        pass
+    except Exception as e:
+        st.session_state["analysis_error"] = f"Beat analysis failed: {e}"
+
+@st.fragment(run_every=0.5)
+def analysis_progress():
+    job = st.session_state.get("analysis_job")
+    if job is not None and job.done():
+        del st.session_state["analysis_job"]
+        apply_analysis_result(job)
+        # Within a full run the rest of the page is drawn with the result anyway.
+        if st.session_state.get("visualizer_shown") and not st.session_state.get("rendering_page"):
+            # Rerunning the page would tear down the visualizer the user started
+            # (one following the live beats gets the final ones itself); the
+            # result is kept for the next interaction instead.
+            if "analysis_error" in st.session_state:
+                st.session_state["analysis_notice"] = ("error", st.session_state.pop("analysis_error"))
+            elif not st.session_state.get("visualizer_live"):
+                st.session_state["analysis_notice"] = (
+                    "success", "Beats are ready: click ▶️ Start Visualizer again to sync to them.")
+        elif not st.session_state.get("rendering_page"):
+            st.rerun()
+        job = None
+    if job is not None:
+        st.progress(job.progress(), text="Analyzing beats…")
+    elif "analysis_notice" in st.session_state:
+        kind, text = st.session_state["analysis_notice"]
+        getattr(st, kind)(text)
+
+# ------------------------
+# Audio delivery (local range-request server, base64 only as a fallback)
+# ------------------------
+@st.cache_resource
+def get_spool():
+    return Spool(config.SPOOL_DIR, config.SPOOL_MAX_BYTES)
+
+def spool_session():
+    """This browser session's handle on the spool (holds its current track)."""
+    if "spool_session" not in st.session_state:
+        st.session_state["spool_session"] = get_spool().session()
+    return st.session_state["spool_session"]
+
+def audio_source(path: str, content_hash: str) -> str:
+    server = get_media_server()
+    if server is not None:
+        return server.register(path, content_hash)
+    return data_uri(path)
+
 # ------------------------
 # Sidebar - Guest & Upload
 # ------------------------
@@ -74,17 +238,31 @@ if "guest" in st.session_state:
 else:
     st.sidebar.info("Click **Continue as Guest** to start.")
 
+profile_names = list(PROFILES)
+analysis_profile = st.sidebar.selectbox(
+    "Analysis profile", profile_names, index=profile_names.index(DEFAULT_PROFILE),
+    help="fast: low sample rate, quickest. accurate: native sample rate, slowest.",
+)
+# Creating the service on the first page load starts the worker warm-up.
+warmup = get_analysis_service().warmup_status()
+if warmup["state"] == "warming":
+    st.sidebar.caption("Warming up the beat tracker…")
+elif warmup["state"] == "ready":
+    st.sidebar.caption(f"Beat tracker ready (warm-up took {warmup['seconds']:.1f}s)")
+elif warmup["state"] == "failed":
+    st.sidebar.warning(f"Beat tracker warm-up failed: {warmup['error']}")
+analysis_stats = get_analysis_service().stats()
+if analysis_stats["coalesced"]:
+    st.sidebar.caption(f"Analyses: {analysis_stats['started']} run, {analysis_stats['coalesced']} shared "
+                       f"between sessions, {analysis_stats['cached']} from cache")
+
 # ------------------------
 # JioSaavn search (saavn.dev API)
 # ------------------------
 @st.cache_data(ttl=300)
 def saavn_search(query: str, n: int = 10):
-    url = f"https://saavn.dev/api/search/songs?query={query}&limit={n}"
-    resp = requests.get(url, timeout=10)
-    data = resp.json()
-    if not data.get("success"):
-        return []
-    return data["data"]["results"]
+    import saavn  # requests/tenacity load on first search, not at startup
+    return saavn.search(query, n)
 
 # ------------------------
 # Audio state
@@ -112,16 +290,12 @@ if search_query:
             if media_url:
                 if st.sidebar.button("▶ Load", key=f"saavn_{idx}"):
                     try:
-                        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-                        tmp.write(requests.get(media_url).content)
-                        tmp.flush()
-                        y, sr = librosa.load(tmp.name, sr=None, mono=True)
-                        tempo, beat_frames = librosa.beat.beat_track(y=y, sr=sr, trim=False)
-                        beats = librosa.frames_to_time(beat_frames, sr=sr).tolist()
-                        st.session_state["beats"] = beats
-                        st.session_state["audio_url_data"] = media_url
+                        import saavn
+                        path, content_hash = saavn.download(media_url, spool_session())
+                        load_track_beats(path, content_hash)
+                        st.session_state["audio_url_data"] = audio_source(path, content_hash)
                         st.session_state["now_playing"] = f"{title} — {artists}"
-                        st.experimental_rerun()
+                        st.rerun()
                     except Exception as e:
                         st.sidebar.error(f"Failed to process beats: {e}")
     except Exception as e:
@@ -144,18 +318,12 @@ if demo_files:
         demo_path_selected = next(f for f in demo_files if Path(f).name == selected_demo)
         if st.session_state.get("last_demo_selected") != demo_path_selected:
             try:
-                y, sr = librosa.load(demo_path_selected, sr=None, mono=True)
-                tempo, beat_frames = librosa.beat.beat_track(y=y, sr=sr, trim=False)
-                beats = librosa.frames_to_time(beat_frames, sr=sr).tolist()
-                st.session_state["beats"] = beats
-                with open(demo_path_selected, "rb") as f:
-                    data = f.read()
-                    b64 = base64.b64encode(data).decode()
-                    mime = "audio/mpeg" if Path(demo_path_selected).suffix.lower() != ".wav" else "audio/wav"
-                    st.session_state["audio_url_data"] = f"data:{mime};base64,{b64}"
-                    st.session_state["now_playing"] = Path(demo_path_selected).name
-                    st.session_state["last_demo_selected"] = demo_path_selected
-                st.experimental_rerun()
+                content_hash = hash_file(demo_path_selected)
+                load_track_beats(demo_path_selected, content_hash)
+                st.session_state["audio_url_data"] = audio_source(demo_path_selected, content_hash)
+                st.session_state["now_playing"] = Path(demo_path_selected).name
+                st.session_state["last_demo_selected"] = demo_path_selected
+                st.rerun()
             except Exception as e:
                 st.sidebar.error(f"Demo load failed: {e}")
 
@@ -164,53 +332,79 @@ if uploaded:
     if st.session_state.get("last_uploaded_name") != uploaded_name:
         try:
             suffix = Path(uploaded.name).suffix
-            tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-            tmp.write(uploaded.read())
-            tmp.flush()
-            y, sr = librosa.load(tmp.name, sr=None, mono=True)
-            tempo, beat_frames = librosa.beat.beat_track(y=y, sr=sr, trim=False)
-            beats = librosa.frames_to_time(beat_frames, sr=sr).tolist()
-            st.session_state["beats"] = beats
-            with open(tmp.name, "rb") as f:
-                data = f.read()
-                b64 = base64.b64encode(data).decode()
-                mime = "audio/mpeg" if suffix.lower() != ".wav" else "audio/wav"
-                st.session_state["audio_url_data"] = f"data:{mime};base64,{b64}"
-                st.session_state["now_playing"] = uploaded_name
-                st.session_state["last_uploaded_name"] = uploaded_name
-            st.experimental_rerun()
+            # Hash and spool straight from the upload's buffer (no extra copy);
+            # the worker decodes the spooled file and the media server streams it.
+            path, content_hash = spool_session().store_bytes(uploaded.getbuffer(), suffix)
+            load_track_beats(path, content_hash)
+            st.session_state["audio_url_data"] = audio_source(path, content_hash)
+            st.session_state["now_playing"] = uploaded_name
+            st.session_state["last_uploaded_name"] = uploaded_name
+            st.rerun()
         except Exception as e:
             st.sidebar.error(f"Upload failed: {e}")
 
+# Profile switched for the current track: re-analyze (usually a cache hit).
+track_path = st.session_state.get("track_path")
+if track_path and st.session_state.get("beats_profile") != analysis_profile:
+    try:
+        load_track_beats(track_path, st.session_state["track_hash"])
+    except Exception as e:
+        st.sidebar.error(f"Re-analysis failed: {e}")
+
+# Set again below if this run shows a visualizer; analysis_progress() reads them
+# on its own reruns, after this one is done.
+st.session_state["rendering_page"] = True
+st.session_state["visualizer_shown"] = False
+st.session_state["visualizer_live"] = False
+st.session_state.pop("analysis_notice", None)
+if st.session_state.get("analysis_job") is not None:
+    with st.sidebar:
+        analysis_progress()
+if "analysis_error" in st.session_state:
+    st.sidebar.error(st.session_state.pop("analysis_error"))
+decode_info = st.session_state.get("decode_info")
+if decode_info:
+    st.sidebar.caption(f"Decoded {decode_info['format'].upper()} with {decode_info['backend']} "
+                       f"in {decode_info['seconds']:.2f}s")
+
 # ------------------------
 # Visual settings
 # ------------------------
 st.sidebar.markdown("---")
-mode = st.sidebar.selectbox("Visualizer Mode", ["Ripple", "Synthwave", "Ocean Reverb", "Resonance", "Mesh", "BeatSaber"])
-sensitivity = st.sidebar.slider("Beat sensitivity", 0.3, 2.5, 1.0, step=0.1)
-theme = st.sidebar.selectbox("Theme", ["Neon (dark)", "Light", "Blue", "Cyberpunk", "Vaporwave", "Galaxy"])
-particle_count = st.sidebar.slider("Background particle count", 20, 120, 55, step=5)
-if mode == "Synthwave":
-    intensity = st.sidebar.slider("Synthwave Intensity", 0.5, 3.0, 1.0, step=0.1)
-    grid_speed = st.sidebar.slider("Synthwave Grid Speed", 0.1, 2.0, 0.6, step=0.1)
-    grid_cols = st.sidebar.slider("Synthwave Grid Columns", 12, 60, 36, step=2)
+def param_widget(param):
+    if isinstance(param, effects.Choice):
+        return st.sidebar.selectbox(param.label, param.options, index=param.options.index(param.default))
+    return st.sidebar.slider(param.label, param.min, param.max, param.default, step=param.step)
+
+# Each effect declares its own controls (effects/__init__.py); its module is
+# only imported when the visualizer is started.
+mode = st.sidebar.selectbox("Visualizer Mode", list(effects.EFFECTS))
+effect = effects.get_effect(mode)
+effect_params = {param.name: param_widget(param) for param in effect.params}
+with st.sidebar.expander("Static assets"):
+    for row in assets.report():
+        st.caption(f"{row['name']}: {row['bytes'] / 1024:.0f} KB, served {'inline' if row['delivery'] == 'inline' else 'by URL'}")
 
 # ------------------------
 # Main UI
 # ------------------------
-from effects import ripple, synthwave, ocean_reverb, resonance, mesh, beatsaber
-
 col1, col2 = st.columns([1, 2])
 with col1:
     st.header("Player")
     current_audio = st.session_state.get("audio_url_data", None)
+    # The player owns the track's <audio> element; the visualizer borrows it by id.
+    track_id = (st.session_state.get("track_hash") or "")[:16]
     now_playing = st.session_state.get("now_playing", None)
     if now_playing:
         st.markdown(f"**Now Playing:** {now_playing}")
     if current_audio:
         try:
             from custom_player import render_custom_player
-            render_custom_player(current_audio, logo_b64=logo_b64)
+            render_custom_player(current_audio, logo_src=logo_src, track_id=track_id,
+                                 features=inline_features(),
+                                 peaks_src=st.session_state.get("peaks_src", ""),
+                                 features_src=st.session_state.get("features_src", ""),
+                                 payload_key=st.session_state.get("analysis_key"))
         except Exception as e:
             st.error(f"Custom player error: {e}")
             st.audio(current_audio)
@@ -225,27 +419,28 @@ with col2:
     if replay_intro:
         show_intro()
     elif start_clicked and st.session_state.get("audio_url_data", None):
-        audio_for_visual = st.session_state["audio_url_data"]
+        st.session_state["visualizer_shown"] = True
+        audio_for_visual = visual_src(st.session_state["audio_url_data"])
         beats = st.session_state.get("beats", [])
-        if mode == "Ripple":
-            html = ripple.render_effect(beats, theme, sensitivity, particle_count, audio_for_visual)
-            st.components.v1.html(html, height=680, scrolling=False)
-        elif mode == "Synthwave":
-            video_path = synthwave_video_path if os.path.exists(synthwave_video_path) else os.path.join("static", "synthwave_bg.mp4")
-            html = synthwave.get_html(audio_src=audio_for_visual, beats=beats, intensity=intensity, grid_speed=grid_speed, grid_cols=grid_cols, video_path=video_path)
-            st.components.v1.html(html, height=700, scrolling=False)
-        elif mode == "Ocean Reverb":
-            html = ocean_reverb.get_html(audio_for_visual, beats=beats)
-            st.components.v1.html(html, height=700, scrolling=False)
-        elif mode == "Resonance":
-            html = resonance.get_html(audio_for_visual, beats=beats)
-            st.components.v1.html(html, height=720, scrolling=False)
-        elif mode == "Mesh":
-            html = mesh.get_html(audio_for_visual, beats=beats)
-            st.components.v1.html(html, height=720, scrolling=False)
-        elif mode == "BeatSaber":
-            html = beatsaber.get_html(audio_for_visual, beats=beats)
-            st.components.v1.html(html, height=720, scrolling=False)
+        live = st.session_state.get("analysis_job") is not None
+        if live and st.session_state.get("beats_src"):
+            st.session_state["visualizer_live"] = True
+            st.info("Beats are still being analyzed; they sync in as the analysis progresses.")
+        elif live:
+            st.info("Beats are still being analyzed, so this run starts without beat sync.")
+        # Only what the effect declares it needs is built.
+        payload_sources = {
+            "beats": lambda: beats,
+            "beat_info": lambda: st.session_state.get("beat_info"),
+            "features": inline_features,
+            "features_src": lambda: st.session_state.get("features_src", ""),
+            "beats_src": lambda: st.session_state.get("beats_src", "") if live else "",
+            "video_src": lambda: assets.src("synthwave_bg.mp4"),
+        }
+        payload = {need: payload_sources[need]() for need in effect.needs}
+        html = effects.render(mode, audio_for_visual, track_id=track_id, payload=payload, params=effect_params,
+                              payload_key=st.session_state.get("analysis_key"))
+        st.components.v1.html(html, height=effect.height, scrolling=False)
 
 st.markdown("---")
 st.markdown("🎧 **Tip:** Use headphones for best experience. Songs may take a moment to load.", unsafe_allow_html=True)
@@ -254,3 +449,4 @@ st.markdown(
     Created by <b>Nilam Chakraborty</b></div>""",
     unsafe_allow_html=True,
 )
+st.session_state["rendering_page"] = False
@@ -0,0 +1,59 @@
+# assets.py
+"""
+Static assets (favicon, logo, synthwave background video).
+
+Each file is read, hashed and, if needed, base64-encoded at most once per
+process instead of on every rerun or effect render. When the media server
+is running an asset is served from it under a content-hash URL, which the
+browser caches for a year; otherwise it falls back to a data URI that is
+built once and reused.
+"""
+import os
+import threading
+from collections import namedtuple
+
+from analysis.cache import hash_file
+from media_server import data_uri, mime_type
+
+Asset = namedtuple("Asset", ["name", "path", "size", "mime", "src"])
+
+
+class AssetRegistry:
+    def __init__(self, directory: str, server=None):
+        self.directory = directory
+        self._server = server
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str):
+        """The Asset for a file in the static directory, or None if it doesn't exist."""
+        with self._lock:
+            if name not in self._assets:
+                self._assets[name] = self._load(name)
+            return self._assets[name]
+
+    def src(self, name: str) -> str:
+        """URL (or data URI) to put in src/href, "" for a missing asset."""
+        asset = self.get(name)
+        return asset.src if asset else ""
+
+    def report(self) -> list:
+        """Size and delivery of every asset loaded so far."""
+        with self._lock:
+            assets = [a for a in self._assets.values() if a is not None]
+        return [{
+            "name": a.name,
+            "bytes": a.size,
+            "delivery": "inline" if a.src.startswith("data:") else "url",
+            "src_bytes": len(a.src),
+        } for a in sorted(assets)]
+
+    def _load(self, name: str):
+        path = os.path.join(self.directory, name)
+        if not os.path.isfile(path):
+            return None
+        if self._server is not None:
+            src = self._server.register(path, hash_file(path), route="static")
+        else:
+            src = data_uri(path, static=True)
+        return Asset(name, path, os.path.getsize(path), mime_type(path, static=True), src)
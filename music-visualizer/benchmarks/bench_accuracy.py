@@ -0,0 +1,137 @@
+# benchmarks/bench_accuracy.py
+"""
+Beat tracking accuracy and speed on synthetic tracks with known beats.
+
+    python -m benchmarks.bench_accuracy [--profiles balanced,fast] [--json out.json]
+                                        [--baseline base.json] [--tolerance 1.25] [--max-f-drop 0.02]
+
+Each case (click tracks and drum loops at different tempi, with swing,
+a tempo ramp and a tempo jump) is rendered with benchmarks/synth.py and
+run through analysis.beats.track_beats, the same call the app's workers
+make. Reported per case and profile: F-measure (+/-70 ms), continuity
+(CMLt), median offset of the detected beats, wall time, realtime factor
+(analysis seconds per audio second) and peak heap.
+
+The exit status is 1 when a case drops below its F-measure floor, runs
+slower than --max-realtime, or, with --baseline, is more than --tolerance
+times slower or loses more than --max-f-drop F-measure against the saved run.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from collections import namedtuple
+
+from benchmarks import synth
+from benchmarks.common import (compare, continuity, environment, f_measure, load_results,
+                               measure, median_offset, print_table, write_json)
+from analysis import beats
+from analysis.profiles import DEFAULT_PROFILE, PROFILES
+
+# min_f_measure: floor for the default profile; a bit under what librosa
+# 0.11 reaches, so only real regressions trip it.
+Case = namedtuple("Case", ["name", "duration", "beat_times", "hits", "min_f_measure"])
+
+CASES = [
+    Case("clicks_120", 30, lambda: synth.steady_beats(30, 120), synth.click_hits, 0.95),
+    Case("clicks_90", 30, lambda: synth.steady_beats(30, 90), synth.click_hits, 0.95),
+    Case("clicks_150", 30, lambda: synth.steady_beats(30, 150), synth.click_hits, 0.95),
+    Case("drums_100", 40, lambda: synth.steady_beats(40, 100), synth.drum_hits, 0.95),
+    Case("drums_100_swing", 40, lambda: synth.steady_beats(40, 100),
+         lambda times: synth.drum_hits(times, swing=0.66), 0.95),
+    Case("drums_ramp_100_130", 60, lambda: synth.ramp_beats(60, 100, 130), synth.drum_hits, 0.85),
+    # librosa's single global tempo locks onto half of the first section's tempo here
+    Case("drums_step_120_90", 60, lambda: synth.step_beats(60, 120, 90), synth.drum_hits, 0.5),
+]
+
+
+def render_case(case, directory: str):
+    """Write the case to a WAV file and return (path, reference beat times)."""
+    reference = case.beat_times()
+    path = os.path.join(directory, f"{case.name}.wav")
+    synth.write_track(path, synth.render_blocks(case.hits(reference), case.duration))
+    return path, reference.tolist()
+
+
+def run(profiles, cases=CASES):
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="sonicplay-accuracy-") as directory:
+        tracks = [(case, *render_case(case, directory)) for case in cases]
+        for profile in profiles:
+            beats.track_beats(tracks[0][1], profile)  # numba warm-up
+            for case, path, reference in tracks:
+                result, seconds, peak = measure(beats.track_beats, path, profile)
+                found = result["beats"]
+                offset = median_offset(reference, found)
+                rows.append({
+                    "case": case.name,
+                    "profile": profile,
+                    "seconds": seconds,
+                    "realtime": seconds / case.duration,
+                    "peak_mb": peak / 1e6,
+                    "tempo": result["tempo"],
+                    "f_measure": f_measure(reference, found),
+                    "continuity": continuity(reference, found),
+                    "offset_ms": None if offset is None else offset * 1000,
+                })
+    return rows
+
+
+def check(rows, min_f, max_realtime):
+    failures = []
+    for row in rows:
+        floor = min_f.get(row["case"], 0.0) if row["profile"] == DEFAULT_PROFILE else 0.0
+        if row["f_measure"] < floor:
+            failures.append(f"{row['case']}/{row['profile']}: F-measure {row['f_measure']:.3f} < {floor}")
+        if max_realtime and row["realtime"] > max_realtime:
+            failures.append(f"{row['case']}/{row['profile']}: realtime {row['realtime']:.4f} > {max_realtime}")
+    return failures
+
+
+def check_accuracy_drop(rows, baseline, max_drop):
+    base = {(r["case"], r["profile"]): r for r in baseline}
+    failures = []
+    for row in rows:
+        ref = base.get((row["case"], row["profile"]))
+        if ref is not None and row["f_measure"] < ref["f_measure"] - max_drop:
+            failures.append(f"{row['case']}/{row['profile']}: F-measure {ref['f_measure']:.3f} -> {row['f_measure']:.3f}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profiles", default=DEFAULT_PROFILE, help=f"comma-separated, from {', '.join(PROFILES)}")
+    parser.add_argument("--max-realtime", type=float, default=0.1,
+                        help="fail above this many analysis seconds per second of audio")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="allowed slowdown against the baseline")
+    parser.add_argument("--max-f-drop", type=float, default=0.02, help="allowed F-measure loss against the baseline")
+    args = parser.parse_args()
+
+    profiles = [p for p in args.profiles.split(",") if p]
+    unknown = [p for p in profiles if p not in PROFILES]
+    if unknown:
+        parser.error(f"unknown profiles: {', '.join(unknown)}")
+
+    rows = run(profiles)
+    failures = check(rows, {c.name: c.min_f_measure for c in CASES}, args.max_realtime)
+    columns = ["case", "profile", "seconds", "realtime", "peak_mb", "tempo", "f_measure", "continuity", "offset_ms"]
+    if args.baseline:
+        baseline = load_results(args.baseline)
+        failures += compare(rows, baseline, key=("case", "profile"), metrics={"seconds": 0.01},
+                            tolerance=args.tolerance)
+        failures += check_accuracy_drop(rows, baseline, args.max_f_drop)
+        columns.append("seconds_vs_base")
+    print_table(rows, columns)
+    if args.json:
+        write_json({"meta": environment(), "results": rows}, args.json)
+    if failures:
+        print(f"\n{len(failures)} check(s) failed:")
+        for line in failures:
+            print("  " + line)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_decode.py
+"""
+Decode speed of every backend in analysis/decode.py, per format.
+
+    python -m benchmarks.bench_decode [--durations 30,600] [--formats wav,flac,ogg,mp3,m4a]
+                                      [--profile balanced] [--json out.json]
+
+Each synthetic click track is decoded to mono PCM at the profile's rate by
+every backend that can open it, and by plain librosa.load for reference.
+"routed" marks the backend analysis.decode.probe picks for the file. M4A
+tracks are transcoded from the WAV version with ffmpeg, so they are
+skipped when ffmpeg isn't installed.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import warnings
+
+from benchmarks import synth
+from benchmarks.common import environment, measure, print_table, write_json
+from analysis import decode
+from analysis.profiles import get_profile, soxr_quality
+
+
+def track(tracks_dir: str, duration: float, fmt: str):
+    """Path of the click track in fmt, or None if it can't be made here."""
+    if fmt in synth.FORMATS:
+        return synth.click_track(tracks_dir, duration, fmt)
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return None
+    wav = synth.click_track(tracks_dir, duration, "wav")
+    path = os.path.splitext(wav)[0] + "." + fmt
+    if not os.path.exists(path):
+        subprocess.run([ffmpeg, "-nostdin", "-v", "error", "-y", "-i", wav, path], check=True)
+    return path
+
+
+def librosa_load(path, sr, res_type):
+    import librosa
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        return librosa.load(path, sr=sr, mono=True, res_type=res_type)
+
+
+def run(tracks_dir, durations, formats, profile_name=None):
+    profile = get_profile(profile_name)
+    backends = decode.available_backends()
+    # import librosa (and whatever audioread loads) before anything is timed
+    librosa_load(synth.click_track(tracks_dir, 10, "wav"), profile.sr, profile.res_type)
+    rows = []
+    for fmt in formats:
+        for duration in durations:
+            path = track(tracks_dir, duration, fmt)
+            if path is None:
+                print(f"skipping {fmt}: ffmpeg is needed to create it")
+                break
+            routed = decode.probe(path).backend
+            for backend in backends:
+                try:
+                    info = decode.probe(path, backends=(backend,))
+                except ValueError:
+                    continue  # this backend can't read the format
+                result, seconds, peak = measure(decode.load, path, sr=profile.sr, quality=soxr_quality(profile),
+                                                res_type=profile.res_type, info=info)
+                rows.append(_row(fmt, duration, backend, seconds, peak, len(result.y), routed=backend == routed))
+                del result
+            (y, _), seconds, peak = measure(librosa_load, path, profile.sr, profile.res_type)
+            rows.append(_row(fmt, duration, "librosa.load", seconds, peak, len(y), routed=False))
+            del y
+    return rows
+
+
+def _row(fmt, duration, backend, seconds, peak, samples, routed):
+    return {"format": fmt, "duration": duration, "backend": backend, "routed": "yes" if routed else "",
+            "seconds": seconds, "x_realtime": duration / seconds, "peak_mb": peak / 1e6, "samples": samples}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--durations", default="30,600", help="track lengths in seconds")
+    parser.add_argument("--formats", default=",".join(list(synth.FORMATS) + ["m4a"]))
+    parser.add_argument("--profile", help="analysis profile (default: the configured one)")
+    parser.add_argument("--tracks-dir", default=os.path.join(tempfile.gettempdir(), "sonicplay-bench"))
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    durations = sorted(float(d) for d in args.durations.split(","))
+    formats = [f for f in args.formats.split(",") if f]
+    rows = run(args.tracks_dir, durations, formats, args.profile)
+    print_table(rows, ["format", "duration", "backend", "routed", "seconds", "x_realtime", "peak_mb"])
+    if args.json:
+        write_json({"meta": environment(), "results": rows}, args.json)
+
+
+if __name__ == "__main__":
+    main()
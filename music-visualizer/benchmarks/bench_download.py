@@ -0,0 +1,69 @@
+# benchmarks/bench_download.py
+"""
+JioSaavn media download: pooled streaming downloader vs. the old
+requests.get(url).content, against the local fake server.
+
+    python -m benchmarks.bench_download [--runs 10] [--latency 0.02] [--json out.json]
+
+Reports wall time per download and peak Python heap (tracemalloc).
+"""
+import argparse
+import tempfile
+import tracemalloc
+
+import requests
+
+from benchmarks.common import print_table, timed, write_json
+from benchmarks.fake_saavn import FakeSaavn
+import saavn
+from spool import Spool
+
+
+def _naive(url, spool_session):
+    return spool_session.store_bytes(requests.get(url).content, ".mp3")
+
+
+def run(runs: int, latency: float, rate: int):
+    fake = FakeSaavn(latency=latency, rate=rate).start()
+    rows = []
+    try:
+        url = fake.media_url(next(iter(fake.media)))
+        with tempfile.TemporaryDirectory() as spool_dir:
+            session = Spool(spool_dir, 1 << 30).session()
+            for name, fn in [("requests.get().content", _naive), ("saavn.download", saavn.download)]:
+                fn(url, session)  # warm-up (connection pool, page cache)
+                times = []
+                tracemalloc.start()
+                for _ in range(runs):
+                    _, seconds = timed(fn, url, session)
+                    times.append(seconds)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                rows.append({
+                    "method": name,
+                    "runs": runs,
+                    "mean_seconds": sum(times) / len(times),
+                    "max_seconds": max(times),
+                    "peak_heap_mb": peak / 1e6,
+                })
+    finally:
+        fake.stop()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.02, help="fake server latency per request (s)")
+    parser.add_argument("--rate", type=int, default=0, help="fake server throughput in bytes/s")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    rows = run(args.runs, args.latency, args.rate)
+    print_table(rows, ["method", "runs", "mean_seconds", "max_seconds", "peak_heap_mb"])
+    if args.json:
+        write_json(rows, args.json)
+
+
+if __name__ == "__main__":
+    main()
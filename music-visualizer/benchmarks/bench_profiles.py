@@ -0,0 +1,59 @@
+# benchmarks/bench_profiles.py
+"""
+Time-to-beats and accuracy of each analysis profile.
+
+    python -m benchmarks.bench_profiles [audio files...] [--json out.json]
+
+Uses the demo songs when no files are given. Accuracy is the beat
+F-measure against the "accurate" profile on the same file. Every profile
+is run once untimed first so numba compilation doesn't skew the numbers.
+"""
+import argparse
+import os
+
+from benchmarks.common import demo_tracks, f_measure, print_table, timed, write_json
+from analysis import beats
+from analysis.profiles import PROFILES
+
+
+def run(paths, repeat: int = 3):
+    rows = []
+    for path in paths:
+        reference = None
+        for name in ["accurate"] + [p for p in PROFILES if p != "accurate"]:
+            beats.track_beats(path, profile=name)  # warm-up
+            times = []
+            for _ in range(repeat):
+                result, seconds = timed(beats.track_beats, path, profile=name)
+                times.append(seconds)
+            if reference is None:
+                reference = result["beats"]
+            rows.append({
+                "file": os.path.basename(path),
+                "profile": name,
+                "seconds": min(times),
+                "tempo": result["tempo"],
+                "beats": len(result["beats"]),
+                "f_measure": f_measure(reference, result["beats"]),
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="*")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    paths = args.paths or demo_tracks()
+    if not paths:
+        parser.error("no audio files given and no demo songs found")
+    rows = run(paths, repeat=args.repeat)
+    print_table(rows, ["file", "profile", "seconds", "tempo", "beats", "f_measure"])
+    if args.json:
+        write_json(rows, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_startup.py
+"""
+Cold start of the Streamlit script: time to the intro animation and to a full first run.
+
+    python -m benchmarks.bench_startup [--repeat 5] [--json out.json]
+
+Each repeat starts a fresh interpreter that runs app.py once through
+Streamlit's AppTest harness, so nothing is warm in sys.modules. "first
+paint" is the moment the intro markdown is emitted, measured from process
+launch. The run also lists which heavy modules ended up imported; none of
+them should be needed before a track is analyzed. Worker warm-up is turned
+off so one repeat's background compilation doesn't slow down the next.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import BASE_DIR, print_table, write_json
+
+HEAVY_MODULES = ["numba", "scipy", "sklearn", "librosa.core", "librosa.beat", "soundfile", "soxr", "requests"]
+
+_CHILD = """
+import json, sys, time
+import streamlit
+from streamlit.testing.v1 import AppTest
+
+marks = {}
+_markdown = streamlit.markdown
+def markdown(*args, **kwargs):
+    marks.setdefault("first_paint", time.time())
+    return _markdown(*args, **kwargs)
+streamlit.markdown = markdown
+
+at = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+marks["done"] = time.time()
+marks["errors"] = [e.value for e in at.exception]
+marks["heavy"] = [m for m in sys.argv[2:] if m in sys.modules]
+print(json.dumps(marks))
+"""
+
+
+def run_once() -> dict:
+    env = dict(os.environ, PYTHONPATH=BASE_DIR, SONICPLAY_ANALYSIS_WARMUP="0")
+    launched = time.time()
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD, os.path.join(BASE_DIR, "app.py"), *HEAVY_MODULES],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    marks = json.loads(out.strip().splitlines()[-1])
+    if marks["errors"]:
+        raise RuntimeError(f"app.py raised: {marks['errors'][0]}")
+    return {
+        "first_paint": marks.get("first_paint", marks["done"]) - launched,
+        "first_run": marks["done"] - launched,
+        "heavy_modules": ", ".join(marks["heavy"]) or "-",
+    }
+
+
+def run(repeat: int = 5):
+    samples = [run_once() for _ in range(repeat)]
+    return [{
+        "runs": repeat,
+        "first_paint": statistics.median(s["first_paint"] for s in samples),
+        "first_run": statistics.median(s["first_run"] for s in samples),
+        "heavy_modules": samples[-1]["heavy_modules"],
+    }]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    rows = run(repeat=args.repeat)
+    print_table(rows, ["runs", "first_paint", "first_run", "heavy_modules"])
+    if args.json:
+        write_json(rows, args.json)
+
+
+if __name__ == "__main__":
+    main()
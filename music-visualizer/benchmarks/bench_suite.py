@@ -0,0 +1,172 @@
+# benchmarks/bench_suite.py
+"""
+End-to-end cost of what app.py does for a track: decode, beat tracking and HTML generation.
+
+    python -m benchmarks.bench_suite [--durations 30,300,600,3600] [--formats wav,flac,ogg,mp3]
+                                     [--json out.json] [--baseline base.json] [--tolerance 1.25]
+
+Runs on synthetic click tracks (rendered once into --tracks-dir and reused):
+  decode/<format>/<length>   mono PCM at the profile's rate, as the analysis workers decode it
+  beats/<length>             analysis.beats.track_beats on the WAV version
+  html/<effect>/<length>/<src>  a cold render of each effect and the player with the
+                             track's beats and features and a URL or inline (data URI) audio src
+  payload/<length>/<enc>     beats + feature timeline as plain JSON or packed
+                             (effects/packing.py): encode time, bytes embedded in
+                             the page and, if node is installed, parse_ms, the time
+                             the browser side needs to turn them into arrays
+Every case runs once under tracemalloc; peak_mb is the peak Python/numpy heap.
+With --baseline, cases more than --tolerance times slower (or bigger in
+memory) than the saved run are listed and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from benchmarks import synth
+from benchmarks.common import compare, environment, load_results, measure, print_table, write_json
+from analysis import beats, decode
+from analysis.profiles import get_profile, soxr_quality
+import effects
+from custom_player import player_html
+from effects.packing import PACK_JS, pack_timeline, pack_times
+from media_server import data_uri
+
+AUDIO_URL = "http://localhost:8502/audio/0123456789abcdef.wav"
+PARSE_REPEATS = 20
+
+
+def label(seconds: float) -> str:
+    return f"{seconds / 60:g}min" if seconds >= 60 else f"{seconds:g}s"
+
+
+def _row(name, seconds, peak, **extra):
+    return {"name": name, "seconds": seconds, "peak_mb": peak / 1e6, **extra}
+
+
+def bench_decode(tracks_dir, durations, formats, profile):
+    rows = []
+    for fmt in formats:
+        for duration in durations:
+            path = synth.click_track(tracks_dir, duration, fmt)
+            decoded, seconds, peak = measure(decode.load, path, sr=profile.sr, quality=soxr_quality(profile))
+            rows.append(_row(f"decode/{fmt}/{label(duration)}", seconds, peak,
+                             file_mb=os.path.getsize(path) / 1e6, samples=len(decoded.y)))
+            del decoded
+    return rows
+
+
+def bench_beats(tracks_dir, durations, profile):
+    rows, results = [], {}
+    beats.track_beats(synth.click_track(tracks_dir, 10), profile.name)  # numba warm-up
+    for duration in durations:
+        path = synth.click_track(tracks_dir, duration)
+        result, seconds, peak = measure(beats.track_beats, path, profile.name)
+        results[duration] = result
+        rows.append(_row(f"beats/{label(duration)}", seconds, peak,
+                         tempo=result["tempo"], beats=len(result["beats"])))
+    return rows, results
+
+
+def bench_html(analyses, inline_fmt, inline_src):
+    rows = []
+    cases = [(duration, "url", AUDIO_URL, result) for duration, result in analyses.items()]
+    shortest = min(analyses)
+    cases.append((shortest, f"inline-{inline_fmt}", inline_src, analyses[shortest]))
+    for duration, src_kind, src, result in cases:
+        payload = {"beats": result["beats"], "features": result["features"], "video_src": ""}
+        for name in effects.EFFECTS:
+            effects.load(name).get_html.cache_clear()
+            html, seconds, peak = measure(effects.render, name, src, track_id="0123456789abcdef", payload=payload)
+            rows.append(_row(f"html/{name}/{label(duration)}/{src_kind}", seconds, peak, bytes=len(html)))
+        player_html.cache_clear()
+        html, seconds, peak = measure(player_html, src, "", "0123456789abcdef", result["features"])
+        rows.append(_row(f"html/player/{label(duration)}/{src_kind}", seconds, peak, bytes=len(html)))
+    return rows
+
+
+def bench_payload(analyses):
+    rows = []
+    encoders = {
+        "json": (lambda r: json.dumps({"beats": r["beats"], "features": r["features"]}),
+                 "p => [Float64Array.from(p.beats), p.features]"),
+        "packed": (lambda r: json.dumps({"beats": pack_times(r["beats"]), "features": pack_timeline(r["features"])}),
+                   "p => [SonicPlayPack.decode(p.beats), SonicPlayPack.timeline(p.features)]"),
+    }
+    for duration, result in analyses.items():
+        for encoding, (encode, decode_js) in encoders.items():
+            text, seconds, peak = measure(encode, result)
+            rows.append(_row(f"payload/{label(duration)}/{encoding}", seconds, peak,
+                             bytes=len(text), parse_ms=node_parse_ms(text, decode_js)))
+    return rows
+
+
+def node_parse_ms(literal: str, decode_js: str):
+    """Mean time for node to parse a JS literal and decode it the way the pages do, or None without node."""
+    node = shutil.which("node")
+    if node is None:
+        return None
+    helper = PACK_JS.split("<script>")[1].split("</script>")[0]
+    script = (
+        "var window = globalThis;" + helper +
+        f"const text = 'return ' + {json.dumps(literal)}, decode = {decode_js};"
+        f"let t0 = performance.now();"
+        f"for (let i = 0; i < {PARSE_REPEATS}; i++) decode(new Function(text)());"
+        f"console.log((performance.now() - t0) / {PARSE_REPEATS});"
+    )
+    proc = subprocess.run([node, "-"], input=script, capture_output=True, text=True)
+    return float(proc.stdout) if proc.returncode == 0 else None
+
+
+def run(tracks_dir, durations, formats, profile_name=None):
+    profile = get_profile(profile_name)
+    rows = bench_decode(tracks_dir, durations, formats, profile)
+    beat_rows, analyses = bench_beats(tracks_dir, durations, profile)
+    rows += beat_rows
+    inline_fmt = ([f for f in formats if f != "wav"] or formats)[0]
+    inline_src = data_uri(synth.click_track(tracks_dir, min(durations), inline_fmt))
+    rows += bench_html(analyses, inline_fmt, inline_src)
+    rows += bench_payload(analyses)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--durations", default="30,300,600,3600", help="track lengths in seconds")
+    parser.add_argument("--formats", default=",".join(synth.FORMATS))
+    parser.add_argument("--profile", help="analysis profile (default: the configured one)")
+    parser.add_argument("--tracks-dir", default=os.path.join(tempfile.gettempdir(), "sonicplay-bench"))
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    args = parser.parse_args()
+
+    durations = sorted(float(d) for d in args.durations.split(","))
+    formats = [f for f in args.formats.split(",") if f]
+    unknown = [f for f in formats if f not in synth.FORMATS]
+    if unknown:
+        parser.error(f"unsupported formats: {', '.join(unknown)}")
+
+    rows = run(args.tracks_dir, durations, formats, args.profile)
+    regressions = []
+    if args.baseline:
+        regressions = compare(rows, load_results(args.baseline), metrics={"seconds": 0.005, "peak_mb": 1.0},
+                              tolerance=args.tolerance)
+    columns = ["name", "seconds", "peak_mb", "bytes", "parse_ms"]
+    if args.baseline:
+        columns += ["seconds_vs_base", "peak_mb_vs_base"]
+    print_table(rows, columns)
+    if args.json:
+        write_json({"meta": environment(), "results": rows}, args.json)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+        for line in regressions:
+            print("  " + line)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# benchmarks/common.py
+"""Small helpers shared by the benchmark scripts."""
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEMO_DIR = os.path.join(BASE_DIR, "demo_songs")
+AUDIO_EXTS = (".mp3", ".wav", ".m4a", ".flac")
+
+# Make `python benchmarks/foo.py` behave like `python -m benchmarks.foo`.
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+
+def demo_tracks():
+    if not os.path.isdir(DEMO_DIR):
+        return []
+    return sorted(
+        os.path.join(DEMO_DIR, name)
+        for name in os.listdir(DEMO_DIR)
+        if name.lower().endswith(AUDIO_EXTS)
+    )
+
+
+def timed(fn, *args, **kwargs):
+    """Run fn once and return (result, seconds)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def measure(fn, *args, **kwargs):
+    """Run fn once under tracemalloc and return (result, seconds, peak_bytes)."""
+    tracemalloc.start()
+    try:
+        result, seconds = timed(fn, *args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def environment() -> dict:
+    """What the numbers were measured on, stored next to them."""
+    import librosa
+    import numpy
+
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "librosa": librosa.__version__,
+    }
+
+
+def load_results(path: str) -> list:
+    """Rows from a file written by write_json (with or without the meta wrapper)."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data["results"] if isinstance(data, dict) else data
+
+
+def compare(rows, baseline, key=("name",), metrics=None, tolerance: float = 1.25):
+    """
+    Add "<metric>_vs_base" ratios to rows that have a baseline entry with the
+    same key and return descriptions of the regressions: a metric more than
+    tolerance times its baseline and more than its slack above it, so tiny
+    values don't flap. metrics maps metric name -> absolute slack.
+    """
+    metrics = metrics or {"seconds": 0.005}
+    base = {tuple(r.get(k) for k in key): r for r in baseline}
+    regressions = []
+    for row in rows:
+        ref = base.get(tuple(row.get(k) for k in key))
+        if ref is None:
+            continue
+        for metric, slack in metrics.items():
+            new, old = row.get(metric), ref.get(metric)
+            if not new or not old:
+                continue
+            row[f"{metric}_vs_base"] = new / old
+            if new > old * tolerance and new - old > slack:
+                label = "/".join(str(row.get(k)) for k in key)
+                regressions.append(f"{label}: {metric} {old:.4g} -> {new:.4g} ({new / old:.2f}x)")
+    return regressions
+
+
+def f_measure(reference, estimated, window: float = 0.07) -> float:
+    """
+    Beat F-measure: a beat counts as a hit when it lies within +/- window
+    seconds of a reference beat; each reference beat can be matched once.
+    """
+    if len(reference) == 0 and len(estimated) == 0:
+        return 1.0
+    if len(reference) == 0 or len(estimated) == 0:
+        return 0.0
+    hits = 0
+    j = 0
+    for t in sorted(estimated):
+        while j < len(reference) and reference[j] < t - window:
+            j += 1
+        if j < len(reference) and abs(reference[j] - t) <= window:
+            hits += 1
+            j += 1
+    precision = hits / len(estimated)
+    recall = hits / len(reference)
+    if precision + recall == 0:
+        return 0.0
+    return 2 * precision * recall / (precision + recall)
+
+
+def continuity(reference, estimated, tolerance: float = 0.175) -> float:
+    """
+    CMLt-style continuity: an estimated beat is correct when it lies within
+    tolerance x the local reference beat period of a reference beat and the
+    interval from the previous estimate matches that period to the same
+    tolerance. Returns correct beats / max(len(reference), len(estimated)),
+    so both drift and doubled/halved tempo score low.
+    """
+    reference, estimated = sorted(reference), sorted(estimated)
+    if len(reference) < 2 or len(estimated) < 2:
+        return 0.0
+    correct = 0
+    j = 0
+    for i in range(1, len(estimated)):
+        t = estimated[i]
+        while j + 1 < len(reference) and abs(reference[j + 1] - t) <= abs(reference[j] - t):
+            j += 1
+        period = reference[j] - reference[j - 1] if j > 0 else reference[1] - reference[0]
+        if abs(t - reference[j]) <= tolerance * period and \
+                abs((t - estimated[i - 1]) - period) <= tolerance * period:
+            correct += 1
+    return correct / max(len(reference), len(estimated))
+
+
+def median_offset(reference, estimated, window: float = 0.07):
+    """Median signed distance (seconds) from estimated beats to the nearest reference beat
+    within window; positive means late. None when nothing matches."""
+    reference = sorted(reference)
+    if not reference:
+        return None
+    offsets = []
+    j = 0
+    for t in sorted(estimated):
+        while j + 1 < len(reference) and abs(reference[j + 1] - t) <= abs(reference[j] - t):
+            j += 1
+        if abs(t - reference[j]) <= window:
+            offsets.append(t - reference[j])
+    if not offsets:
+        return None
+    offsets.sort()
+    mid = len(offsets) // 2
+    return offsets[mid] if len(offsets) % 2 else (offsets[mid - 1] + offsets[mid]) / 2
+
+
+def print_table(rows, columns):
+    widths = [max(len(c), *(len(_fmt(r.get(c))) for r in rows)) for c in columns]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in rows:
+        print("  ".join(_fmt(r.get(c)).ljust(w) for c, w in zip(columns, widths)))
+
+
+def write_json(results, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+
+def _fmt(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return "" if value is None else str(value)
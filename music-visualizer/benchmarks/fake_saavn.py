@@ -0,0 +1,173 @@
+# benchmarks/fake_saavn.py
+"""
+Offline stand-in for the saavn.dev API.
+
+    python -m benchmarks.fake_saavn [--port 8600] [--latency 0.05] [--rate 0] [--fail-rate 0]
+    SONICPLAY_SAAVN_API_URL=http://localhost:8600/api streamlit run app.py
+
+Search results point at the demo songs (or a generated tone when there are
+none), served as downloadable media. When ffmpeg is installed the first one
+is also offered as AAC in .mp4, the way saavn.dev serves most tracks. --latency delays every response,
+--rate throttles media to that many bytes/second, and --fail-rate makes
+that fraction of media requests fail with a 503 so retries can be exercised.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.common import demo_tracks
+from media_server import mime_type
+
+
+def _tone_mp3_bytes() -> bytes:
+    import numpy as np
+    import soundfile as sf
+
+    sr = 22050
+    t = np.arange(sr * 30) / sr
+    y = (0.3 * np.sin(2 * np.pi * 220 * t)).astype("float32")
+    buf = io.BytesIO()
+    sf.write(buf, y, sr, format="MP3")
+    return buf.getvalue()
+
+
+def _aac_mp4_bytes(data: bytes):
+    """data transcoded to AAC in an MP4 container, or None without ffmpeg."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        return None
+    with tempfile.TemporaryDirectory() as tmp:  # the MP4 muxer needs a seekable output
+        out = os.path.join(tmp, "track.mp4")
+        subprocess.run([ffmpeg, "-nostdin", "-v", "error", "-i", "-", "-vn", "-c:a", "aac", "-b:a", "160k", out],
+                       input=data, check=True)
+        with open(out, "rb") as f:
+            return f.read()
+
+
+def load_media():
+    """Media id -> (title, bytes, extension)."""
+    media = {}
+    for i, path in enumerate(demo_tracks()):
+        with open(path, "rb") as f:
+            media[str(i)] = (os.path.splitext(os.path.basename(path))[0], f.read(),
+                             os.path.splitext(path)[1].lower())
+    if not media:
+        media["0"] = ("Test Tone", _tone_mp3_bytes(), ".mp3")
+    title, data, _ = media["0"]
+    aac = _aac_mp4_bytes(data)
+    if aac is not None:
+        media[str(len(media))] = (f"{title} (AAC)", aac, ".mp4")
+    return media
+
+
+class FakeSaavn:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, rate=0, fail_rate=0.0, media=None):
+        self.latency = latency
+        self.rate = rate
+        self.fail_rate = fail_rate
+        self.media = media if media is not None else load_media()
+        self.requests = 0
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self.url = f"http://{host}:{self._httpd.server_address[1]}"
+
+    @property
+    def api_url(self) -> str:
+        return self.url + "/api"
+
+    def media_url(self, media_id: str) -> str:
+        return f"{self.url}/media/{media_id}{self.media[media_id][2]}"
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def search_results(self, query: str, limit: int):
+        results = []
+        for media_id, (title, _, _) in list(self.media.items())[:limit]:
+            results.append({
+                "id": media_id,
+                "name": title,
+                "artists": {"primary": [{"name": "Fake Artist"}]},
+                "downloadUrl": [{"quality": "320kbps", "url": self.media_url(media_id)}],
+            })
+        return {"success": True, "data": {"total": len(results), "results": results}}
+
+
+def _make_handler(fake: FakeSaavn):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            fake.requests += 1
+            if fake.latency:
+                time.sleep(fake.latency)
+            url = urlparse(self.path)
+            if url.path == "/api/search/songs":
+                qs = parse_qs(url.query)
+                limit = int(qs.get("limit", ["10"])[0])
+                body = json.dumps(fake.search_results(qs.get("query", [""])[0], limit)).encode()
+                self._send(200, "application/json", body)
+            elif url.path.startswith("/media/"):
+                entry = fake.media.get(os.path.splitext(url.path[len("/media/"):])[0])
+                if entry is None:
+                    self._send(404, "text/plain", b"not found")
+                elif fake.fail_rate and random.random() < fake.fail_rate:
+                    self._send(503, "text/plain", b"try again")
+                else:
+                    self._send(200, mime_type(entry[2]), entry[1], throttle=True)
+            else:
+                self._send(404, "text/plain", b"not found")
+
+        def _send(self, status, content_type, body, throttle=False):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            chunk = 64 * 1024
+            try:
+                for i in range(0, len(body), chunk):
+                    self.wfile.write(body[i:i + chunk])
+                    if throttle and fake.rate:
+                        time.sleep(chunk / fake.rate)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the saavn.dev API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--rate", type=int, default=0, help="media throughput in bytes/s (0 = unlimited)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of media requests answered with 503")
+    args = parser.parse_args()
+
+    fake = FakeSaavn(args.host, args.port, args.latency, args.rate, args.fail_rate)
+    print(f"Fake JioSaavn API on {fake.api_url} ({len(fake.media)} tracks)")
+    fake.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
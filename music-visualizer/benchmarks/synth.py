@@ -0,0 +1,148 @@
+# benchmarks/synth.py
+"""
+Synthetic test tracks for the benchmarks.
+
+Tracks are rendered block by block straight into the output file, so an
+hour of audio never has to sit in memory. Every hit is a short sample
+(noise burst, kick, snare, hi-hat) placed at a known time, so the beat
+times are exact ground truth: steady click tracks for the speed suite,
+and drum loops with swing and tempo changes for the accuracy harness
+(benchmarks/bench_accuracy.py).
+"""
+import os
+
+import numpy as np
+import soundfile as sf
+
+SR = 44100
+BLOCK_SECONDS = 10.0
+
+# container -> (soundfile format, subtype)
+FORMATS = {
+    "wav": ("WAV", "PCM_16"),
+    "flac": ("FLAC", "PCM_16"),
+    "ogg": ("OGG", "VORBIS"),
+    "mp3": ("MP3", "MPEG_LAYER_III"),
+}
+
+
+def steady_beats(duration: float, bpm: float = 120.0) -> np.ndarray:
+    return np.arange(0.0, duration, 60.0 / bpm)
+
+
+def tempo_beats(duration: float, bpm_at, resolution: float = 0.001) -> np.ndarray:
+    """Beat times for a tempo that varies over time; bpm_at maps an array of times to BPM."""
+    t = np.arange(0.0, duration, resolution)
+    phase = np.concatenate([[0.0], np.cumsum(bpm_at(t) / 60.0 * resolution)[:-1]])
+    return np.interp(np.arange(0, int(phase[-1]) + 1), phase, t)
+
+
+def ramp_beats(duration: float, bpm_start: float, bpm_end: float) -> np.ndarray:
+    """Tempo gliding linearly from bpm_start to bpm_end."""
+    return tempo_beats(duration, lambda t: bpm_start + (bpm_end - bpm_start) * t / duration)
+
+
+def step_beats(duration: float, bpm_start: float, bpm_end: float, at: float = 0.5) -> np.ndarray:
+    """Tempo jumping from bpm_start to bpm_end at the given fraction of the track."""
+    return tempo_beats(duration, lambda t: np.where(t < duration * at, bpm_start, bpm_end))
+
+
+def click(sr: int = SR, seconds: float = 0.03, seed: int = 0) -> np.ndarray:
+    """A short decaying noise burst."""
+    n = int(seconds * sr)
+    burst = np.random.default_rng(seed).uniform(-1, 1, n)
+    return (burst * np.exp(-np.linspace(0, 8, n))).astype(np.float32)
+
+
+def thump(sr: int = SR, seconds: float = 0.12, freq: float = 60.0) -> np.ndarray:
+    """A low sine with a fast decay, for downbeats."""
+    t = np.arange(int(seconds * sr)) / sr
+    return (np.sin(2 * np.pi * freq * t) * np.exp(-t * 30)).astype(np.float32)
+
+
+def kick(sr: int = SR) -> np.ndarray:
+    return thump(sr, seconds=0.25, freq=55.0)
+
+
+def snare(sr: int = SR) -> np.ndarray:
+    return click(sr, seconds=0.15, seed=2)
+
+
+def hihat(sr: int = SR) -> np.ndarray:
+    """Short, high-passed noise."""
+    return (np.diff(click(sr, seconds=0.04, seed=3), prepend=0.0) * 0.5).astype(np.float32)
+
+
+def render_blocks(hits, duration: float, sr: int = SR, block_seconds: float = BLOCK_SECONDS):
+    """
+    Yield float32 mono blocks of a track made of (time, sample, gain) hits.
+    hits must be sorted by time; samples may straddle block boundaries.
+    """
+    hits = list(hits)
+    total = int(duration * sr)
+    block = int(block_seconds * sr)
+    noise = np.random.default_rng(1)
+    first = 0  # first hit that can still reach the current block
+    for start in range(0, total, block):
+        end = min(start + block, total)
+        out = noise.normal(0, 0.002, end - start).astype(np.float32)  # faint noise floor
+        while first < len(hits) and int(hits[first][0] * sr) + len(hits[first][1]) <= start:
+            first += 1
+        for when, sample, gain in hits[first:]:
+            pos = int(when * sr)
+            if pos >= end:
+                break
+            lo, hi = max(pos, start), min(pos + len(sample), end)
+            if lo < hi:
+                out[lo - start:hi - start] += gain * sample[lo - pos:hi - pos]
+        yield out
+
+
+def click_hits(beat_times, sr: int = SR, beats_per_bar: int = 4):
+    """Clicks on every beat, with an extra thump on each downbeat."""
+    c, k = click(sr), thump(sr)
+    hits = []
+    for i, t in enumerate(beat_times):
+        hits.append((t, c, 0.6))
+        if i % beats_per_bar == 0:
+            hits.append((t, k, 0.8))
+    hits.sort(key=lambda h: h[0])
+    return hits
+
+
+def drum_hits(beat_times, swing: float = 0.5, sr: int = SR):
+    """
+    A four-on-the-floor-ish loop: kick on beats 1 and 3, snare on 2 and 4,
+    hi-hats on eighth notes. swing is where the off-beat hat falls between
+    two beats (0.5 = straight, ~0.67 = triplet swing).
+    """
+    k, sn, hh = kick(sr), snare(sr), hihat(sr)
+    hits = []
+    for i, t in enumerate(beat_times):
+        hits.append((t, k if i % 2 == 0 else sn, 0.9 if i % 2 == 0 else 0.6))
+        hits.append((t, hh, 0.25))
+        if i + 1 < len(beat_times):
+            hits.append((t + swing * (beat_times[i + 1] - t), hh, 0.2))
+    hits.sort(key=lambda h: h[0])
+    return hits
+
+
+def write_track(path: str, blocks, sr: int = SR, channels: int = 2) -> str:
+    """Write mono blocks to path (format from the extension), duplicated to every channel."""
+    fmt, subtype = FORMATS[os.path.splitext(path)[1].lstrip(".").lower()]
+    tmp = path + ".part"
+    with sf.SoundFile(tmp, "w", samplerate=sr, channels=channels, format=fmt, subtype=subtype) as f:
+        for block in blocks:
+            f.write(np.repeat(block[:, None], channels, axis=1) * 0.5)
+    os.replace(tmp, path)
+    return path
+
+
+def click_track(directory: str, duration: float, fmt: str = "wav", bpm: float = 120.0, sr: int = SR) -> str:
+    """Path of a steady click track, rendered on first use and reused afterwards."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"clicks_{bpm:g}bpm_{duration:g}s_{sr}.{fmt}")
+    if not os.path.exists(path):
+        hits = click_hits(steady_beats(duration, bpm), sr)
+        write_track(path, render_blocks(hits, duration, sr), sr)
+    return path
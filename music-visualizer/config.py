@@ -0,0 +1,78 @@
+# config.py
+"""
+Runtime settings for SonicPlay. Everything can be overridden through
+environment variables so several deployments can share one codebase.
+"""
+import os
+import tempfile
+
+BASE_DIR = os.path.dirname(__file__)
+
+# Persistent analysis cache shared by every Streamlit worker on the machine.
+CACHE_DIR = os.environ.get(
+    "SONICPLAY_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "sonicplay"),
+)
+CACHE_MAX_BYTES = int(os.environ.get("SONICPLAY_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Decoded PCM of analyzed tracks (memory-mapped .npy files), so re-analyzing a
+# track skips the MP3/M4A decode. ~5 MB per minute at 22050 Hz; 0 disables it.
+PCM_CACHE_DIR = os.environ.get("SONICPLAY_PCM_CACHE_DIR", os.path.join(CACHE_DIR, "pcm"))
+PCM_CACHE_MAX_BYTES = int(os.environ.get("SONICPLAY_PCM_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+
+# Tracks longer than this are beat-tracked block by block instead of being
+# decoded into memory in one go.
+STREAM_MIN_SECONDS = float(os.environ.get("SONICPLAY_STREAM_MIN_SECONDS", 600))
+
+# Default beat analysis profile ("fast", "balanced" or "accurate", see
+# analysis/profiles.py). Users can still switch it in the sidebar.
+ANALYSIS_PROFILE = os.environ.get("SONICPLAY_ANALYSIS_PROFILE", "balanced")
+
+# Worker processes for background beat analysis (defaults to one per core).
+ANALYSIS_WORKERS = int(os.environ.get("SONICPLAY_ANALYSIS_WORKERS", 0)) or os.cpu_count() or 1
+
+# Publish provisional beats while a track is analyzed (the first 30 s right
+# away, then chunk by chunk) so the visualizer can start before it is done.
+# The effects poll them from the media server's /beats route, so this only
+# takes effect with MEDIA_SERVER_ENABLED; without it a visualizer started
+# during analysis runs without beats until it is started again.
+ANALYSIS_PROGRESSIVE = os.environ.get("SONICPLAY_ANALYSIS_PROGRESSIVE", "1") != "0"
+
+# Limits for a single analysis (see analysis/sandbox.py); 0 disables a limit.
+# Files longer than ANALYSIS_MAX_DURATION are refused from their header alone.
+ANALYSIS_MAX_RSS_MB = int(os.environ.get("SONICPLAY_ANALYSIS_MAX_RSS_MB", 2048))
+ANALYSIS_MAX_CPU_SECONDS = int(os.environ.get("SONICPLAY_ANALYSIS_MAX_CPU_SECONDS", 600))
+ANALYSIS_TIMEOUT = int(os.environ.get("SONICPLAY_ANALYSIS_TIMEOUT", 900))
+ANALYSIS_MAX_DURATION = int(os.environ.get("SONICPLAY_ANALYSIS_MAX_DURATION", 4 * 3600))
+
+# Warm analysis workers up (import librosa, compile numba kernels) as soon as
+# the server starts instead of on the first user's track. Compiled kernels are
+# kept in NUMBA_CACHE_DIR so later restarts mostly skip compilation.
+ANALYSIS_WARMUP = os.environ.get("SONICPLAY_ANALYSIS_WARMUP", "1") != "0"
+NUMBA_CACHE_DIR = os.environ.get(
+    "SONICPLAY_NUMBA_CACHE_DIR",
+    os.environ.get("NUMBA_CACHE_DIR", os.path.join(CACHE_DIR, "numba")),
+)
+
+# Local HTTP server that streams audio (with Range support) to the player and
+# effects instead of inlining it as base64. MEDIA_PUBLIC_URL is the address
+# browsers use to reach it, e.g. through a reverse proxy. The server is only
+# on by default when that address is set: on a hosted deployment (Streamlit
+# Community Cloud) a localhost URL would point at each visitor's own machine.
+# SONICPLAY_MEDIA_SERVER=1 turns it on without one for local use.
+MEDIA_HOST = os.environ.get("SONICPLAY_MEDIA_HOST", "127.0.0.1")
+MEDIA_PORT = int(os.environ.get("SONICPLAY_MEDIA_PORT", 8502))
+MEDIA_PUBLIC_URL = os.environ.get("SONICPLAY_MEDIA_PUBLIC_URL", "")
+MEDIA_SERVER_ENABLED = os.environ.get("SONICPLAY_MEDIA_SERVER", "1" if MEDIA_PUBLIC_URL else "0") != "0"
+
+# Spool for uploaded / downloaded audio. It is wiped when the server starts,
+# so don't point several server processes at the same directory.
+SPOOL_DIR = os.environ.get("SONICPLAY_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "sonicplay-spool"))
+SPOOL_MAX_BYTES = int(os.environ.get("SONICPLAY_SPOOL_MAX_BYTES", 1024 * 1024 * 1024))
+
+# JioSaavn API (point it at benchmarks/fake_saavn.py to work offline) and
+# limits for media downloads.
+SAAVN_API_URL = os.environ.get("SONICPLAY_SAAVN_API_URL", "https://saavn.dev/api").rstrip("/")
+SAAVN_MAX_DOWNLOAD_BYTES = int(os.environ.get("SONICPLAY_SAAVN_MAX_DOWNLOAD_BYTES", 50 * 1024 * 1024))
+SAAVN_TIMEOUT = float(os.environ.get("SONICPLAY_SAAVN_TIMEOUT", 10))
+SAAVN_RETRIES = int(os.environ.get("SONICPLAY_SAAVN_RETRIES", 3))
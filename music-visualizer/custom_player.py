@@ -1,15 +1,51 @@
+import json
+
 import streamlit as st
 
-def render_custom_player(audio_url_data: str, logo_b64: str = "", height: int = 900):
+from effects.packing import PACK_JS, pack_timeline
+from effects.template import Template, memoize_html
+from effects.timeline import FEATURES_JS
+from shared_audio import SHARED_AUDIO_JS
+
+def render_custom_player(audio_url_data: str, logo_src: str = "", height: int = 900, track_id: str = "",
+                         features=None, peaks_src: str = "", features_src: str = "", payload_key=None):
     """
     Render the custom cyber player UI into Streamlit.
-    - audio_url_data: data:... base64 audio src (same as in your app)
-    - logo_b64: optional base64 string for the logo to show in the header (dynamic).
+    - audio_url_data: media server URL for the track (or a data: URI fallback)
+    - logo_src: optional URL (or data URI) of the logo to show in the header.
     - height: iframe height passed to st.components.v1.html
+    - track_id: id under which the audio element is shared with the visualizer
+    - features: the track's precomputed feature timeline (analysis.features), if analyzed
+    - peaks_src: URL of the track's waveform peaks on the media server (analysis/peaks.py), if any
+    - features_src: URL of the track's feature timeline on the media server; fetched instead of features
+    - payload_key: analysis cache key the features came from; the memoized page is looked up by it
     """
-    # NOTE: We keep all JS/audio/preset/visualizer logic unchanged from your working file.
-    # Only update the HTML/CSS wrapper, select styling, logo injection, and some minor layout fixes.
-    custom_player_template = r'''
+    html = player_html(audio_url_data or "", logo_src, track_id, features, peaks_src, features_src,
+                       payload_key=payload_key)
+
+    # Embed the HTML
+    st.components.v1.html(html, height=height, scrolling=False)
+    # small spacer (keeps streamlit layout stable)
+    st.components.v1.html("<div style='height:20px;'></div>", height=20)
+
+
+@memoize_html
+def player_html(audio_src: str, logo_src: str = "", track_id: str = "", features=None, peaks_src: str = "",
+                features_src: str = "") -> str:
+    """The player page, rebuilt only when the track or logo changes."""
+    # Insert the logo image into the logo slot. If logo_src is empty, keep SP text fallback.
+    if logo_src:
+        logo_html = f'<img alt="logo" src="{logo_src}" />'
+    else:
+        logo_html = '<div style="font-weight:900; font-size:18px; color:#071018; display:flex; align-items:center; justify-content:center; width:100%; height:100%;">SP</div>'
+    return _TEMPLATE.render(audio_src=audio_src, logo_slot=logo_html, track_id=json.dumps(track_id),
+                            features=json.dumps(pack_timeline(features)), peaks_src=json.dumps(peaks_src),
+                            features_src=json.dumps(features_src))
+
+
+# NOTE: We keep all JS/audio/preset/visualizer logic unchanged from your working file.
+# Only update the HTML/CSS wrapper, select styling, logo injection, and some minor layout fixes.
+_TEMPLATE = Template(r'''
     <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
 
     <style>
@@ -115,6 +151,7 @@ def render_custom_player(audio_url_data: str, logo_b64: str = "", height: int =
 
     /* sliders & inputs */
     label.small { font-size:12px; color:var(--muted); display:block; margin-bottom:8px; }
+    .waveform { width:100%; height:56px; display:none; margin:6px 0 8px; cursor:pointer; }
     input[type="range"].slider { width:100%; height:8px; -webkit-appearance:none; background: linear-gradient(90deg,#0b0b12,#252533); border-radius:10px; outline:none; }
     input[type="range"].slider::-webkit-slider-thumb { -webkit-appearance:none; width:16px; height:16px; border-radius:50%; background: radial-gradient(circle,var(--accent-2),var(--accent-1)); border:2px solid rgba(0,0,0,0.35); box-shadow: 0 4px 14px rgba(0,0,0,0.4); cursor:pointer; }
     .small-input { width:100%; padding:8px 10px; border-radius:10px; background:transparent; border:1px solid rgba(255,255,255,0.04); color:#fff; }
@@ -254,6 +291,7 @@ def render_custom_player(audio_url_data: str, logo_b64: str = "", height: int =
 
             <div style="margin-top:12px;">
               <label class="small">Seek</label>
+              <canvas id="waveform" class="waveform" aria-hidden="true"></canvas>
               <input id="seekSlider" type="range" class="slider" min="0" max="100" value="0">
               <div style="display:flex; justify-content:space-between; font-size:12px; color:var(--muted); margin-top:8px;">
                 <div id="timeCurrent">0:00</div>
@@ -338,8 +376,14 @@ def render_custom_player(audio_url_data: str, logo_b64: str = "", height: int =
       </div>
     </div>
 
+    __SHARED_AUDIO_JS__
+    __PACK_JS__
+    __FEATURES_JS__
     <script>
     (function(){
+      const TRACK_ID = __TRACK_ID__;
+      let FEATURES = SonicPlayPack.timeline(__FEATURES__);
+      SonicPlayFeatures.load(__FEATURES_SRC__, function (tl) { FEATURES = tl; });
       // Element refs
       const audioEl = document.getElementById('audioEl');
       const playBtn = document.getElementById('playBtn');
@@ -454,6 +498,7 @@ def render_custom_player(audio_url_data: str, logo_b64: str = "", height: int =
         if (audioCtx) return;
         if (!window.AudioContext && !window.webkitAudioContext) {
           console.warn("No AudioContext");
+          SonicPlayShared.publish(TRACK_ID, audioEl, null);
           return;
         }
         audioCtx = new (window.AudioContext || window.webkitAudioContext)();
@@ -513,6 +558,7 @@ def render_custom_player(audio_url_data: str, logo_b64: str = "", height: int =
         gainNode.connect(panner);
         panner.connect(analyser);
         analyser.connect(audioCtx.destination);
+        SonicPlayShared.publish(TRACK_ID, audioEl, analyser);
 
         // for recording
         if (audioCtx.createMediaStreamDestination) {
@@ -575,6 +621,7 @@ def render_custom_player(audio_url_data: str, logo_b64: str = "", height: int =
           seekSlider.value = (audioEl.currentTime / audioEl.duration) * 100;
         }
         timeCurrent.innerText = fmt(audioEl.currentTime);
+        drawWaveform();
       });
       seekSlider.addEventListener('input', () => {
         if (isFinite(audioEl.duration) && audioEl.duration > 0) {
@@ -582,6 +629,40 @@ def render_custom_player(audio_url_data: str, logo_b64: str = "", height: int =
         }
       });
 
+      // waveform: one level of the server's peak pyramid, about one min/max pair per pixel
+      const PEAKS_SRC = __PEAKS_SRC__;
+      const waveCanvas = document.getElementById('waveform');
+      let wavePeaks = null;
+      function drawWaveform(){
+        if (!wavePeaks) return;
+        const w = waveCanvas.width, h = waveCanvas.height, mid = h / 2, n = wavePeaks.length / 2;
+        const played = (isFinite(audioEl.duration) && audioEl.duration > 0) ? audioEl.currentTime / audioEl.duration : 0;
+        const wctx = waveCanvas.getContext('2d');
+        wctx.clearRect(0, 0, w, h);
+        for (let x = 0; x < w; x++) {
+          const a = Math.floor(x * n / w), b = Math.max(a + 1, Math.floor((x + 1) * n / w));
+          let lo = 0, hi = 0;
+          for (let i = a; i < b && i < n; i++) { lo = Math.min(lo, wavePeaks[2*i]); hi = Math.max(hi, wavePeaks[2*i+1]); }
+          wctx.fillStyle = x < played * w ? '#ff2d95' : 'rgba(191,199,214,0.35)';
+          wctx.fillRect(x, mid - (hi / 127) * mid, 1, Math.max(1, ((hi - lo) / 127) * mid));
+        }
+      }
+      if (PEAKS_SRC) {
+        const dpr = window.devicePixelRatio || 1;
+        waveCanvas.style.display = 'block';
+        waveCanvas.width = Math.max(1, Math.round(waveCanvas.clientWidth * dpr));
+        waveCanvas.height = Math.round(56 * dpr);
+        fetch(PEAKS_SRC + '?width=' + waveCanvas.width)
+          .then(r => r.ok ? r.arrayBuffer() : Promise.reject(r.status))
+          .then(buf => { wavePeaks = new Int8Array(buf); drawWaveform(); })
+          .catch(() => { waveCanvas.style.display = 'none'; });
+        waveCanvas.addEventListener('click', (e) => {
+          if (isFinite(audioEl.duration) && audioEl.duration > 0) {
+            audioEl.currentTime = (e.offsetX / waveCanvas.clientWidth) * audioEl.duration;
+          }
+        });
+      }
+
       // volume & playbackRate
       volume.addEventListener('input', () => {
         if (gainNode) gainNode.gain.value = parseFloat(volume.value);
@@ -856,6 +937,9 @@ def render_custom_player(audio_url_data: str, logo_b64: str = "", height: int =
           }
           bassEnergy = bassEnergy / (bassCut || 1);
           trebleEnergy = trebleEnergy / (bufferLength - trebleStart || 1);
+          // The precomputed timeline, when there is one, drives the glow and hue instead.
+          const feat = SonicPlayFeatures.at(FEATURES, audioEl.currentTime);
+          if (feat) { bassEnergy = feat.low * 255; trebleEnergy = feat.high * 255; }
 
           // background hue shift
           const hue = Math.min(360, Math.max(0, 220 + (trebleEnergy - bassEnergy) * 0.6));
@@ -903,24 +987,4 @@ def render_custom_player(audio_url_data: str, logo_b64: str = "", height: int =
 
     })();
     </script>
-    '''
-
-    # Insert the logo image into the logo slot. If logo_b64 is empty, keep SP text fallback.
-    if logo_b64:
-        logo_html = f'<img alt="logo" src="data:image/png;base64,{logo_b64}" />'
-    else:
-        logo_html = '<div style="font-weight:900; font-size:18px; color:#071018; display:flex; align-items:center; justify-content:center; width:100%; height:100%;">SP</div>'
-
-    if audio_url_data and not audio_url_data.startswith("data:"):
-        audio_src = audio_url_data  # Spotify URL (preview)
-    else:
-        audio_src = audio_url_data or ""
-    
-    # Replace placeholders
-    html = custom_player_template.replace("__AUDIO_SRC__", audio_src)
-    html = html.replace("__LOGO_SLOT__", logo_html)
-
-    # Embed the HTML
-    st.components.v1.html(html, height=height, scrolling=False)
-    # small spacer (keeps streamlit layout stable)
-    st.components.v1.html("<div style='height:20px;'></div>", height=20)
+    ''', shared_audio_js=SHARED_AUDIO_JS, pack_js=PACK_JS, features_js=FEATURES_JS)
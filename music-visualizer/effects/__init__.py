@@ -0,0 +1,70 @@
+# effects/__init__.py
+"""
+Registry of visualizer effects.
+
+Every effect is a module in this package with a
+
+    get_html(audio_src, track_id="", **payload, **params) -> str
+
+function. Its entry here declares the sidebar parameters it takes, the
+payload it needs from the app (e.g. "beats", "beat_info" for the per-beat
+annotations, "features" for the feature timeline, "features_src" for
+the /features URL that replaces it with the media server running,
+"beats_src" for beats
+still being analyzed (effects/live.py), or "video_src" for the synthwave
+background) and its preferred iframe height. Modules are imported on first use, so adding a heavy effect
+costs nothing until it is selected.
+"""
+import importlib
+from collections import namedtuple
+
+Slider = namedtuple("Slider", ["name", "label", "min", "max", "default", "step"])
+Choice = namedtuple("Choice", ["name", "label", "options", "default"])
+Effect = namedtuple("Effect", ["name", "module", "params", "needs", "height"])
+
+THEMES = ["Neon (dark)", "Light", "Blue", "Cyberpunk", "Vaporwave", "Galaxy"]
+
+# Sidebar order.
+EFFECTS = {
+    "Ripple": Effect("Ripple", "ripple", params=(
+        Slider("sensitivity", "Beat sensitivity", 0.3, 2.5, 1.0, 0.1),
+        Choice("theme", "Theme", THEMES, THEMES[0]),
+        Slider("particle_count", "Background particle count", 20, 120, 55, 5),
+    ), needs=("beats", "beat_info", "features", "features_src", "beats_src"), height=680),
+    "Synthwave": Effect("Synthwave", "synthwave", params=(
+        Slider("intensity", "Synthwave Intensity", 0.5, 3.0, 1.0, 0.1),
+        Slider("grid_speed", "Synthwave Grid Speed", 0.1, 2.0, 0.6, 0.1),
+        Slider("grid_cols", "Synthwave Grid Columns", 12, 60, 36, 2),
+    ), needs=("beats", "video_src"), height=700),
+    "Ocean Reverb": Effect("Ocean Reverb", "ocean_reverb", params=(), needs=("beats", "beats_src"), height=700),
+    "Resonance": Effect("Resonance", "resonance", params=(), needs=("beats", "beat_info", "features", "features_src", "beats_src"), height=720),
+    "Mesh": Effect("Mesh", "mesh", params=(), needs=("beats", "beat_info", "features", "features_src", "beats_src"), height=720),
+    "BeatSaber": Effect("BeatSaber", "beatsaber", params=(), needs=("beats", "features", "features_src", "beats_src"), height=720),
+}
+
+
+def get_effect(name: str) -> Effect:
+    try:
+        return EFFECTS[name]
+    except KeyError:
+        raise ValueError(f"Unknown effect: {name!r}") from None
+
+
+def load(name: str):
+    """Import (once) and return the effect's module."""
+    return importlib.import_module(f"{__name__}.{get_effect(name).module}")
+
+
+def render(name: str, audio_src: str, track_id: str = "", payload=None, params=None, payload_key=None) -> str:
+    """
+    Build an effect's HTML. payload may hold more than the effect needs
+    (only its declared needs are passed on); params missing from params
+    fall back to their declared defaults. payload_key, if given, identifies
+    the payload for the HTML cache (effects/template.py).
+    """
+    effect = get_effect(name)
+    payload = payload or {}
+    params = params or {}
+    kwargs = {need: payload[need] for need in effect.needs if need in payload}
+    kwargs.update({p.name: params.get(p.name, p.default) for p in effect.params})
+    return load(name).get_html(audio_src, track_id=track_id, payload_key=payload_key, **kwargs)
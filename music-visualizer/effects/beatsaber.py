@@ -1,17 +1,32 @@
 # effects/beatsaber.py
 import json
 
-def get_html(audio_src: str, beats=None):
+from effects.live import LIVE_JS
+from effects.packing import PACK_JS, pack_timeline, pack_times
+from effects.template import Template, memoize_html
+from effects.timeline import FEATURES_JS
+from shared_audio import SHARED_AUDIO_JS
+
+@memoize_html
+def get_html(audio_src: str, beats=None, track_id: str = "", features=None, beats_src="",
+             features_src=""):
     """
     BeatSaber-like mini-game: neon gems come at the player synced to beats.
     - audio_src: data URI or URL to audio file
     - beats: optional list of beat times (seconds)
+    - beats_src: /beats URL to follow while the analysis is still running
+    - features_src: /features URL to fetch the feature timeline from instead of embedding it
+    - track_id: id under which the custom player shares its audio element
     """
-    if beats is None:
-        beats = []
-    beats_js = json.dumps(beats)
+    return _TEMPLATE.render(
+        audio_src=audio_src, beats_js=json.dumps(pack_times(beats or [])), track_id=json.dumps(track_id),
+        features=json.dumps(pack_timeline(features)),
+        beats_src=json.dumps(beats_src),
+        features_src=json.dumps(features_src),
+    )
 
-    html = """
+
+_TEMPLATE = Template(r"""
 <!doctype html>
 <html>
   <head>
@@ -80,10 +95,17 @@ def get_html(audio_src: str, beats=None):
     <button id="fullscreenBtn">⛶</button>
     <button id="playPauseBtn">▶ Play</button>
 
-    <audio id="audio" src="__AUDIO_SRC__" style="display:none"></audio>
+    <audio id="audio" crossorigin="anonymous" src="__AUDIO_SRC__" style="display:none"></audio>
 
+    __SHARED_AUDIO_JS__
+    __PACK_JS__
+    __LIVE_JS__
+    __FEATURES_JS__
     <script>
-      const BEATS = __BEATS_JS__;
+      let BEATS = SonicPlayPack.decode(__BEATS_JS__);
+      const TRACK_ID = __TRACK_ID__;
+      let FEATURES = SonicPlayPack.timeline(__FEATURES__);
+      SonicPlayFeatures.load(__FEATURES_SRC__, function (tl) { FEATURES = tl; });
 
       // Audio / analysis
       let audio = null, audioCtx = null, analyser = null, sourceNode = null;
@@ -101,13 +123,30 @@ def get_html(audio_src: str, beats=None):
       // Visual params
       let lanes = 3; // lanes [-1,0,1]
       let leadTime = 2.0; // seconds before beat to spawn gem
+      // Beats of an analysis still running arrive while the game plays; gems
+      // already in flight stay, later beats spawn from the new list.
+      SonicPlayLive.follow(__BEATS_SRC__, function (live) {
+        BEATS = live.beats;
+        if (live.done) FEATURES = live.features;
+        const now = audio && audio.currentTime ? audio.currentTime : millis() / 1000.0;
+        lastBeatIdx = SonicPlayLive.after(BEATS, now + leadTime + 0.05);
+      });
       let gemSpeed = 600; // approach speed
       let perspectiveDepth = 1200;
 
       // Sword smoothing
       let sword = { px: 0, py: 0, vx: 0, vy: 0, smoothing: 0.65 };
 
+      // Borrow the custom player's audio element + analyser (see shared_audio.py)
+      let usingShared = false;
+      function useShared(shared) {
+        usingShared = true;
+        audio = shared.audio;
+        if (shared.analyser) { analyser = shared.analyser; freqData = new Uint8Array(analyser.frequencyBinCount); }
+      }
+
       function initAudio() {
+        if (usingShared || SonicPlayShared.adopt(TRACK_ID, useShared)) return;
         audio = document.getElementById('audio');
         if (!audio) return;
         if (audioCtx && audioCtx.state !== 'closed') return;
@@ -360,8 +399,9 @@ def get_html(audio_src: str, beats=None):
           beatPulse = Math.max(0, beatPulse - 0.8);
         }
 
-        if (analyser && BEATS.length > 0) {
-          const bass = avg(Array.prototype.slice.call(freqData, 0, 40)) / 255;
+        const feat = audio ? SonicPlayFeatures.at(FEATURES, audio.currentTime) : null;
+        if ((feat || analyser) && BEATS.length > 0) {
+          const bass = feat ? feat.low : avg(Array.prototype.slice.call(freqData, 0, 40)) / 255;
           if (bass > 0.28 && millis() - lastBeatPulse > 200) {
             beatPulse = 10 + bass * 30;
             lastBeatPulse = millis();
@@ -459,6 +499,4 @@ def get_html(audio_src: str, beats=None):
     </script>
   </body>
 </html>
-"""
-    # Inject beats JSON and audio src safely (avoid f-string brace issues)
-    return html.replace("__BEATS_JS__", beats_js).replace("__AUDIO_SRC__", audio_src)
+""", shared_audio_js=SHARED_AUDIO_JS, pack_js=PACK_JS, live_js=LIVE_JS, features_js=FEATURES_JS)
@@ -0,0 +1,57 @@
+# effects/live.py
+"""
+Beats that arrive while the effect is already running.
+
+When the visualizer starts before the analysis has finished, the app
+passes beats_src, the media server's /beats/<cache key> URL. It answers
+with the provisional beats published so far (analysis/progressive.py) as
+{"done": false, "beats": packed} and, once the analysis is cached, with
+{"done": true, "beats", "beat_info", "features"}. SonicPlayLive.follow
+polls it until done and hands every new state to the effect, which swaps
+its arrays in place instead of the page being rebuilt (and the iframe
+reloaded) by Streamlit.
+"""
+
+LIVE_JS = r"""
+<script>
+  window.SonicPlayLive = window.SonicPlayLive || (function () {
+    const POLL_MS = 1500;
+    const MAX_FAILURES = 200;  // ~5 min without an answer (queued job, server gone)
+    return {
+      // Call onUpdate({done, beats, beat_info, features}) whenever src has more beats or is done.
+      follow: function (src, onUpdate) {
+        if (!src) return;
+        let seen = -1, failures = 0;
+        function poll() {
+          fetch(src, { cache: 'no-store' }).then(function (r) {
+            if (!r.ok) throw new Error('HTTP ' + r.status);
+            return r.json();
+          }).then(function (p) {
+            failures = 0;
+            const beats = SonicPlayPack.decode(p.beats);
+            if (p.done || beats.length !== seen) {
+              seen = beats.length;
+              onUpdate({ done: !!p.done, beats: beats,
+                         beat_info: SonicPlayPack.timeline(p.beat_info || null),
+                         features: SonicPlayPack.timeline(p.features || null) });
+            }
+            if (!p.done) setTimeout(poll, POLL_MS);
+          }).catch(function () {
+            if (++failures < MAX_FAILURES) setTimeout(poll, POLL_MS);
+          });
+        }
+        poll();
+      },
+      // Index of the first beat later than t (beats ascending).
+      after: function (beats, t) {
+        let lo = 0, hi = beats.length;
+        while (lo < hi) {
+          const mid = (lo + hi) >> 1;
+          if (beats[mid] <= t) lo = mid + 1; else hi = mid;
+        }
+        return lo;
+      }
+    };
+  })();
+</script>
+"""
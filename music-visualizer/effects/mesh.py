@@ -1,17 +1,30 @@
 # effects/mesh.py
 import json
 
-def get_html(audio_src: str, beats=None):
+from effects.live import LIVE_JS
+from effects.packing import PACK_JS, pack_timeline, pack_times
+from effects.template import Template, memoize_html
+from effects.timeline import FEATURES_JS
+from shared_audio import SHARED_AUDIO_JS
+
+@memoize_html
+def get_html(audio_src: str, beats=None, track_id: str = "", features=None, beat_info=None,
+             beats_src="", features_src=""):
     """
     Mesh visualizer: geometric / polygonal neon web expanded full-screen,
     Perlin-noise warping, beat-reactive shockwaves + bloom, click ripples,
     drag rotation and trance mode for immersion.
     """
-    if beats is None:
-        beats = []
-    beats_js = json.dumps(beats)
+    return _TEMPLATE.render(
+        audio_src=audio_src, beats_js=json.dumps(pack_times(beats or [])), track_id=json.dumps(track_id),
+        features=json.dumps(pack_timeline(features)),
+        beat_info=json.dumps(pack_timeline(beat_info)),
+        beats_src=json.dumps(beats_src),
+        features_src=json.dumps(features_src),
+    )
+
 
-    return f"""
+_TEMPLATE = Template(r"""
 <!doctype html>
 <html>
   <head>
@@ -19,23 +32,36 @@ def get_html(audio_src: str, beats=None):
     <title>SonicPlay — Mesh</title>
     <script src="https://cdnjs.cloudflare.com/ajax/libs/p5.js/1.5.0/p5.min.js"></script>
     <style>
-      html,body {{ margin:0; padding:0; overflow:hidden; background:#050305; }}
-      #sketch {{ width:100%; height:100%; }}
-      #hud {{
+      html,body { margin:0; padding:0; overflow:hidden; background:#050305; }
+      #sketch { width:100%; height:100%; }
+      #hud {
         position:absolute; left:12px; top:8px; z-index:9999;
         color:#fff; font-family:Inter, Arial, sans-serif; font-size:13px;
         background:rgba(0,0,0,0.35); padding:6px 10px; border-radius:6px;
-      }}
+      }
     </style>
   </head>
   <body>
     <div id="sketch"></div>
     <div id="hud">Mesh : Neon Polygonal Web (click to ripple, drag to rotate, space toggles trance)</div>
-    <audio id="audio" controls src="{audio_src}" style="display:none"></audio>
+    <audio id="audio" crossorigin="anonymous" controls src="__AUDIO_SRC__" style="display:none"></audio>
 
+    __SHARED_AUDIO_JS__
+    __PACK_JS__
+    __LIVE_JS__
+    __FEATURES_JS__
     <script>
-      const BEATS = {beats_js};
+      let BEATS = SonicPlayPack.decode(__BEATS_JS__);
+      const TRACK_ID = __TRACK_ID__;
+      let FEATURES = SonicPlayPack.timeline(__FEATURES__);
+      SonicPlayFeatures.load(__FEATURES_SRC__, function (tl) { FEATURES = tl; });
+      let BEAT_INFO = SonicPlayPack.timeline(__BEAT_INFO__);
       let audio = null, audioCtx = null, analyser = null, sourceNode = null;
+      // Beats of an analysis still running arrive while the sketch plays.
+      SonicPlayLive.follow(__BEATS_SRC__, function (live) {
+        BEATS = live.beats;
+        if (live.done) { FEATURES = live.features; BEAT_INFO = live.beat_info; }
+      });
       let freqData = null;
       let trance = false;
       let lastBeatPulse = 0;
@@ -44,10 +70,19 @@ def get_html(audio_src: str, beats=None):
       // interaction state
       let rotation = 0;
       let rotationVel = 0;
-      let ripples = []; // each: {{ x, y, r, life }}
+      let ripples = []; // each: { x, y, r, life }
       let noiseScale = 0.0025;
 
-      function initAudio() {{
+      // Borrow the custom player's audio element + analyser (see shared_audio.py)
+      let usingShared = false;
+      function useShared(shared) {
+        usingShared = true;
+        audio = shared.audio;
+        if (shared.analyser) { analyser = shared.analyser; freqData = new Uint8Array(analyser.frequencyBinCount); }
+      }
+
+      function initAudio() {
+        if (usingShared || SonicPlayShared.adopt(TRACK_ID, useShared)) return;
         audio = document.getElementById('audio');
         if (!audio) return;
         if (audioCtx && audioCtx.state !== 'closed') return;
@@ -55,14 +90,14 @@ def get_html(audio_src: str, beats=None):
         analyser = audioCtx.createAnalyser();
         analyser.fftSize = 2048;
         freqData = new Uint8Array(analyser.frequencyBinCount);
-        try {{ sourceNode = audioCtx.createMediaElementSource(audio); }} catch (e) {{ console.warn(e); }}
-        if (sourceNode) {{
+        try { sourceNode = audioCtx.createMediaElementSource(audio); } catch (e) { console.warn(e); }
+        if (sourceNode) {
           sourceNode.connect(analyser);
           analyser.connect(audioCtx.destination);
-        }}
-      }}
+        }
+      }
 
-      function setup() {{
+      function setup() {
         let c = createCanvas(window.innerWidth, window.innerHeight);
         c.parent(document.getElementById('sketch'));
         colorMode(HSB, 360, 100, 100, 255);
@@ -71,28 +106,29 @@ def get_html(audio_src: str, beats=None):
         strokeJoin(ROUND);
         initAudio();
         noiseDetail(3, 0.55);
-      }}
+      }
 
-      function windowResized() {{ resizeCanvas(window.innerWidth, window.innerHeight); }}
+      function windowResized() { resizeCanvas(window.innerWidth, window.innerHeight); }
 
-      function avg(arr) {{
+      function avg(arr) {
         if (!arr || arr.length === 0) return 0;
         let s = 0;
         for (let v of arr) s += v;
         return s / arr.length;
-      }}
+      }
 
       // fallback beat detection (energy in low bins)
-      function detectBeatFromFFT() {{
+      function detectBeatFromFFT(feat) {
+        if (feat) return feat.onset > 0.5;
         if (!freqData) return false;
         let bins = Math.min(48, freqData.length);
         let s = 0;
         for (let i = 0; i < bins; i++) s += freqData[i];
         let avgE = s / bins;
         return avgE > 95;
-      }}
+      }
 
-      function draw() {{
+      function draw() {
         // translucent background for trails (longer in trance)
         const trailAlpha = trance ? 6 : 28;
         background(8, 10, 12, trailAlpha);
@@ -101,25 +137,26 @@ def get_html(audio_src: str, beats=None):
         if (analyser) analyser.getByteFrequencyData(freqData);
 
         let now = audio && audio.currentTime ? audio.currentTime : millis() / 1000.0;
+        const feat = audio ? SonicPlayFeatures.at(FEATURES, audio.currentTime) : null;
         let beat = false;
-        if (BEATS && BEATS.length > 0) {{
-          for (let t of BEATS) {{
-            if (Math.abs(t - now) < 0.07 && millis() - lastBeatPulse > 120) {{
+        if (BEATS && BEATS.length > 0) {
+          for (let i = 0; i < BEATS.length; i++) {
+            if (Math.abs(BEATS[i] - now) < 0.07 && millis() - lastBeatPulse > 120) {
               beat = true;
               lastBeatPulse = millis();
-              beatFlash = 120;
-            }}
-          }}
-        }} else {{
-          if (detectBeatFromFFT() && millis() - lastBeatPulse > 150) {{
+              beatFlash = 120 * SonicPlayFeatures.accent(BEAT_INFO, i);
+            }
+          }
+        } else {
+          if (detectBeatFromFFT(feat) && millis() - lastBeatPulse > 150) {
             beat = true;
             lastBeatPulse = millis();
             beatFlash = 100;
-          }}
-        }}
+          }
+        }
 
         // beat flash / bloom
-        if (beatFlash > 0) {{
+        if (beatFlash > 0) {
           push();
           blendMode(ADD);
           noStroke();
@@ -127,7 +164,7 @@ def get_html(audio_src: str, beats=None):
           rect(-width / 2, -height / 2, width, height);
           pop();
           beatFlash = max(0, beatFlash - (trance ? 1.2 : 3.6));
-        }}
+        }
 
         // center and rotation
         push();
@@ -136,15 +173,15 @@ def get_html(audio_src: str, beats=None):
         rotationVel *= 0.92;
         rotate(rotation);
 
-        // bands
-        let bass = freqData ? avg(Array.from(freqData).slice(0, Math.min(64, freqData.length))) / 255 : 0;
-        let mids = freqData ? avg(Array.from(freqData).slice(Math.floor(freqData.length * 0.12), Math.floor(freqData.length * 0.45))) / 255 : 0;
-        let treble = freqData ? avg(Array.from(freqData).slice(Math.floor(freqData.length * 0.45), Math.floor(freqData.length * 0.9))) / 255 : 0;
+        // bands (precomputed timeline if there is one, else the analyser)
+        let bass = feat ? feat.low : freqData ? avg(Array.from(freqData).slice(0, Math.min(64, freqData.length))) / 255 : 0;
+        let mids = feat ? feat.mid : freqData ? avg(Array.from(freqData).slice(Math.floor(freqData.length * 0.12), Math.floor(freqData.length * 0.45))) / 255 : 0;
+        let treble = feat ? feat.high : freqData ? avg(Array.from(freqData).slice(Math.floor(freqData.length * 0.45), Math.floor(freqData.length * 0.9))) / 255 : 0;
 
         // geometric / polygonal core: many-sided polygon warped by Perlin noise
         const rings = 9;
         const maxR = sqrt(sq(width) + sq(height)) * 0.62;
-        for (let ring = rings - 1; ring >= 0; ring--) {{
+        for (let ring = rings - 1; ring >= 0; ring--) {
           const ringScale = map(ring, 0, rings - 1, 0.20, 1.05);
           const sides = 6 + ring * 2; // keep polygonal look (hex -> many-sided)
           const points = sides * 6;
@@ -156,7 +193,7 @@ def get_html(audio_src: str, beats=None):
           stroke((hueBase + 60) % 360, 90, 92, 32 + bass * 90);
           strokeWeight(10 * ringScale * (0.4 + bass * 0.9));
           beginShape();
-          for (let i = 0; i <= points; i++) {{
+          for (let i = 0; i <= points; i++) {
             let a = TAU * i / points;
             // base polygon radius (angular/polygonal feel)
             let baseR = ringScale * maxR * (0.3 + 0.7 * (i % sides) / sides);
@@ -173,7 +210,7 @@ def get_html(audio_src: str, beats=None):
             let x = r * cos(a);
             let y = r * sin(a) * 0.72; // elliptical warp to cover screen
             vertex(x, y);
-          }}
+          }
           endShape(CLOSE);
           pop();
 
@@ -182,7 +219,7 @@ def get_html(audio_src: str, beats=None):
           stroke((hueBase + 180) % 360, 92, 96, 220);
           strokeWeight(1.6 + ring * 0.12);
           beginShape();
-          for (let i = 0; i <= points; i++) {{
+          for (let i = 0; i <= points; i++) {
             let a = TAU * i / points;
             let baseR = ringScale * maxR * (0.3 + 0.7 * (i % sides) / sides);
             let nx = cos(a) * baseR * noiseScale * 1.2 - ring * 0.02;
@@ -195,16 +232,16 @@ def get_html(audio_src: str, beats=None):
             let x = r * cos(a);
             let y = r * sin(a) * 0.72;
             vertex(x, y);
-          }}
+          }
           endShape(CLOSE);
           pop();
-        }}
+        }
 
         // polygonal skeleton grid (radial spokes + warped concentric polygons)
         push();
         strokeWeight(1.2 + bass * 1.6);
         const skeletonLayers = 12;
-        for (let sLayer = 0; sLayer < skeletonLayers; sLayer++) {{
+        for (let sLayer = 0; sLayer < skeletonLayers; sLayer++) {
           let tRatio = sLayer / (skeletonLayers - 1);
           let rBase = map(tRatio, 0, 1, maxR * 0.08, maxR * 1.02);
           let sides = 8 + Math.floor(tRatio * 24); // angular growth
@@ -212,7 +249,7 @@ def get_html(audio_src: str, beats=None):
           stroke(hue, 78, 88, 18 + tRatio * 48 + bass * 24);
           beginShape();
           const pts = sides * 6;
-          for (let i = 0; i <= pts; i++) {{
+          for (let i = 0; i <= pts; i++) {
             let a = TAU * i / pts;
             let nx = cos(a) * rBase * noiseScale * 1.4 + sLayer * 0.02;
             let ny = sin(a) * rBase * noiseScale * 1.0 - sLayer * 0.01;
@@ -222,15 +259,15 @@ def get_html(audio_src: str, beats=None):
             let x = rr * cos(a);
             let y = rr * sin(a) * 0.72;
             vertex(x, y);
-          }}
+          }
           endShape(CLOSE);
-        }}
+        }
         pop();
 
         // dense neon chords across the canvas for mesh skeleton
         push();
         strokeWeight(0.9 + bass * 1.2);
-        for (let i = 0; i < 120; i++) {{
+        for (let i = 0; i < 120; i++) {
           let a1 = random(TAU);
           let a2 = a1 + random(0.02, TAU * 0.5);
           let r1 = random(maxR * 0.15, maxR * 1.02);
@@ -240,11 +277,11 @@ def get_html(audio_src: str, beats=None):
           let hue = (frameCount * 1.0 + i * 5) % 360;
           stroke(hue, 86, 94, 36 + (beat ? 80 : 0));
           line(x1, y1, x2, y2);
-        }}
+        }
         pop();
 
         // click ripples
-        for (let i = ripples.length - 1; i >= 0; i--) {{
+        for (let i = ripples.length - 1; i >= 0; i--) {
           let rp = ripples[i];
           rp.r += (6 + bass * 36);
           rp.life -= (trance ? 0.7 : 1.8);
@@ -255,30 +292,30 @@ def get_html(audio_src: str, beats=None):
           ellipse(rp.x, rp.y, rp.r * 2, rp.r * 2);
           pop();
           if (rp.life <= 0) ripples.splice(i, 1);
-        }}
+        }
 
         pop(); // center translate
-      }}
+      }
 
-      function mousePressed() {{
+      function mousePressed() {
         // resume audio on first gesture
         if (audioCtx && audioCtx.state === 'suspended') audioCtx.resume();
         else initAudio();
         // add ripple in canvas coordinates relative to center translation later - convert:
-        ripples.push({{ x: mouseX - width / 2, y: mouseY - height / 2, r: 8, life: 100 }});
-      }}
+        ripples.push({ x: mouseX - width / 2, y: mouseY - height / 2, r: 8, life: 100 });
+      }
 
-      function mouseDragged() {{
+      function mouseDragged() {
         // horizontal drag increases rotational velocity (trippy)
         rotationVel += (mouseX - pmouseX) * 0.0009;
-      }}
+      }
 
-      function keyPressed() {{
-        if (key === ' ') {{
+      function keyPressed() {
+        if (key === ' ') {
           trance = !trance;
-        }}
-      }}
+        }
+      }
     </script>
   </body>
 </html>
-"""
\ No newline at end of file
+""", shared_audio_js=SHARED_AUDIO_JS, pack_js=PACK_JS, live_js=LIVE_JS, features_js=FEATURES_JS)
@@ -0,0 +1,89 @@
+# effects/packing.py
+"""
+Compact encoding of the arrays embedded in the effect and player pages.
+
+json.dumps of beat times and feature values writes every float with full
+precision (~19 bytes per beat, ~6 per feature value), and the page is
+rebuilt and shipped on every start of the visualizer. Instead, arrays are
+quantized to integers, optionally delta-encoded and base64-packed:
+
+    beat times   milliseconds, delta-encoded, int16 (int32 if a gap
+                 exceeds ~32 s), so ~2.7 bytes per beat
+    features     0..1 values as uint8 steps of 1/255, ~1.3 bytes per value
+
+Each packed array is a small JSON object {"dtype", "scale", "delta",
+"data"}; PACK_JS turns it back into a typed array on the client
+(SonicPlayPack.decode / .timeline).
+"""
+import base64
+
+import numpy as np
+
+TIME_STEP = 0.001  # seconds per beat-time unit
+LEVEL_STEP = 1.0 / 255  # feature value per uint8 step
+
+_DTYPES = {"uint8": "<u1", "int16": "<i2", "int32": "<i4"}
+
+
+def pack(values, scale: float, dtype: str = "uint8", delta: bool = False) -> dict:
+    """Quantize values to multiples of scale and pack them as little-endian dtype."""
+    q = np.round(np.asarray(values, dtype=np.float64) / scale).astype(np.int64)
+    if delta:
+        q = np.diff(q, prepend=0)  # deltas of the quantized values, so errors don't add up
+    info = np.iinfo(_DTYPES[dtype])
+    if len(q) and (q.min() < info.min or q.max() > info.max):
+        raise ValueError(f"Values out of range for {dtype}")
+    data = base64.b64encode(q.astype(_DTYPES[dtype]).tobytes()).decode("ascii")
+    return {"dtype": dtype, "scale": scale, "delta": delta, "data": data}
+
+
+def pack_times(times) -> dict:
+    """Beat (or other event) times in seconds, ascending."""
+    steps = np.diff(np.round(np.asarray(times, dtype=np.float64) / TIME_STEP), prepend=0)
+    fits = not len(steps) or np.abs(steps).max() <= np.iinfo(np.int16).max
+    return pack(times, TIME_STEP, "int16" if fits else "int32", delta=True)
+
+
+def pack_timeline(timeline):
+    """
+    A feature timeline or per-beat annotations (analysis.features) with
+    every 0..1 series packed; None stays None.
+    """
+    if timeline is None:
+        return None
+    return {name: value if name == "fps" else pack(np.clip(value, 0.0, 1.0), LEVEL_STEP)
+            for name, value in timeline.items()}
+
+
+PACK_JS = r"""
+<script>
+  window.SonicPlayPack = window.SonicPlayPack || (function () {
+    const TYPES = { uint8: Uint8Array, int16: Int16Array, int32: Int32Array };
+    function decode(p) {
+      if (!p) return new Float32Array(0);
+      if (Array.isArray(p)) return Float64Array.from(p);
+      const bin = atob(p.data), bytes = new Uint8Array(bin.length);
+      for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+      const raw = new TYPES[p.dtype](bytes.buffer);
+      // Accumulated times keep double precision; levels fit a Float32Array.
+      const out = p.delta ? new Float64Array(raw.length) : new Float32Array(raw.length);
+      let acc = 0;
+      for (let i = 0; i < raw.length; i++) {
+        acc = p.delta ? acc + raw[i] : raw[i];
+        out[i] = acc * p.scale;
+      }
+      return out;
+    }
+    return {
+      decode: decode,
+      // A packed feature timeline -> {fps, rms: Float32Array, ...}, or null.
+      timeline: function (tl) {
+        if (!tl) return null;
+        const out = { fps: tl.fps };
+        Object.keys(tl).forEach(function (k) { if (k !== 'fps') out[k] = decode(tl[k]); });
+        return out;
+      }
+    };
+  })();
+</script>
+"""
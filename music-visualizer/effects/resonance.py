@@ -1,16 +1,29 @@
 # effects/resonance.py
 import json
 
-def get_html(audio_src: str, beats=None):
+from effects.live import LIVE_JS
+from effects.packing import PACK_JS, pack_timeline, pack_times
+from effects.template import Template, memoize_html
+from effects.timeline import FEATURES_JS
+from shared_audio import SHARED_AUDIO_JS
+
+@memoize_html
+def get_html(audio_src: str, beats=None, track_id: str = "", features=None, beat_info=None,
+             beats_src="", features_src=""):
     """
     Resonance visualizer: hypnotic neon circular waveform that breathes, rotates,
     and pulses with the music. Includes interactive hypnotic user effects.
     """
-    if beats is None:
-        beats = []
-    beats_js = json.dumps(beats)
+    return _TEMPLATE.render(
+        audio_src=audio_src, beats_js=json.dumps(pack_times(beats or [])), track_id=json.dumps(track_id),
+        features=json.dumps(pack_timeline(features)),
+        beat_info=json.dumps(pack_timeline(beat_info)),
+        beats_src=json.dumps(beats_src),
+        features_src=json.dumps(features_src),
+    )
+
 
-    return f"""
+_TEMPLATE = Template(r"""
 <!doctype html>
 <html>
   <head>
@@ -18,32 +31,54 @@ def get_html(audio_src: str, beats=None):
     <title>SonicPlay — Resonance</title>
     <script src="https://cdnjs.cloudflare.com/ajax/libs/p5.js/1.5.0/p5.min.js"></script>
     <style>
-      html,body {{ margin:0; padding:0; overflow:hidden; background:#050305; }}
-      #sketch {{ width:100%; height:100%; }}
-      #hud {{
+      html,body { margin:0; padding:0; overflow:hidden; background:#050305; }
+      #sketch { width:100%; height:100%; }
+      #hud {
         position:absolute; left:12px; top:8px; z-index:9999;
         color:#fff; font-family:Inter, Arial, sans-serif; font-size:13px;
         background:rgba(0,0,0,0.35); padding:6px 10px; border-radius:6px;
-      }}
+      }
     </style>
   </head>
   <body>
     <div id="sketch"></div>
     <div id="hud">Resonance : Hypnotic Circular Waveform (click, drag, space for trance mode)</div>
-    <audio id="audio" controls src="{audio_src}" style="display:none"></audio>
+    <audio id="audio" crossorigin="anonymous" controls src="__AUDIO_SRC__" style="display:none"></audio>
 
+    __SHARED_AUDIO_JS__
+    __PACK_JS__
+    __LIVE_JS__
+    __FEATURES_JS__
     <script>
-      const BEATS = {beats_js};
+      let BEATS = SonicPlayPack.decode(__BEATS_JS__);
+      const TRACK_ID = __TRACK_ID__;
+      let FEATURES = SonicPlayPack.timeline(__FEATURES__);
+      SonicPlayFeatures.load(__FEATURES_SRC__, function (tl) { FEATURES = tl; });
+      let BEAT_INFO = SonicPlayPack.timeline(__BEAT_INFO__);
       let audio=null, audioCtx=null, analyser=null, sourceNode=null;
+      // Beats of an analysis still running arrive while the sketch plays.
+      SonicPlayLive.follow(__BEATS_SRC__, function (live) {
+        BEATS = live.beats;
+        if (live.done) { FEATURES = live.features; BEAT_INFO = live.beat_info; }
+      });
       let freqData=null, angle=0, trance=false;
       let lastBeatPulse=0, auraPulse=0;
       let trailAlpha = 24;
 
       // Global effects
       let flashAlpha = 0; 
-      let shockwaves = []; // each shockwave: {{ r, life, thickness }}
+      let shockwaves = []; // each shockwave: { r, life, thickness }
+
+      // Borrow the custom player's audio element + analyser (see shared_audio.py)
+      let usingShared = false;
+      function useShared(shared) {
+        usingShared = true;
+        audio = shared.audio;
+        if (shared.analyser) { analyser = shared.analyser; freqData = new Uint8Array(analyser.frequencyBinCount); }
+      }
 
-      function initAudio(){{
+      function initAudio(){
+        if (usingShared || SonicPlayShared.adopt(TRACK_ID, useShared)) return;
         audio = document.getElementById('audio');
         if (!audio) return;
         if (audioCtx && audioCtx.state !== 'closed') return;
@@ -51,14 +86,14 @@ def get_html(audio_src: str, beats=None):
         analyser = audioCtx.createAnalyser();
         analyser.fftSize = 1024;
         freqData = new Uint8Array(analyser.frequencyBinCount);
-        try {{ sourceNode = audioCtx.createMediaElementSource(audio); }} catch (e) {{ console.warn(e); }}
-        if (sourceNode) {{
+        try { sourceNode = audioCtx.createMediaElementSource(audio); } catch (e) { console.warn(e); }
+        if (sourceNode) {
           sourceNode.connect(analyser);
           analyser.connect(audioCtx.destination);
-        }}
-      }}
+        }
+      }
 
-      function setup(){{
+      function setup(){
         let c = createCanvas(window.innerWidth, window.innerHeight);
         c.parent(document.getElementById('sketch'));
         angleMode(RADIANS);
@@ -67,22 +102,22 @@ def get_html(audio_src: str, beats=None):
         noFill();
         strokeCap(ROUND);
         strokeJoin(ROUND);
-      }}
+      }
 
-      function windowResized(){{ resizeCanvas(window.innerWidth, window.innerHeight); }}
+      function windowResized(){ resizeCanvas(window.innerWidth, window.innerHeight); }
 
-      function avg(arr){{
+      function avg(arr){
         if (!arr || arr.length === 0) return 0;
         let s = 0;
         for (let v of arr) s += v;
         return s / arr.length;
-      }}
+      }
 
-      function spawnShockwave(baseR){{
-        shockwaves.push({{ r: baseR * 1.1, life: 1.0, thickness: 8 }});
-      }}
+      function spawnShockwave(baseR){
+        shockwaves.push({ r: baseR * 1.1, life: 1.0, thickness: 8 });
+      }
 
-      function draw(){{
+      function draw(){
         // translucent trails
         push();
         noStroke();
@@ -94,36 +129,42 @@ def get_html(audio_src: str, beats=None):
         if (analyser) analyser.getByteFrequencyData(freqData);
 
         let now = audio && audio.currentTime ? audio.currentTime : millis() / 1000.0;
+        const feat = audio ? SonicPlayFeatures.at(FEATURES, audio.currentTime) : null;
         let beat = false;
-        if (BEATS && BEATS.length > 0) {{
-          for (let t of BEATS) {{
-            if (Math.abs(t - now) < 0.07 && millis() - lastBeatPulse > 120) {{
+        if (BEATS && BEATS.length > 0) {
+          for (let i = 0; i < BEATS.length; i++) {
+            if (Math.abs(BEATS[i] - now) < 0.07 && millis() - lastBeatPulse > 120) {
+              const accent = SonicPlayFeatures.accent(BEAT_INFO, i);
               beat = true;
               lastBeatPulse = millis();
-              auraPulse = 60;
-              flashAlpha = 120; // reduced for eye comfort
-            }}
-          }}
-        }} else {{
-          if (freqData) {{
+              auraPulse = 60 * accent;
+              flashAlpha = 120 * accent; // reduced for eye comfort
+            }
+          }
+        } else {
+          if (feat || freqData) {
             let bass = 0;
-            let bins = Math.min(40, freqData.length);
-            for (let i = 0; i < bins; i++) bass += freqData[i];
-            bass = bass / Math.max(1, bins);
-            if (bass > 90 && millis() - lastBeatPulse > 150) {{
+            if (feat) {
+              bass = feat.low * 255;
+            } else {
+              let bins = Math.min(40, freqData.length);
+              for (let i = 0; i < bins; i++) bass += freqData[i];
+              bass = bass / Math.max(1, bins);
+            }
+            if (bass > 90 && millis() - lastBeatPulse > 150) {
               beat = true;
               lastBeatPulse = millis();
               auraPulse = 40;
               flashAlpha = 100; // softer fallback flash
-            }}
-          }}
-        }}
+            }
+          }
+        }
 
         // center & breathing
         translate(width/2, height/2);
-        let bassEnergy = freqData ? avg(Array.from(freqData).slice(0,64)) / 255 : 0;
-        let mids = freqData ? avg(Array.from(freqData).slice(Math.floor(freqData.length*0.2), Math.floor(freqData.length*0.5))) / 255 : 0;
-        let treble = freqData ? avg(Array.from(freqData).slice(Math.floor(freqData.length*0.5), Math.floor(freqData.length*0.9))) / 255 : 0;
+        let bassEnergy = feat ? feat.low : freqData ? avg(Array.from(freqData).slice(0,64)) / 255 : 0;
+        let mids = feat ? feat.mid : freqData ? avg(Array.from(freqData).slice(Math.floor(freqData.length*0.2), Math.floor(freqData.length*0.5))) / 255 : 0;
+        let treble = feat ? feat.high : freqData ? avg(Array.from(freqData).slice(Math.floor(freqData.length*0.5), Math.floor(freqData.length*0.9))) / 255 : 0;
 
         const minDim = Math.min(width, height);
         let baseRadius = (minDim * 0.22) * (1 + bassEnergy * 0.9);
@@ -135,34 +176,34 @@ def get_html(audio_src: str, beats=None):
         rotate(angle);
 
         // aura glow
-        if (auraPulse > 0) {{
+        if (auraPulse > 0) {
           push();
           blendMode(ADD);
-          for (let g = 0; g < 5; g++) {{
+          for (let g = 0; g < 5; g++) {
             let s = baseRadius * (2 + g * 0.08) + auraPulse * 0.5;
             stroke((frameCount * 0.6 + g * 50) % 360, 90, 100, 60);
             strokeWeight(5 - g);
             noFill();
             ellipse(0, 0, s, s);
-          }}
+          }
           pop();
           auraPulse = Math.max(0, auraPulse - 1.5);
-        }}
+        }
 
         // 3D tilt illusion
         let tilt = map(Math.cos(frameCount * 0.004 + Math.sin(frameCount * 0.001)), -1, 1, 0.88, 1.0);
         scale(1, tilt);
 
         // On beat spawn shockwaves
-        if (beat) {{
+        if (beat) {
           spawnShockwave(baseRadius * 0.98);
           if (random() < 0.55) spawnShockwave(baseRadius * 0.6);
-        }}
+        }
 
         // Draw shockwaves
         push();
         blendMode(ADD);
-        for (let i = shockwaves.length - 1; i >= 0; i--) {{
+        for (let i = shockwaves.length - 1; i >= 0; i--) {
           let s = shockwaves[i];
           s.life -= 0.005;
           s.r += 4 + 8 * (0.5 + bassEnergy);
@@ -172,19 +213,19 @@ def get_html(audio_src: str, beats=None):
           noFill();
           ellipse(0, 0, s.r * 2, s.r * 1.6);
           if (s.life <= 0) shockwaves.splice(i, 1);
-        }}
+        }
         pop();
 
         // Primary neon ribbons
         const ribbons = 4;
         let points = 320;
-        for (let r = 0; r < ribbons; r++) {{
+        for (let r = 0; r < ribbons; r++) {
           let hue = (frameCount * 0.6 + r * 90) % 360;
           stroke(hue, 90, 100, 180);
           strokeWeight(2.2 + (beat ? 0.8 : 0));
           noFill();
           beginShape();
-          for (let i = 0; i <= points; i++) {{
+          for (let i = 0; i <= points; i++) {
             let a = TWO_PI * i / points;
             let idx = Math.floor(map(i, 0, points, 0, freqData.length-1));
             let amp = (freqData && freqData[idx]) ? freqData[idx] / 255 : 0;
@@ -196,14 +237,14 @@ def get_html(audio_src: str, beats=None):
             let x = radius * Math.cos(a);
             let y = radius * Math.sin(a);
             vertex(x, y);
-          }}
+          }
           endShape(CLOSE);
-        }}
+        }
 
         scale(1, 1/tilt);
 
         // Flash Bloom overlay (softer neon, no white)
-        if (flashAlpha > 3) {{
+        if (flashAlpha > 3) {
           push();
           blendMode(ADD);
           let fh = (frameCount * 1.5 + Math.random()*30) % 360; // hue cycles
@@ -213,14 +254,14 @@ def get_html(audio_src: str, beats=None):
           rect(0, 0, width, height);
           pop();
           flashAlpha = Math.max(0, flashAlpha - 3.5); // slower smooth fade
-        }}
+        }
 
-      }}
+      }
 
-      function mouseDragged(){{ angle += (mouseX - pmouseX) * 0.008; }}
-      function doubleClicked(){{ auraPulse = Math.max(auraPulse, 120); }}
-      function keyPressed(){{ if (key === ' ') {{ trance = !trance; trailAlpha = trance ? 12 : 24; }} }}
+      function mouseDragged(){ angle += (mouseX - pmouseX) * 0.008; }
+      function doubleClicked(){ auraPulse = Math.max(auraPulse, 120); }
+      function keyPressed(){ if (key === ' ') { trance = !trance; trailAlpha = trance ? 12 : 24; } }
     </script>
   </body>
 </html>
-"""
\ No newline at end of file
+""", shared_audio_js=SHARED_AUDIO_JS, pack_js=PACK_JS, live_js=LIVE_JS, features_js=FEATURES_JS)
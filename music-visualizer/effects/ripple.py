@@ -1,26 +1,44 @@
 # effects/ripple.py
+import json
 
-def render_effect(beats, theme, sensitivity, particle_count, audio_url_data):
+from effects.live import LIVE_JS
+from effects.packing import PACK_JS, pack_timeline, pack_times
+from effects.template import Template, memoize_html
+from effects.timeline import FEATURES_JS
+from shared_audio import SHARED_AUDIO_JS
+
+@memoize_html
+def get_html(audio_src: str, beats=None, track_id: str = "", features=None, beat_info=None,
+             beats_src="", features_src="", theme="Neon (dark)", sensitivity=1.0, particle_count=55):
     """
     Ripple visualizer effect.
     Returns an HTML string to embed with st.components.v1.html().
+    It borrows the player's audio element, so audio_src is not embedded.
     """
-    beats_js = str(beats)
-    theme_js = theme
-    sens_js = float(sensitivity)
-    particle_count_js = int(particle_count)
-
-    html_template = r"""
+    return _TEMPLATE.render(
+        beats=json.dumps(pack_times(beats or [])),
+        features=json.dumps(pack_timeline(features)),
+        beat_info=json.dumps(pack_timeline(beat_info)),
+        beats_src=json.dumps(beats_src),
+        features_src=json.dumps(features_src),
+        theme=theme,
+        sens=float(sensitivity),
+        particles=int(particle_count),
+        track_id=json.dumps(track_id),
+    )
+
+
+_TEMPLATE = Template(r"""
 <!doctype html>
 <html>
   <head>
     <meta charset="utf-8">
     <script src="https://cdnjs.cloudflare.com/ajax/libs/p5.js/1.5.0/p5.min.js"></script>
     <style>
-      html, body {{ margin:0; padding:0; overflow:hidden; background:#02010a; color:#ddd; }}
-      #sketch {{ width:100%; height:100%; position:relative; }}
-      #dbg {{ position:absolute; top:6px; right:12px; background:rgba(0,0,0,0.5); color:#fff; padding:6px 10px; border-radius:6px; z-index:9999; font-size:12px; }}
-      #errbox {{ position:absolute; bottom:6px; left:12px; background:#330000; color:#ffb3b3; padding:8px 12px; border-radius:6px; z-index:9999; display:none; }}
+      html, body { margin:0; padding:0; overflow:hidden; background:#02010a; color:#ddd; }
+      #sketch { width:100%; height:100%; position:relative; }
+      #dbg { position:absolute; top:6px; right:12px; background:rgba(0,0,0,0.5); color:#fff; padding:6px 10px; border-radius:6px; z-index:9999; font-size:12px; }
+      #errbox { position:absolute; bottom:6px; left:12px; background:#330000; color:#ffb3b3; padding:8px 12px; border-radius:6px; z-index:9999; display:none; }
     </style>
   </head>
   <body>
@@ -28,15 +46,25 @@ def render_effect(beats, theme, sensitivity, particle_count, audio_url_data):
     <div id="dbg">Visualizer initializing...</div>
     <div id="errbox"></div>
 
+    __SHARED_AUDIO_JS__
+    __PACK_JS__
+    __LIVE_JS__
+    __FEATURES_JS__
     <script>
       try {
         console.log("Ripple Visualizer: start");
         document.getElementById('dbg').innerText = "";
 
-        const beats = __BEATS__;
+        let beats = SonicPlayPack.decode(__BEATS__);
+        const TRACK_ID = __TRACK_ID__;
+        let FEATURES = SonicPlayPack.timeline(__FEATURES__);
+        SonicPlayFeatures.load(__FEATURES_SRC__, function (tl) { FEATURES = tl; });
+        let BEAT_INFO = SonicPlayPack.timeline(__BEAT_INFO__);
         const THEME = "__THEME__";
         const SENSITIVITY = __SENS__;
         const PARTICLE_COUNT = __PARTICLES__;
+        // Below 1 the sensitivity slider drops the weakest beats (by annotated strength).
+        const MIN_STRENGTH = Math.max(0, 1 - SENSITIVITY) * 0.8;
         let ripples = [];
         let particles = [];
         let beatIndex = 0;
@@ -45,9 +73,24 @@ def render_effect(beats, theme, sensitivity, particle_count, audio_url_data):
         let analyser = null;
         let freqData = null;
         let bassHistory = [];
+        // Beats of an analysis still running arrive while the sketch plays.
+        SonicPlayLive.follow(__BEATS_SRC__, function (live) {
+          beats = live.beats;
+          if (live.done) { FEATURES = live.features; BEAT_INFO = live.beat_info; }
+          beatIndex = SonicPlayLive.after(beats, audio ? audio.currentTime : 0);
+        });
         let lastAutoRippleTime = 0;
 
+        // Borrow the custom player's audio element + analyser (see shared_audio.py)
+        let usingShared = false;
+        function useShared(shared) {
+          usingShared = true;
+          audio = shared.audio;
+          if (shared.analyser) { analyser = shared.analyser; freqData = new Uint8Array(analyser.frequencyBinCount); }
+        }
+
         function initAudio() {
+          if (usingShared || SonicPlayShared.adopt(TRACK_ID, useShared)) return;
           audio = document.getElementById('audio');
           if (!audio) {
             var auds = document.getElementsByTagName('audio');
@@ -132,13 +175,18 @@ def render_effect(beats, theme, sensitivity, particle_count, audio_url_data):
 
           if (!audio) initAudio();
 
-          // bass detection
-          if (analyser && freqData) {
-            analyser.getByteFrequencyData(freqData);
-            let bassBins = 12;
+          // bass detection: precomputed timeline if there is one, else the analyser
+          const feat = audio ? SonicPlayFeatures.at(FEATURES, audio.currentTime) : null;
+          if (feat || (analyser && freqData)) {
             let bassEnergy = 0;
-            for (let i = 0; i < Math.min(bassBins, freqData.length); i++) bassEnergy += freqData[i];
-            bassEnergy = bassEnergy / bassBins;
+            if (feat) {
+              bassEnergy = feat.low * 255;
+            } else {
+              analyser.getByteFrequencyData(freqData);
+              let bassBins = 12;
+              for (let i = 0; i < Math.min(bassBins, freqData.length); i++) bassEnergy += freqData[i];
+              bassEnergy = bassEnergy / bassBins;
+            }
             bassHistory.push(bassEnergy);
             if (bassHistory.length > 8) bassHistory.shift();
             const avgBass = bassHistory.reduce((a,b)=>a+b,0)/bassHistory.length;
@@ -156,9 +204,13 @@ def render_effect(beats, theme, sensitivity, particle_count, audio_url_data):
           if (audio && beats && beats.length > 0) {
             const now = audio.currentTime;
             while (beatIndex < beats.length && beats[beatIndex] <= now) {
-              const x = random(width*0.12, width*0.88);
-              const y = random(height*0.12, height*0.88);
-              ripples.push(new Ripple(x, y, false));
+              const info = SonicPlayFeatures.beat(BEAT_INFO, beatIndex);
+              if (!info || info.strength >= MIN_STRENGTH) {
+                const x = random(width*0.12, width*0.88);
+                const y = random(height*0.12, height*0.88);
+                // downbeats get the bolder, faster ripple
+                ripples.push(new Ripple(x, y, info !== null && info.downbeat > 0.5));
+              }
               beatIndex++;
             }
           }
@@ -196,11 +248,4 @@ def render_effect(beats, theme, sensitivity, particle_count, audio_url_data):
     </script>
   </body>
 </html>
-"""
-    return (
-        html_template
-        .replace("__BEATS__", beats_js)
-        .replace("__THEME__", theme_js)
-        .replace("__SENS__", str(sens_js))
-        .replace("__PARTICLES__", str(particle_count_js))
-    )
\ No newline at end of file
+""", shared_audio_js=SHARED_AUDIO_JS, pack_js=PACK_JS, live_js=LIVE_JS, features_js=FEATURES_JS)
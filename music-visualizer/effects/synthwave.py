@@ -1,23 +1,19 @@
-import json, base64, os
+# effects/synthwave.py
+import json
 
-def get_html(audio_src: str, beats=None, intensity=1.0, grid_speed=0.6, grid_cols=36,
-             video_path="static/synthwave_bg.mp4"):
+from effects.packing import PACK_JS, pack_times
+from effects.template import Template, memoize_html
+
+@memoize_html
+def get_html(audio_src: str, beats=None, track_id: str = "", intensity=1.0, grid_speed=0.6, grid_cols=36, video_src=""):
     """
     Synthwave visualizer with looping video background and interactive neon ray trails.
-    Video is embedded as base64 so it always loads inside Streamlit iframe.
+    video_src is the background video's URL (or data URI) from the asset registry.
     """
-    if beats is None:
-        beats = []
-    beats_js = json.dumps(beats)
+    return _TEMPLATE.render(audio_src=audio_src, beats_js=json.dumps(pack_times(beats or [])), video_src=video_src)
 
-    # 🔹 Read and encode video as base64
-    video_b64 = ""
-    if os.path.exists(video_path):
-        with open(video_path, "rb") as f:
-            video_b64 = base64.b64encode(f.read()).decode("utf-8")
-    video_url = f"data:video/mp4;base64,{video_b64}" if video_b64 else ""
 
-    return f"""
+_TEMPLATE = Template(r"""
 <!doctype html>
 <html>
   <head>
@@ -25,63 +21,64 @@ def get_html(audio_src: str, beats=None, intensity=1.0, grid_speed=0.6, grid_col
     <title>SonicPlay — Synthwave</title>
     <script src="https://cdnjs.cloudflare.com/ajax/libs/p5.js/1.5.0/p5.min.js"></script>
     <style>
-      html,body {{
+      html,body {
         margin:0; padding:0; overflow:hidden; background:#000;
         width:100%; height:100%;
-      }}
-      #bg {{
+      }
+      #bg {
         position:absolute;
         top:0; left:0;
         width:100%; height:100%;
         object-fit:cover;
         z-index:0;
-      }}
-      #sketch {{
+      }
+      #sketch {
         position:absolute;
         top:0; left:0;
         width:100%; height:100%;
         z-index:1;
         pointer-events:none;
-      }}
-      #hud {{
+      }
+      #hud {
         position:absolute; left:12px; top:8px; z-index:2;
         color:#fff; font-family:Inter, Arial, sans-serif; font-size:13px;
         background:rgba(0,0,0,0.35); padding:6px 10px; border-radius:6px;
-      }}
+      }
     </style>
   </head>
   <body>
-    <!-- 🔹 Base64 video background -->
+    <!-- 🔹 Video background -->
     <video id="bg" autoplay loop muted playsinline>
-      <source src="{video_url}" type="video/mp4">
+      <source src="__VIDEO_SRC__" type="video/mp4">
     </video>
 
     <!-- 🔹 Overlay for p5 canvas -->
     <div id="sketch"></div>
     <div id="hud">Synthwave : Drag to draw neon sunray trails ☀️</div>
-    <audio id="audio" controls src="{audio_src}" style="display:none"></audio>
+    <audio id="audio" crossorigin="anonymous" controls src="__AUDIO_SRC__" style="display:none"></audio>
 
+    __PACK_JS__
     <script>
-      const BEATS = {beats_js};
+      const BEATS = SonicPlayPack.decode(__BEATS_JS__);
       let rays = [];
 
-      function setup() {{
+      function setup() {
         let c = createCanvas(window.innerWidth, window.innerHeight);
         c.parent(document.getElementById('sketch'));
         colorMode(HSB,360,100,100,255);
         noFill();
         strokeCap(ROUND);
-      }}
+      }
 
-      function windowResized() {{
+      function windowResized() {
         resizeCanvas(window.innerWidth, window.innerHeight);
-      }}
+      }
 
-      function draw() {{
+      function draw() {
         clear(); // keep video visible underneath
 
         // animate rays
-        for (let i=rays.length-1;i>=0;i--) {{
+        for (let i=rays.length-1;i>=0;i--) {
           let r = rays[i];
           stroke(r.hue,90,100,r.alpha);
           strokeWeight(r.w);
@@ -91,21 +88,21 @@ def get_html(audio_src: str, beats=None, intensity=1.0, grid_speed=0.6, grid_col
           r.len += 2;
           r.alpha -= 3;
           if (r.alpha<=0) rays.splice(i,1);
-        }}
-      }}
+        }
+      }
 
-      function mouseDragged() {{
+      function mouseDragged() {
         let angle = atan2(mouseY-height/2, mouseX-width/2);
-        rays.push({{
+        rays.push({
           x:mouseX, y:mouseY,
           angle:angle,
           len:20,
           hue:(frameCount*2)%360,
           w:2.5,
           alpha:200
-        }});
-      }}
+        });
+      }
     </script>
   </body>
 </html>
-"""
\ No newline at end of file
+""", pack_js=PACK_JS)
@@ -0,0 +1,106 @@
+# effects/template.py
+"""
+Precompiled HTML templates for the player and the effects.
+
+A template is split once, at import time, into literal segments and
+__SLOT__ placeholders, so rendering is a single join instead of several
+full-string .replace passes (each of which copied the whole page, audio
+data URI included). Slots that never change (the shared-audio script) are
+filled in at compile time.
+
+memoize_html caches a render function's output by its arguments, so a
+rerun with the same effect, parameters and track hands back the string
+built last time. Callers that know which analysis result the beats and
+feature timeline came from pass its cache key as payload_key, so those
+are not rebuilt and hashed value by value on every rerun.
+"""
+import functools
+import re
+
+_SLOT_RE = re.compile(r"__([A-Z][A-Z0-9_]*)__")
+HTML_CACHE_SIZE = 16
+
+
+class Template:
+    def __init__(self, text: str, **constants):
+        parts = _SLOT_RE.split(text)
+        segments, slots = [parts[0]], []
+        for slot, literal in zip(parts[1::2], parts[2::2]):
+            name = slot.lower()
+            if name in constants:
+                segments[-1] += str(constants[name]) + literal
+            else:
+                slots.append(name)
+                segments.append(literal)
+        self.segments = segments
+        self.slots = slots
+
+    def render(self, **values) -> str:
+        """Fill every remaining slot; values are inserted verbatim (escape them first)."""
+        out = [self.segments[0]]
+        for name, literal in zip(self.slots, self.segments[1:]):
+            out.append(str(values[name]))
+            out.append(literal)
+        return "".join(out)
+
+
+def memoize_html(fn):
+    """
+    LRU-cache an HTML render function. List and dict arguments (beats,
+    the feature timeline) are keyed by value, or by payload_key when the
+    caller passes one: it must change whenever they do (app.py uses the
+    analysis cache key). Long strings such as data URIs hash once and then
+    reuse the hash Python caches on the str object.
+    """
+    @functools.lru_cache(maxsize=HTML_CACHE_SIZE)
+    def cached(args, kwargs):
+        return fn(*(_unwrap(v) for v in args), **{k: _unwrap(v) for k, v in kwargs})
+
+    @functools.wraps(fn)
+    def wrapper(*args, payload_key=None, **kwargs):
+        if payload_key is None:
+            key = _freeze
+        else:
+            def key(value):
+                if isinstance(value, tuple):
+                    return tuple(key(v) for v in value)
+                return _ByKey(payload_key, value) if isinstance(value, (list, dict)) else value
+        return cached(key(args), key(tuple(sorted(kwargs.items()))))
+
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
+
+
+class _FrozenDict(dict):
+    """A dict (so json.dumps and ** still work) that can be an lru_cache key."""
+
+    def __hash__(self):
+        return hash(tuple(sorted(self.items())))
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return _FrozenDict((k, _freeze(v)) for k, v in value.items())
+    return value
+
+
+class _ByKey:
+    """A payload argument that compares and hashes by its payload_key only."""
+    __slots__ = ("key", "value")
+
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        return isinstance(other, _ByKey) and self.key == other.key
+
+
+def _unwrap(value):
+    return value.value if isinstance(value, _ByKey) else value
@@ -0,0 +1,59 @@
+# effects/timeline.py
+"""
+Client-side lookup into the precomputed feature timeline.
+
+The analysis worker stores rms, low/mid/high band energy and onset
+strength at ~60 frames per second (analysis/features.py). Effects and the
+player embed that timeline (or, with the media server running, fetch it
+from /features once via SonicPlayFeatures.load, so pages that share a
+track don't each carry a copy) and call SonicPlayFeatures.at(FEATURES, t) with
+audio.currentTime instead of reading an AnalyserNode every frame, so what
+they react to no longer depends on the browser's FFT, the analyser's
+smoothing or whether WebAudio is available at all.
+
+Beats come with annotations of the same kind (analysis.features.
+beat_annotations); SonicPlayFeatures.beat(BEAT_INFO, i) and .accent(...)
+read them, so filtering weak beats or accenting downbeats is a lookup.
+"""
+
+FEATURES_JS = r"""
+<script>
+  window.SonicPlayFeatures = window.SonicPlayFeatures || (function () {
+    const NAMES = ['rms', 'low', 'mid', 'high'];
+    return {
+      // Fetch a packed timeline from src (the media server's /features route)
+      // and hand it to onLoad decoded; without a src the embedded one stays.
+      load: function (src, onLoad) {
+        if (!src) return;
+        fetch(src)
+          .then(function (r) { return r.ok ? r.json() : null; })
+          .then(function (tl) { if (tl) onLoad(SonicPlayPack.timeline(tl)); })
+          .catch(function () {});
+      },
+      // {rms, low, mid, high, onset} (0..1) at t seconds, or null without a timeline.
+      at: function (tl, t) {
+        if (!tl || !tl.rms || !tl.rms.length || !(t >= 0)) return null;
+        const n = tl.rms.length, pos = t * tl.fps;
+        const i = Math.min(Math.floor(pos), n - 1), j = Math.min(i + 1, n - 1);
+        const frac = Math.min(1, pos - i);
+        const out = {};
+        NAMES.forEach(function (k) { out[k] = tl[k][i] + (tl[k][j] - tl[k][i]) * frac; });
+        // Onsets are one frame wide: take the larger neighbour so none is skipped between draws.
+        out.onset = Math.max(tl.onset[i], tl.onset[j]);
+        return out;
+      },
+      // {strength, low, mid, high, downbeat} (0..1) of beat i, or null without annotations.
+      beat: function (info, i) {
+        if (!info || !info.strength || !(i >= 0 && i < info.strength.length)) return null;
+        return { strength: info.strength[i], low: info.low[i], mid: info.mid[i],
+                 high: info.high[i], downbeat: info.downbeat[i] };
+      },
+      // Scale for a beat's visual response: 0.6 for the weakest, 1 for strong beats and downbeats.
+      accent: function (info, i) {
+        const b = this.beat(info, i);
+        return b ? 0.6 + 0.4 * Math.max(b.strength, b.downbeat) : 1;
+      }
+    };
+  })();
+</script>
+"""
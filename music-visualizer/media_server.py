@@ -0,0 +1,244 @@
+# media_server.py
+"""
+Tiny HTTP server that streams local audio files (and the static assets,
+see assets.py) to the browser.
+
+Inlining audio as a base64 data URI makes it 33% bigger, keeps the whole
+track in session memory and blocks playback until the full string has
+arrived. Files registered here are served from disk under a content-hash
+URL instead, with HTTP Range support so the <audio> element can start
+playing and seek right away. Because URLs never change meaning they are
+sent with a one-year immutable Cache-Control. CORS is allowed so WebAudio
+analysers in the component iframes can read the samples.
+
+route() adds generated responses under a prefix, e.g. the waveform peaks
+(analysis/peaks.py) at /peaks/<cache key>?width=<pixels>, the feature
+timeline at /features/<cache key> or the beats of a
+running analysis (analysis/progressive.py) at /beats/<cache key>; the
+latter change over time and are sent with Cache-Control: no-store.
+"""
+import base64
+import mmap
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+AUDIO_MIME = {
+    ".mp3": "audio/mpeg",
+    ".wav": "audio/wav",
+    ".flac": "audio/flac",
+    ".m4a": "audio/mp4",
+    ".mp4": "audio/mp4",  # JioSaavn's AAC downloads
+    ".ogg": "audio/ogg",
+}
+STATIC_MIME = {
+    ".ico": "image/x-icon",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".svg": "image/svg+xml",
+    ".mp4": "video/mp4",
+    ".webm": "video/webm",
+}
+CHUNK_SIZE = 64 * 1024
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def mime_type(path: str, static: bool = False) -> str:
+    """Content type by extension; static files (.mp4 is a video there) look in STATIC_MIME first."""
+    ext = os.path.splitext(path)[1].lower()
+    for table in (STATIC_MIME, AUDIO_MIME) if static else (AUDIO_MIME, STATIC_MIME):
+        if ext in table:
+            return table[ext]
+    return "application/octet-stream"
+
+
+def data_uri(path: str, static: bool = False) -> str:
+    """Inline fallback for when the media server is disabled or unavailable."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return f"data:{mime_type(path, static)};base64,"
+        # encode straight from the page cache instead of reading a copy first
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            b64 = base64.b64encode(mm).decode()
+    return f"data:{mime_type(path, static)};base64,{b64}"
+
+
+class MediaServer:
+    def __init__(self, host: str, port: int, public_url: str = ""):
+        self._files = {}
+        self._routes = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        bound_port = self._httpd.server_address[1]
+        self.public_url = (public_url or f"http://{_browser_host(host)}:{bound_port}").rstrip("/")
+
+    def start(self):
+        thread = threading.Thread(target=self._httpd.serve_forever, name="media-server", daemon=True)
+        thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def register(self, path: str, content_hash: str, route: str = "audio") -> str:
+        """Serve path under /route/ and its content hash and return the URL for it."""
+        name = f"{route}/{content_hash}{os.path.splitext(path)[1].lower()}"
+        with self._lock:
+            self._files[name] = (path, mime_type(path, static=route == "static"))
+        return f"{self.public_url}/{name}"
+
+    def lookup(self, name: str):
+        """(path, mime) for a URL path such as "audio/<hash>.mp3", or None."""
+        with self._lock:
+            return self._files.get(name)
+
+    def route(self, prefix: str, handler, immutable: bool = True) -> str:
+        """
+        Answer GET /prefix/<name>?<query> with handler(name, params), which
+        returns (body bytes, mime) or None for a 404; params is parse_qs's
+        dict. Responses of an immutable route must depend only on the URL
+        (they are cached for a year); others are never cached. Returns the
+        base URL of the route.
+        """
+        with self._lock:
+            self._routes[prefix] = (handler, immutable)
+        return f"{self.public_url}/{prefix}"
+
+    def handler(self, prefix: str):
+        """(handler, immutable) registered for prefix, or None."""
+        with self._lock:
+            return self._routes.get(prefix)
+
+
+def _browser_host(host: str) -> str:
+    return "localhost" if host in ("0.0.0.0", "", "::", "127.0.0.1") else host
+
+
+def _make_handler(server: MediaServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_HEAD(self):
+            self._serve(send_body=False)
+
+        def do_GET(self):
+            self._serve(send_body=True)
+
+        def do_OPTIONS(self):
+            self.send_response(204)
+            self._common_headers()
+            self.send_header("Access-Control-Allow-Headers", "Range")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def _serve(self, send_body: bool):
+            url = urlsplit(self.path)
+            prefix, _, name = url.path.lstrip("/").partition("/")
+            route = server.handler(prefix)
+            if route is not None:
+                self._serve_generated(*route, name, parse_qs(url.query), send_body)
+                return
+            entry = server.lookup(url.path.lstrip("/"))
+            if entry is None:
+                self.send_error(404)
+                return
+            path, mime = entry
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                self.send_error(404)
+                return
+
+            start, end = 0, size - 1
+            status = 200
+            byte_range = self.headers.get("Range")
+            if byte_range and "," not in byte_range:  # multipart ranges: send it all
+                parsed = _parse_range(byte_range, size)
+                if parsed is None:
+                    self.send_response(416)
+                    self._common_headers()
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                start, end = parsed
+                status = 206
+
+            length = end - start + 1
+            self.send_response(status)
+            self._common_headers()
+            self.send_header("Content-Type", mime)
+            self.send_header("Content-Length", str(length))
+            if status == 206:
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            self.end_headers()
+            if not send_body:
+                return
+            try:
+                with open(path, "rb") as f:
+                    f.seek(start)
+                    remaining = length
+                    while remaining > 0:
+                        chunk = f.read(min(CHUNK_SIZE, remaining))
+                        if not chunk:
+                            break
+                        self.wfile.write(chunk)
+                        remaining -= len(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # browser moved on (seek, new track)
+
+        def _serve_generated(self, handler, immutable: bool, name: str, params: dict, send_body: bool):
+            try:
+                response = handler(name, params)
+            except ValueError:
+                self.send_error(400)
+                return
+            if response is None:
+                self.send_error(404)
+                return
+            body, mime = response
+            self.send_response(200)
+            self._common_headers(immutable)
+            self.send_header("Content-Type", mime)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if send_body:
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        def _common_headers(self, immutable: bool = True):
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Access-Control-Expose-Headers", "Content-Range, Content-Length, Accept-Ranges")
+            self.send_header("Cache-Control", "public, max-age=31536000, immutable" if immutable else "no-store")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def _parse_range(header: str, size: int):
+    """Parse a single 'bytes=a-b' range; returns (start, end) or None if unsatisfiable."""
+    m = _RANGE_RE.match(header.strip())
+    if not m or size == 0:
+        return None
+    first, last = m.groups()
+    if first:
+        start = int(first)
+        end = int(last) if last else size - 1
+    elif last:  # suffix range: the final N bytes
+        start = max(0, size - int(last))
+        end = size - 1
+    else:
+        return None
+    end = min(end, size - 1)
+    if start > end:
+        return None
+    return start, end
@@ -0,0 +1,94 @@
+# saavn.py
+"""
+JioSaavn search and media downloads over one pooled requests.Session.
+
+Downloads are streamed in chunks straight into the spool (so the body is
+never held in memory) with connect/read timeouts, a size cap and retries
+with exponential backoff for transient failures (connection errors,
+timeouts, 5xx responses).
+"""
+import os
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+import config
+
+CHUNK_SIZE = 64 * 1024
+POOL_SIZE = 16
+
+
+class DownloadTooLarge(Exception):
+    pass
+
+
+class TransientHTTPError(requests.HTTPError):
+    pass
+
+
+TRANSIENT_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    TransientHTTPError,
+)
+
+
+def _make_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+SESSION = _make_session()
+
+
+def search(query: str, n: int = 10):
+    resp = SESSION.get(
+        f"{config.SAAVN_API_URL}/search/songs",
+        params={"query": query, "limit": n},
+        timeout=config.SAAVN_TIMEOUT,
+    )
+    data = resp.json()
+    if not data.get("success"):
+        return []
+    return data["data"]["results"]
+
+
+@retry(
+    retry=retry_if_exception_type(TRANSIENT_ERRORS),
+    stop=stop_after_attempt(config.SAAVN_RETRIES),
+    wait=wait_exponential(multiplier=0.5, max=4),
+    reraise=True,
+)
+def download(url: str, spool_session, suffix: str = None, max_bytes: int = None):
+    """
+    Stream url into the spool; returns (path, content_hash) like Spool.store_bytes.
+    The file keeps the URL's extension (saavn.dev serves AAC as .mp4) unless
+    suffix is given.
+    """
+    if suffix is None:
+        suffix = os.path.splitext(urlsplit(url).path)[1].lower() or ".mp3"
+    if max_bytes is None:
+        max_bytes = config.SAAVN_MAX_DOWNLOAD_BYTES
+    with SESSION.get(url, stream=True, timeout=config.SAAVN_TIMEOUT) as resp:
+        if resp.status_code >= 500:
+            raise TransientHTTPError(f"{resp.status_code} from {url}", response=resp)
+        resp.raise_for_status()
+        length = resp.headers.get("Content-Length")
+        if length and int(length) > max_bytes:
+            raise DownloadTooLarge(f"{int(length)} bytes exceeds the {max_bytes} byte limit")
+        return spool_session.store_stream(_capped(resp.iter_content(CHUNK_SIZE), max_bytes), suffix)
+
+
+def _capped(chunks, max_bytes: int):
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+        if total > max_bytes:
+            raise DownloadTooLarge(f"download exceeds the {max_bytes} byte limit")
+        yield chunk
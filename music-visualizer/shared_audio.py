@@ -0,0 +1,68 @@
+# shared_audio.py
+"""
+One audio element per track, shared by the custom player and the visualizer.
+
+The player and the visualizer live in separate component iframes. Giving
+each its own <audio src=...> means the track is shipped (and decoded by
+the browser) twice. Both iframes are same-origin with the Streamlit page,
+so the player publishes its <audio> element and AnalyserNode on the parent
+window under the track id, and the effects borrow them from there. That also
+keeps the visualizer in sync with what is actually playing.
+"""
+
+SHARED_AUDIO_JS = r"""
+<script>
+  window.SonicPlayShared = window.SonicPlayShared || (function () {
+    const waiting = {};
+    function registry() {
+      let host = window;
+      try { if (window.parent && window.parent.document) host = window.parent; } catch (e) {}
+      host.__sonicplayTracks = host.__sonicplayTracks || {};
+      return host.__sonicplayTracks;
+    }
+    return {
+      // Called by the player once its audio graph exists.
+      publish: function (trackId, audio, analyser) {
+        if (!trackId) return;
+        const reg = registry();
+        Object.keys(reg).forEach(function (k) { if (k !== trackId) delete reg[k]; });
+        reg[trackId] = { audio: audio, analyser: analyser };
+        window.addEventListener('beforeunload', function () {
+          if (reg[trackId] && reg[trackId].audio === audio) delete reg[trackId];
+        });
+      },
+      lookup: function (trackId) {
+        return trackId ? (registry()[trackId] || null) : null;
+      },
+      // Calls onShared now (returns true) or once the player publishes.
+      adopt: function (trackId, onShared, timeoutMs) {
+        const found = this.lookup(trackId);
+        if (found) { onShared(found); return true; }
+        if (!trackId || waiting[trackId]) return false;
+        waiting[trackId] = true;
+        const self = this, started = Date.now();
+        const timer = setInterval(function () {
+          const shared = self.lookup(trackId);
+          if (shared || Date.now() - started > (timeoutMs || 15000)) {
+            clearInterval(timer);
+            delete waiting[trackId];
+            if (shared) onShared(shared);
+          }
+        }, 200);
+        return false;
+      }
+    };
+  })();
+</script>
+"""
+
+
+def visual_src(audio_src: str) -> str:
+    """
+    The src a visualizer's own fallback <audio> should get. URLs are cheap to
+    repeat; a data URI would duplicate the whole track, so it is left out and
+    the visualizer relies on the player's shared element instead.
+    """
+    if not audio_src or audio_src.startswith("data:"):
+        return ""
+    return audio_src
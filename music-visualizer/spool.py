@@ -0,0 +1,157 @@
+# spool.py
+"""
+Content-addressed spool for uploaded and downloaded audio.
+
+Incoming audio is written once to <spool>/<sha256><suffix>; if the same
+bytes arrive again (another session picking the same JioSaavn track, a
+re-upload) the existing file is reused. Each session holds at most one
+file, its current track. Files nobody holds are evicted least recently
+used first whenever the spool grows past its byte quota. A session's file is
+deleted when the session ends, unless another session still holds it.
+Everything left over from a previous run is removed when the spool is
+created at process start.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import uuid
+import weakref
+
+from analysis.cache import hash_bytes
+
+
+class Spool:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._holders = {}  # owner id -> path
+        os.makedirs(directory, exist_ok=True)
+        self.purge()
+
+    def store_bytes(self, data, suffix: str, owner: str = None):
+        """Spool data (held by owner, if given) and return (path, content_hash)."""
+        content_hash = hash_bytes(data)
+        path = self._path(content_hash, suffix)
+        if not self._reuse(path):
+            self._write(path, [data])
+        self._stored(path, owner)
+        return path, content_hash
+
+    def store_stream(self, chunks, suffix: str, owner: str = None):
+        """Like store_bytes, for an iterable of byte chunks (hashed while writing)."""
+        h = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    h.update(chunk)
+                    f.write(chunk)
+            content_hash = h.hexdigest()
+            path = self._path(content_hash, suffix)
+            if self._reuse(path):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, path)
+        except BaseException:
+            _remove(tmp_path)
+            raise
+        self._stored(path, owner)
+        return path, content_hash
+
+    def session(self):
+        """A handle for one browser session; dropping it releases its file."""
+        return SpoolSession(self)
+
+    def hold(self, owner: str, path: str) -> None:
+        with self._lock:
+            self._holders[owner] = path
+
+    def release(self, owner: str) -> None:
+        """Forget owner's file and delete it if no other session holds it."""
+        with self._lock:
+            path = self._holders.pop(owner, None)
+            if path is not None and path not in self._holders.values():
+                _remove(path)
+
+    def trim(self) -> None:
+        """Evict unheld files, least recently used first, until under quota."""
+        with self._lock:
+            held = set(self._holders.values())
+            entries = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                total += st.st_size
+                if entry.path not in held and not entry.name.endswith(".part"):
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                _remove(path)
+                total -= size
+
+    def purge(self) -> None:
+        """Remove every spooled file (orphans from a previous run)."""
+        with self._lock:
+            self._holders.clear()
+            for entry in os.scandir(self.directory):
+                if entry.is_file():
+                    _remove(entry.path)
+
+    def _stored(self, path: str, owner) -> None:
+        # hold before trimming so the new file can't be evicted right away
+        if owner is not None:
+            self.hold(owner, path)
+        self.trim()
+
+    def _path(self, content_hash: str, suffix: str) -> str:
+        return os.path.join(self.directory, content_hash + suffix.lower())
+
+    def _reuse(self, path: str) -> bool:
+        try:
+            os.utime(path)  # refresh LRU position
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _write(self, path: str, chunks) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            _remove(tmp_path)
+            raise
+
+
+class SpoolSession:
+    """Holds the current track of one session; released when garbage collected."""
+
+    def __init__(self, spool: Spool):
+        self._spool = spool
+        self.owner = uuid.uuid4().hex
+        weakref.finalize(self, spool.release, self.owner)
+
+    def store_bytes(self, data, suffix: str):
+        return self._spool.store_bytes(data, suffix, owner=self.owner)
+
+    def store_stream(self, chunks, suffix: str):
+        return self._spool.store_stream(chunks, suffix, owner=self.owner)
+
+    def release(self) -> None:
+        self._spool.release(self.owner)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass